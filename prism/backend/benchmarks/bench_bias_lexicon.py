@@ -0,0 +1,184 @@
+"""
+Local bias lexicon benchmark: latency and agreement with LLM labels.
+
+Runs logic/biasLexicon.py over a saved corpus of articles with reference
+bias labels (benchmarks/corpus/bias_corpus.jsonl) and reports detection
+latency, per-label precision / recall against the reference, and how many
+articles PRISM_BIAS_MODE=local_first would still send to the LLM.
+
+--record re-labels the corpus with the configured LLM (GEMINI_API_KEY
+needed) through the production bias prompt and validator, and stores the
+LLM latency per article so both paths can be compared.
+
+Run from prism/backend:
+
+    python benchmarks/bench_bias_lexicon.py
+    python benchmarks/bench_bias_lexicon.py --min-confidence 0.5 --output run.json
+    python benchmarks/bench_bias_lexicon.py --record
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Set
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.logic.biasLexicon import LEXICON, detect_bias_local  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(BENCH_DIR, "corpus", "bias_corpus.jsonl")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# Free-form LLM labels -> lexicon label (first matching keyword wins);
+# labels matching nothing ("Selective omission") are out of the lexicon's
+# scope and not scored
+CANONICAL = [
+    (("us-vs", "us vs", "them", "polariz", "othering", "in-group"), "Us-vs-them framing"),
+    (("emotion", "fear", "sensational"), "Emotional framing"),
+    (("loaded", "charged", "pejorative", "inflammatory"), "Loaded language"),
+    (("general", "stereotyp", "sweeping"), "Generalization"),
+    (("authority", "expert", "appeal to"), "Authority emphasis"),
+]
+
+
+def canonical(labels: List[str]) -> Set[str]:
+    found = set()
+    for label in labels:
+        lowered = label.lower()
+        for keywords, name in CANONICAL:
+            if any(k in lowered for k in keywords):
+                found.add(name)
+                break
+    return found
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def record(entries: List[Dict[str, Any]]) -> None:
+    """Replace each entry's labels with the LLM's, in place."""
+    from src.logic.biasDetection import BiasValidationError, _build_bias_messages, _validate_bias
+    from src.services.llmService import complete_async
+    from src.services.responseRepair import validate_with_repair
+
+    for entry in entries:
+        messages = _build_bias_messages(entry["title"], entry.get("url", ""), entry["text"])
+        started = time.perf_counter()
+        raw = await complete_async(messages, temperature=0.2, stage="bias")
+        seconds = time.perf_counter() - started
+        try:
+            labels = validate_with_repair(raw, _validate_bias, (BiasValidationError,))["indicators"]
+        except BiasValidationError:
+            print(f"{entry['id']}: invalid LLM output, kept previous labels")
+            continue
+        entry.update(labels=labels, labelSource="model", llmLatencyMs=round(seconds * 1000, 1))
+        print(f"{entry['id']}: {labels}")
+
+
+def _f1(precision: float, recall: float) -> float:
+    return 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+
+def evaluate(entries: List[Dict[str, Any]], min_confidence: float, repeat: int) -> Dict[str, Any]:
+    timings = []
+    outcomes = []
+    for entry in entries:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            local = detect_bias_local(entry["title"], entry["text"])
+            timings.append(time.perf_counter() - started)
+        outcomes.append((set(local["indicators"]), canonical(entry["labels"]), local["confidence"]))
+    timings.sort()
+
+    per_label = {}
+    for label in LEXICON:
+        tp = sum(label in got and label in want for got, want, _ in outcomes)
+        fp = sum(label in got and label not in want for got, want, _ in outcomes)
+        fn = sum(label not in got and label in want for got, want, _ in outcomes)
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        recall = tp / (tp + fn) if tp + fn else 1.0
+        per_label[label] = {
+            "support": tp + fn,
+            "precision": round(precision, 3),
+            "recall": round(recall, 3),
+            "f1": round(_f1(precision, recall), 3),
+        }
+
+    def jaccard(got: Set[str], want: Set[str]) -> float:
+        return len(got & want) / len(got | want) if got | want else 1.0
+
+    confident = [(got, want) for got, want, confidence in outcomes if confidence >= min_confidence]
+    llm_latencies = sorted(e["llmLatencyMs"] for e in entries if "llmLatencyMs" in e)
+    return {
+        "articles": len(entries),
+        "labelSources": sorted({e.get("labelSource", "unknown") for e in entries}),
+        "localLatencyMs": {
+            "p50": round(statistics.median(timings) * 1000, 4),
+            "p99": round(timings[int(len(timings) * 0.99)] * 1000, 4),
+        },
+        "llmLatencyMsP50": statistics.median(llm_latencies) if llm_latencies else None,
+        "exactMatch": round(sum(got == want for got, want, _ in outcomes) / len(outcomes), 3),
+        "meanJaccard": round(statistics.mean(jaccard(g, w) for g, w, _ in outcomes), 3),
+        "perLabel": per_label,
+        "localFirst": {
+            "minConfidence": min_confidence,
+            "escalationRate": round(1 - len(confident) / len(outcomes), 3),
+            "exactMatchWhenLocal": (
+                round(sum(g == w for g, w in confident) / len(confident), 3) if confident else None
+            ),
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--min-confidence", type=float, default=0.6,
+                        help="local_first escalation threshold (PRISM_BIAS_LOCAL_MIN_CONFIDENCE)")
+    parser.add_argument("--repeat", type=int, default=200, help="timed runs per article")
+    parser.add_argument("--record", action="store_true",
+                        help="re-label the corpus with the configured LLM and save it")
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    entries = load_corpus(args.corpus)
+    if args.record:
+        asyncio.run(record(entries))
+        with open(args.corpus, "w") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    results = evaluate(entries, args.min_confidence, args.repeat)
+
+    lat = results["localLatencyMs"]
+    print(f"articles           {results['articles']}  (labels: {', '.join(results['labelSources'])})")
+    print(f"local latency      p50 {lat['p50']:.3f}ms  p99 {lat['p99']:.3f}ms"
+          + (f"  (LLM p50 {results['llmLatencyMsP50']:.0f}ms)" if results["llmLatencyMsP50"] else ""))
+    print(f"label sets         exact {results['exactMatch']:.0%}  "
+          f"mean Jaccard {results['meanJaccard']:.2f}")
+    for label, entry in results["perLabel"].items():
+        print(f"  {label:<20} support {entry['support']:>3}  P {entry['precision']:.2f}  "
+              f"R {entry['recall']:.2f}  F1 {entry['f1']:.2f}")
+    local_first = results["localFirst"]
+    when_local = local_first["exactMatchWhenLocal"]
+    print(f"local_first        escalates {local_first['escalationRate']:.0%} at confidence "
+          f"{local_first['minConfidence']}; exact match on the rest "
+          + (f"{when_local:.0%}" if when_local is not None else "n/a"))
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"bias-lexicon-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
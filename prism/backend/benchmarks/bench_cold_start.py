@@ -0,0 +1,181 @@
+"""
+Cold-start measurement for a backend worker.
+
+Each run uses a fresh interpreter, so nothing is warm:
+
+- import:  time to `import src.server` (median of --runs). Fails (exit 1)
+           if it exceeds --import-budget-ms or if the Google SDK was pulled
+           in at import time; usable as a CI gate.
+- serve:   spawns `uvicorn src.server:app`, then measures process start ->
+           first 200 on GET / (ready) and -> first POST /api/analyze
+           response (first response).
+
+Uses the FakeProvider unless --provider gemini (needs a key, calls the API).
+
+Run from prism/backend:
+
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --runs 10 --import-budget-ms 600
+    PRISM_PROVIDER_INIT=lazy python benchmarks/bench_cold_start.py
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Modules that must stay out of the import path (loaded on first LLM use)
+LAZY_MODULES = ("google.genai",)
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import src.server
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000,
+                  "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+ARTICLE = {
+    "url": "https://news.example.com/story/cold-start",
+    "title": "Transit proposal approved",
+    "text": "The city council approved the transit proposal on Monday. " * 40,
+}
+
+
+def _env(provider: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PRISM_LLM_PROVIDER"] = provider
+    if provider == "fake":
+        # Show that no key is needed to import, boot and serve
+        env.pop("GEMINI_API_KEY", None)
+        env.pop("GEMENI_API_KEY", None)
+    return env
+
+
+def measure_import(runs: int, provider: str) -> Dict[str, Any]:
+    samples: List[float] = []
+    loaded: List[str] = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE],
+            cwd=BACKEND_DIR, env=_env(provider), capture_output=True, text=True, check=True,
+        )
+        probe = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(probe["ms"])
+        loaded = sorted(set(loaded) | set(probe["loaded"]))
+    return {
+        "medianMs": round(statistics.median(samples), 1),
+        "maxMs": round(max(samples), 1),
+        "lazyModulesLoaded": loaded,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_serve(provider: str, timeout: float) -> Dict[str, Any]:
+    import httpx
+
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.server:app", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=_env(provider),
+    )
+    try:
+        with httpx.Client(base_url=base, timeout=timeout) as client:
+            while True:
+                if proc.poll() is not None:
+                    raise RuntimeError("uvicorn exited during startup")
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError("worker not ready before timeout")
+                try:
+                    if client.get("/").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.01)
+            ready = time.perf_counter() - start
+
+            response = client.post("/api/analyze/", json=ARTICLE)
+            first = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    return {
+        "readyMs": round(ready * 1000, 1),
+        "firstResponseMs": round(first * 1000, 1),
+        "firstResponseStatus": response.status_code,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--provider", choices=["fake", "gemini"], default="fake")
+    parser.add_argument("--import-budget-ms", type=float, default=1000.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    imports = measure_import(args.runs, args.provider)
+    serves = [measure_serve(args.provider, args.timeout) for _ in range(args.runs)]
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "runs": args.runs,
+            "provider": args.provider,
+            "providerInit": os.getenv("PRISM_PROVIDER_INIT", "background"),
+            "importBudgetMs": args.import_budget_ms,
+        },
+        "import": imports,
+        "serve": {
+            "readyMsMedian": round(statistics.median(s["readyMs"] for s in serves), 1),
+            "firstResponseMsMedian": round(
+                statistics.median(s["firstResponseMs"] for s in serves), 1
+            ),
+            "runs": serves,
+        },
+    }
+
+    print(f"import src.server   median {imports['medianMs']:>7.1f}ms  max {imports['maxMs']:>7.1f}ms")
+    print(f"start -> ready      median {results['serve']['readyMsMedian']:>7.1f}ms")
+    print(f"start -> 1st reply  median {results['serve']['firstResponseMsMedian']:>7.1f}ms")
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"cold-start-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {output}")
+
+    failures = []
+    if imports["medianMs"] > args.import_budget_ms:
+        failures.append(
+            f"import took {imports['medianMs']}ms (budget {args.import_budget_ms}ms)"
+        )
+    if imports["lazyModulesLoaded"]:
+        failures.append(f"imported at startup: {', '.join(imports['lazyModulesLoaded'])}")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Microbenchmarks for analysis payload parse / validate / serialize.
+
+Times each step of turning LLM output into a response body, on a typical
+payload (4 perspectives) and a full 6-perspective one:
+
+- parse:      stdlib json.loads vs utils/jsonCodec.loads (orjson if installed)
+- validate:   responseValidator.validate (parse + normalize + schema check)
+              and the compiled response schema check alone
+- serialize:  FastAPI's default path (jsonable_encoder + JSONResponse) vs
+              jsonCodec.FastJSONResponse rendering the dict directly
+
+Run from prism/backend:
+
+    python benchmarks/bench_json.py
+    python benchmarks/bench_json.py --number 20000 --body-words 250
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from src.services.responseValidator import check_response, validate  # noqa: E402
+from src.utils.jsonCodec import JSON_BACKEND, FastJSONResponse, loads  # noqa: E402
+
+WORDS = (
+    "council residents budget transit housing workers families policy market "
+    "regulators community costs schools voters officials ruling industry prices"
+).split()
+
+
+def payload(perspectives: int, body_words: int) -> Dict[str, Any]:
+    def sentence(n: int, offset: int) -> str:
+        return " ".join(WORDS[(offset + i) % len(WORDS)] for i in range(n)) + "."
+
+    return {
+        "pageSummary": [sentence(18, i) for i in range(3)],
+        "perspectives": [
+            {"label": f"Lens {i + 1}: {sentence(3, i)}", "body": sentence(body_words, i)}
+            for i in range(perspectives)
+        ],
+        "bias": {"indicators": ["Emotional framing", "Loaded language"]},
+    }
+
+
+def per_call_us(fn: Callable[[], Any], number: int) -> float:
+    best = min(timeit.repeat(fn, number=number, repeat=5))
+    return best / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=5000, help="calls per timing run")
+    parser.add_argument("--body-words", type=int, default=150, help="words per perspective body")
+    args = parser.parse_args()
+
+    print(f"jsonCodec backend: {JSON_BACKEND}")
+    for name, count in (("typical", 4), ("6-perspective", 6)):
+        data = payload(count, args.body_words)
+        raw = json.dumps(data)
+        rows = [
+            ("parse json.loads", lambda: json.loads(raw)),
+            ("parse jsonCodec.loads", lambda: loads(raw)),
+            ("validate (full)", lambda: validate(raw)),
+            ("schema check only", lambda: check_response(data)),
+            ("serialize FastAPI default",
+             lambda: JSONResponse(jsonable_encoder(data)).body),
+            ("serialize FastJSONResponse", lambda: FastJSONResponse(data).body),
+        ]
+        print(f"\n{name} payload ({len(raw) / 1024:.1f} KB)")
+        for label, fn in rows:
+            print(f"  {label:<28} {per_call_us(fn, args.number):>9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Near-duplicate index benchmark: match quality and scale.
+
+Builds synthetic wire stories, then "syndicated copies" of them (outlet
+header/footer boilerplate, a few edited words) and unrelated articles.
+Reports how many copies match their original (recall), how many unrelated
+articles match anything (false positives), the similarity distribution,
+how far the signature estimate strays from the exact shingle Jaccard, and
+with --entries stored signatures: MinHash throughput, lookup latency
+and index memory.
+
+Run from prism/backend:
+
+    python benchmarks/bench_near_duplicates.py
+    python benchmarks/bench_near_duplicates.py --entries 500000 --min-similarity 0.7
+    python benchmarks/bench_near_duplicates.py --edits 22   # copies near J=0.8
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.nearDuplicateIndex import NearDuplicateIndex  # noqa: E402
+from src.utils.minhash import (  # noqa: E402
+    SHINGLE_WORDS,
+    SIGNATURE_BINS,
+    minhash_signature,
+    signature_similarity,
+)
+
+VOCABULARY = (
+    "council transit proposal residents officials budget construction district "
+    "business traffic vote funding community mayor plan project costs tax public "
+    "service schools housing workers union election court ruling report police "
+    "hospital energy prices market company industry climate water safety health "
+    "policy state federal agency minister parliament talks agreement border trade"
+).split()
+
+OUTLET_HEADERS = [
+    "Breaking news from the Daily Courier. Subscribe for more local coverage.",
+    "Sign up for our newsletter to get the latest headlines every morning.",
+    "This story was published in partnership with a regional news network.",
+    "Advertisement. Continue reading below. Share this article with friends.",
+]
+
+
+def story(rng: random.Random, words: int) -> List[str]:
+    return [rng.choice(VOCABULARY) for _ in range(words)]
+
+
+def syndicate(words: List[str], rng: random.Random, edits: int) -> str:
+    copy = list(words)
+    for _ in range(edits):
+        copy[rng.randrange(len(copy))] = rng.choice(VOCABULARY)
+    return " ".join([rng.choice(OUTLET_HEADERS)] + copy + [rng.choice(OUTLET_HEADERS)])
+
+
+def jaccard(a: str, b: str) -> float:
+    """Exact Jaccard similarity of the two texts' word shingles."""
+    def shingles(text: str) -> set:
+        words = re.findall(r"\w+", text.lower())
+        return {" ".join(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    sa, sb = shingles(a), shingles(b)
+    return len(sa & sb) / len(sa | sb)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--stories", type=int, default=500)
+    parser.add_argument("--words", type=int, default=600, help="words per story")
+    parser.add_argument("--edits", type=int, default=5, help="edited words per copy")
+    parser.add_argument("--entries", type=int, default=200_000, help="index size for the scale test")
+    parser.add_argument("--min-similarity", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    # -- quality -------------------------------------------------------------
+    index = NearDuplicateIndex(min_similarity=args.min_similarity, max_entries=args.entries)
+    originals = [story(rng, args.words) for _ in range(args.stories)]
+
+    start = time.perf_counter()
+    signatures = [minhash_signature(" ".join(words)) for words in originals]
+    hash_seconds = time.perf_counter() - start
+    text_mb = sum(len(" ".join(w)) for w in originals) / 1e6
+
+    for i, signature in enumerate(signatures):
+        index.add(signature, f"story-{i}")
+
+    scores: Counter = Counter()
+    matched = 0
+    errors = []
+    wrong_side = 0
+    for i, words in enumerate(originals):
+        copy = syndicate(words, rng, args.edits)
+        copy_signature = minhash_signature(copy)
+        exact = jaccard(" ".join(words), copy)
+        estimate = signature_similarity(signatures[i], copy_signature)
+        errors.append(estimate - exact)
+        wrong_side += (estimate >= args.min_similarity) != (exact >= args.min_similarity)
+        match = index.lookup(copy_signature)
+        if match is not None and match[1] == f"story-{i}":
+            matched += 1
+            scores[round(match[2], 1)] += 1
+
+    false_positives = sum(
+        index.lookup(minhash_signature(" ".join(story(rng, args.words)))) is not None
+        for _ in range(args.stories)
+    )
+
+    print(f"minhash            {len(originals) / hash_seconds:>10.0f} articles/s  "
+          f"({text_mb / hash_seconds:.1f} MB/s)")
+    print(f"copies matched     {matched}/{args.stories}  "
+          f"similarity {dict(sorted(scores.items()))}")
+    print(f"false positives    {false_positives}/{args.stories} unrelated articles")
+    print(f"estimate error     mean {statistics.fmean(errors):+.3f}  "
+          f"std {statistics.pstdev(errors):.3f}  "
+          f"({wrong_side} copies on the wrong side of {args.min_similarity})")
+
+    # -- scale ---------------------------------------------------------------
+    # Random signatures stand in for distinct articles (hashing 200k real
+    # texts would dominate the run); near copies differ in a few bins
+    def random_signature() -> bytes:
+        return rng.getrandbits(SIGNATURE_BINS * 16).to_bytes(SIGNATURE_BINS * 2, "big")
+
+    def perturb(signature: bytes, bins: int) -> bytes:
+        data = bytearray(signature)
+        for b in rng.sample(range(SIGNATURE_BINS), bins):
+            data[2 * b : 2 * b + 2] = rng.getrandbits(16).to_bytes(2, "big")
+        return bytes(data)
+
+    big = NearDuplicateIndex(min_similarity=args.min_similarity, max_entries=args.entries)
+    keys = [f"{i:064x}" for i in range(args.entries)]  # cache keys are sha256 hex
+    generated = [random_signature() for _ in range(args.entries)]
+    tracemalloc.start()
+    for signature, key in zip(generated, keys):
+        big.add(signature, key)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    probes = [random_signature() for _ in range(20_000)]
+    near = [perturb(s, SIGNATURE_BINS // 8) for s in generated[-5_000:]]
+    timings = []
+    for signature in probes + near:
+        t = time.perf_counter()
+        big.lookup(signature)
+        timings.append(time.perf_counter() - t)
+    timings.sort()
+
+    print(f"index entries      {big.stats()['entries']}  "
+          f"(~{peak / 1e6:.0f} MB of index structures)")
+    print(f"lookup latency     p50 {statistics.median(timings) * 1e6:.1f}us  "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f}us  "
+          f"({big.stats()['matches']} near copies found of {len(near)})")
+
+
+if __name__ == "__main__":
+    main()
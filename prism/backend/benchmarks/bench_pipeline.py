@@ -0,0 +1,278 @@
+"""
+Offline benchmark for the analyze and keywords endpoints.
+
+Swaps in the deterministic FakeProvider (no network, no Gemini key), drives
+the FastAPI app in-process over ASGI and reports p50/p95/p99 latency,
+requests per second and provider calls per request. Results are written to
+JSON so runs can be compared.
+
+Run from prism/backend:
+
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --requests 500 --concurrency 100 \\
+        --latency 0.8 --jitter 0.4 --malformed-rate 0.1 --mode merged
+    python benchmarks/bench_pipeline.py --duplicate-rate 0.5 --output run.json
+    python benchmarks/bench_pipeline.py --duplicate-rate 0.9 --short-deadline-rate 0.2
+    PRISM_LLM_RATE_PER_MINUTE=1200 python benchmarks/bench_pipeline.py \\
+        --quota-per-second 15 --spike-rate 0.02 --spike-latency 5
+    python benchmarks/bench_pipeline.py \
+        --models '{"fake-lite": {"latency": 0.1, "error_rate": 0.05}}' \
+        --routes '{"bias": ["fake-lite", "fake"], "keywords": ["fake-lite", "fake"]}'
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+async def run_scenario(
+    name: str,
+    requests: int,
+    concurrency: int,
+    send: Callable[[int], Awaitable[Any]],
+    provider,
+) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            response = await send(i)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    calls_before = sum(provider.calls_by_model().values())
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - start
+    calls = sum(provider.calls_by_model().values()) - calls_before
+
+    return {
+        "endpoint": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "wallSeconds": round(wall, 4),
+        "requestsPerSecond": round(requests / wall, 2) if wall else 0.0,
+        "latencyMs": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2) if latencies else 0.0,
+        },
+        "providerCalls": calls,
+        "providerCallsPerRequest": round(calls / requests, 3) if requests else 0.0,
+        "statusCodes": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+def article(i: int, rng: random.Random) -> Dict[str, str]:
+    sentences = [
+        "The city council approved the transit proposal on Monday.",
+        "Residents in the northern districts raised concerns about costs.",
+        "Officials said construction would begin early next year.",
+        "Local businesses expect changes in foot traffic during the works.",
+    ]
+    body = " ".join(rng.choice(sentences) for _ in range(60))
+    return {
+        "url": f"https://news.example.com/story/{i}",
+        "title": f"Transit proposal approved ({i})",
+        "text": f"{body} Story id {i}.",
+    }
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    from src.services import llmService
+    from src.services.fakeProvider import FakeProvider
+
+    provider = FakeProvider(
+        latency=args.latency,
+        jitter=args.jitter,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+        prefill_per_1k_tokens=args.prefill_per_1k,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        quota_per_second=args.quota_per_second,
+        spike_rate=args.spike_rate,
+        spike_latency=args.spike_latency,
+        models=json.loads(args.models) if args.models else None,
+    )
+    llmService.set_provider(provider)
+    if args.routes:
+        from src.services.modelRouter import model_router
+
+        model_router.set_routes(json.loads(args.routes))
+
+    from src.server import app
+
+    rng = random.Random(args.seed)
+    unique = max(1, round(args.requests * (1 - args.duplicate_rate)))
+    articles = [article(i, rng) for i in range(unique)]
+    # Requests sent with a short X-Prism-Deadline-Ms; only these may 504,
+    # even when they lead a flight others have joined
+    short = {i for i in range(args.requests) if rng.random() < args.short_deadline_rate}
+    short_headers = {"X-Prism-Deadline-Ms": str(args.short_deadline_ms)}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+
+        async def send_analyze(i: int):
+            headers = short_headers if i in short else None
+            return await client.post("/api/analyze/", json=articles[i % unique], headers=headers)
+
+        async def send_keywords(i: int):
+            a = articles[i % unique]
+            return await client.post(
+                "/api/keywords/",
+                json={
+                    "label": f"How a commuter in district {i % unique} would view this",
+                    "body": a["text"][:400],
+                    "title": a["title"],
+                },
+            )
+
+        scenarios = [
+            await run_scenario(
+                "/api/analyze", args.requests, args.concurrency, send_analyze, provider
+            ),
+            await run_scenario(
+                "/api/keywords", args.requests, args.concurrency, send_keywords, provider
+            ),
+        ]
+        scenarios[0]["shortDeadlineRequests"] = len(short)
+        pipeline_stats = (await client.get("/api/analyze/stats")).json()
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "malformedRate": args.malformed_rate,
+            "duplicateRate": args.duplicate_rate,
+            "shortDeadlineRate": args.short_deadline_rate,
+            "shortDeadlineMs": args.short_deadline_ms,
+            "prefillPer1kTokens": args.prefill_per_1k,
+            "rateLimitRate": args.rate_limit_rate,
+            "quotaPerSecond": args.quota_per_second,
+            "spikeRate": args.spike_rate,
+            "spikeLatency": args.spike_latency,
+            "models": args.models,
+            "routes": args.routes,
+            "mode": os.environ["PRISM_PIPELINE_MODE"],
+            "seed": args.seed,
+        },
+        "scenarios": scenarios,
+        "malformedResponses": provider.malformed,
+        "rateLimitedResponses": provider.rate_limited,
+        "latencySpikes": provider.spikes,
+        "callsByModel": provider.calls_by_model(),
+        "prefixReuse": dict(provider.prefix_stats),
+        "pipelineStats": pipeline_stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake provider latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="± uniform jitter (s)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--duplicate-rate", type=float, default=0.0,
+                        help="fraction of requests repeating an earlier article")
+    parser.add_argument("--short-deadline-rate", type=float, default=0.0,
+                        help="fraction of analyze requests sent with --short-deadline-ms")
+    parser.add_argument("--short-deadline-ms", type=int, default=200)
+    parser.add_argument("--prefill-per-1k", type=float, default=0.0,
+                        help="fake prefill delay (s) per 1k uncached input tokens")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="fraction of provider calls answered with a 429")
+    parser.add_argument("--retry-after", type=float, default=0.0,
+                        help="retryDelay (s) sent with injected 429s")
+    parser.add_argument("--quota-per-second", type=int, default=0,
+                        help="fake provider quota; calls beyond it get a 429 (0 = none)")
+    parser.add_argument("--spike-rate", type=float, default=0.0,
+                        help="fraction of provider calls with a latency spike")
+    parser.add_argument("--spike-latency", type=float, default=5.0, help="spike latency (s)")
+    parser.add_argument("--models", help="JSON extra fake models and their knob overrides")
+    parser.add_argument("--routes", help="JSON model routing table (see services/modelRouter.py)")
+    parser.add_argument("--mode", choices=["parallel", "merged"], default="parallel")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    # Must be set before the app (and llmService) is imported
+    os.environ["PRISM_LLM_PROVIDER"] = "fake"
+    os.environ["PRISM_PIPELINE_MODE"] = args.mode
+
+    results = asyncio.run(main_async(args))
+
+    for s in results["scenarios"]:
+        lat = s["latencyMs"]
+        print(
+            f"{s['endpoint']:<15} {s['requestsPerSecond']:>8.1f} req/s  "
+            f"p50 {lat['p50']:>8.1f}ms  p95 {lat['p95']:>8.1f}ms  p99 {lat['p99']:>8.1f}ms  "
+            f"{s['providerCallsPerRequest']:.2f} calls/req  {s['statusCodes']}"
+        )
+        if s.get("shortDeadlineRequests"):
+            print(f"{'':<15} {s['shortDeadlineRequests']} requests sent with a "
+                  f"{args.short_deadline_ms}ms deadline")
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(
+            RESULTS_DIR, f"pipeline-{time.strftime('%Y%m%d-%H%M%S')}.json"
+        )
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    reuse = results["prefixReuse"]
+    if reuse["promptBytes"]:
+        print(
+            f"system prefix reused on {reuse['hits']} calls: "
+            f"{reuse['reusedBytes'] / reuse['promptBytes']:.1%} of input bytes"
+        )
+    provider = results["pipelineStats"]["provider"]
+    if results["rateLimitedResponses"] or provider["rateLimiter"]["throttled"]:
+        print(
+            f"provider 429s {results['rateLimitedResponses']}  retries {provider['retries']}  "
+            f"gave up {provider['gaveUp']}  throttled {provider['rateLimiter']['throttled']} calls  "
+            f"circuit {provider['circuitBreaker']['state']} (opened {provider['circuitBreaker']['opened']}x)"
+        )
+    if len(results["callsByModel"]) > 1:
+        models = results["pipelineStats"]["models"]["models"]
+        print("  ".join(
+            f"{model}: {calls} calls, {models.get(model, {}).get('fallbacks', 0)} fallbacks"
+            for model, calls in results["callsByModel"].items()
+        ))
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Sanitizer equivalence check + throughput benchmark.
+
+Compares src.utils.textSanitizer.sanitize_text against the original
+five-pass implementation (kept below as the reference) on randomized
+adversarial inputs, then reports MB/s for both on realistic page sizes.
+
+Run from prism/backend:
+
+    python benchmarks/bench_sanitizer.py
+    python benchmarks/bench_sanitizer.py --sizes 0.05 1 5 --cases 20000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.textSanitizer import sanitize_text  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# REFERENCE (original implementation, do not optimize)
+# ---------------------------------------------------------------------------
+
+def reference_sanitize_text(text: str) -> str:
+    if not isinstance(text, str):
+        raise ValueError("Input must be a string")
+    text = re.sub(r"<[^>]+>", "", text)
+    text = re.sub(r"[\x00-\x1F\x7F]", "", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    text = re.sub(r"(.)\1{5,}", r"\1\1\1", text)
+    text = text.replace("```", "`")
+    text = text.replace('"""', '"')
+    return text
+
+
+# ---------------------------------------------------------------------------
+# INPUTS
+# ---------------------------------------------------------------------------
+
+_ALPHABET = (
+    list("abcde XYZ.,!?")
+    + ["<", ">", "<b>", "</p>", "<a href='x'>", "`", '"', "\n", "\t", "\r",
+       "\x00", "\x1b", "\x1f", "\x7f", "\x0b", "\x0c", "\x85", "\xa0",
+       " ", "　", "é", "中", "!!!!!!", "aaaaaaa", "```", '"""']
+)
+
+
+_ASCII_ALPHABET = [c for c in _ALPHABET if c.isascii()]
+
+
+def random_case(rng: random.Random) -> str:
+    # Half the cases are pure ASCII so both control-character paths are hit
+    alphabet = _ALPHABET if rng.random() < 0.5 else _ASCII_ALPHABET
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+
+
+_ENGLISH = ("the council said on monday that the proposal would affect "
+            "thousands of residents across the region according to officials").split()
+_CJK = list("这是一个关于城市政策的新闻报道居民们表示担忧官员")
+
+
+def realistic_page(size_bytes: int, rng: random.Random, cjk: bool = False) -> str:
+    words = _CJK if cjk else _ENGLISH
+    parts = []
+    total = 0
+    while total < size_bytes:
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(8, 20)))
+        chunk = rng.choice([
+            f"<p>{sentence.capitalize()}.</p>\n",
+            f"{sentence}.  ",
+            f"<a href=\"/x\">{sentence}</a>\t",
+            f"{sentence}!!!!!!!\n\n",
+        ])
+        parts.append(chunk)
+        total += len(chunk)
+    return "".join(parts)
+
+
+# ---------------------------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------------------------
+
+def check_equivalence(cases: int, seed: int) -> None:
+    rng = random.Random(seed)
+    for i in range(cases):
+        text = random_case(rng)
+        expected = reference_sanitize_text(text)
+        actual = sanitize_text(text)
+        if actual != expected:
+            raise SystemExit(
+                f"MISMATCH on case {i}: {text!r}\n  expected {expected!r}\n  got      {actual!r}"
+            )
+    print(f"equivalence: {cases} randomized cases identical")
+
+
+def throughput(fn, text: str, min_seconds: float = 0.5) -> float:
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn(text)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return runs * len(text.encode("utf-8")) / elapsed / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=float, nargs="+", default=[0.02, 0.2, 1, 5],
+                        help="page sizes in MB")
+    parser.add_argument("--cases", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    check_equivalence(args.cases, args.seed)
+
+    rng = random.Random(args.seed)
+    print(f"{'page':>14}  {'reference MB/s':>15}  {'fused MB/s':>11}  {'speedup':>7}")
+    for cjk in (False, True):
+        for size_mb in args.sizes:
+            page = realistic_page(int(size_mb * 1e6), rng, cjk=cjk)
+            assert sanitize_text(page) == reference_sanitize_text(page)
+            ref = throughput(reference_sanitize_text, page)
+            new = throughput(sanitize_text, page)
+            label = f"{size_mb:.2f}MB {'cjk' if cjk else 'latin'}"
+            print(f"{label:>14}  {ref:>15.1f}  {new:>11.1f}  {new / ref:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+"""
+Analysis pipeline logic layer.
+
+sanitize -> truncate -> prompt -> complete -> validate (+ bias), with the
+result cache, near-duplicate reuse and single-flight coalescing in front.
+Articles over the token budget go through the map-reduce path of
+logic/longDocument.py instead of being truncated.
+Shared by the analyze routes (single, stream, batch) so every entry point
+runs the same pipeline. HTTP concerns (status codes, headers) stay in the
+routes; this module raises:
+
+- InputError           missing / malformed request fields (-> 400)
+- ValidationError      LLM output failed validation after repair + retry (-> 422)
+- LLMServiceError      provider failure (-> 502); LLMRateLimitError (-> 429)
+                       and LLMUnavailableError (-> 503) carry retry_after
+- DeadlineExceeded     the request deadline passed (-> 504)
+
+Every analysis served is retrievable afterwards by its fingerprint
+(cache_key) or by the page's canonical URL (stored_analysis, lookup_url),
+so clients can revalidate without re-uploading the text.
+"""
+
+import asyncio
+import math
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ..services.llmService import (
+    complete_async,
+    has_time_for,
+    latency_stats,
+    model_stats,
+    resilience_stats,
+    LLMRateLimitError,
+    LLMServiceError,
+    LLMUnavailableError,
+    DEFAULT_MODEL,
+)
+from ..services.modelRouter import model_router
+from ..services.nearDuplicateIndex import NEAR_DUP_ENABLED, near_duplicate_index
+from ..services.promptBuilder import build_perspectives_messages, build_analysis_messages
+from ..services.responseRepair import validate_with_repair, repair_stats
+from ..services.responseValidator import conform, validate, validate_merged, ValidationError
+from ..services.resultCache import ResultCache, analysis_cache, content_fingerprint
+from ..services.sharedCache import shared_cache
+from ..services.usageTracker import usage_tracker
+from ..utils.canonicalUrl import canonical_url
+from ..utils.deadline import DeadlineExceeded, fresh_deadline_scope, wait_with_deadline
+from ..utils.metrics import register_collector, stage_timer
+from ..utils.minhash import minhash_signature
+from ..utils.singleFlight import SingleFlight
+from ..utils.textSanitizer import sanitize_text
+from ..utils.truncation import (
+    truncate_to_token_budget,
+    estimate_messages_tokens,
+    get_token_estimator,
+    text_token_budget,
+)
+from .biasDetection import BIAS_MODE, bias_detection_stats, build_bias_messages, detect_bias_async
+from .longDocument import (
+    LONG_DOC_ENABLED,
+    LONG_DOC_MIN_RATIO,
+    extract_notes,
+    long_document_stats,
+    merge_indicators,
+    notes_digest,
+    split_document,
+)
+
+
+# ---------------------------------------------------------------------------
+# CONFIGURATION / STATE
+# ---------------------------------------------------------------------------
+
+# "parallel": perspectives + bias as two concurrent calls (lowest latency)
+# "merged":   one call returns both (half the input tokens and quota)
+PIPELINE_MODE = os.getenv("PRISM_PIPELINE_MODE", "parallel").lower()
+
+# Once the daily token/cost budget is spent: merged mode and this fraction
+# of the normal article token budget
+DEGRADED_TEXT_FRACTION = float(os.getenv("PRISM_DEGRADED_TEXT_FRACTION", "0.5"))
+
+# Concurrent identical requests share one pipeline run
+flights = SingleFlight()
+
+# Canonical page URL -> fingerprint of its latest analysis (GET lookups);
+# same TTL as the analyses it points to
+url_index = ResultCache(
+    max_entries=int(os.getenv("PRISM_URL_INDEX_MAX_ENTRIES", "50000")),
+    ttl_seconds=analysis_cache.ttl_seconds,
+    shared=shared_cache,
+    namespace="url",
+)
+
+# Provider calls re-issued after validation + local repair both failed,
+# and retries skipped because they could not finish before the deadline
+retry_stats = {"perspectives": 0, "merged": 0}
+skipped_retries = {"perspectives": 0, "merged": 0}
+
+
+class InputError(ValueError):
+    pass
+
+
+class PreparedInput(NamedTuple):
+    cache_key: str
+    title: str
+    url: str
+    text: str
+    mode: str
+    degraded: bool
+    # Sentence-aligned chunks of `text` for the map-reduce path; empty for
+    # articles that fit one call
+    chunks: Tuple[str, ...] = ()
+
+
+def _collect_metrics():
+    yield from analysis_cache.metric_samples("analysis")
+    yield from url_index.metric_samples("url_index")
+    yield from near_duplicate_index.metric_samples()
+    flight_stats = flights.stats()
+    for role in ("leaders", "followers"):
+        yield ("prism_singleflight_requests_total", "counter",
+               "Analyze requests that led or joined an in-flight run.",
+               {"role": role[:-1]}, flight_stats[role])
+    for stage, count in retry_stats.items():
+        yield ("prism_stage_retries_total", "counter",
+               "Provider calls re-issued after validation and repair failed.",
+               {"stage": stage}, count)
+    for stage, count in skipped_retries.items():
+        yield ("prism_stage_retries_skipped_total", "counter",
+               "Retries not attempted because the deadline was too close.",
+               {"stage": stage}, count)
+    for outcome, count in repair_stats.items():
+        yield ("prism_json_repairs_total", "counter",
+               "Local JSON repair attempts by outcome.", {"outcome": outcome}, count)
+
+
+register_collector(_collect_metrics)
+
+
+# ---------------------------------------------------------------------------
+# INPUT
+# ---------------------------------------------------------------------------
+
+def _pipeline_mode() -> Tuple[str, bool]:
+    """Returns (mode, degraded) for a new request."""
+    if usage_tracker.over_budget():
+        usage_tracker.note_degraded()
+        return "merged", True
+    return PIPELINE_MODE, False
+
+
+def stage_text_budget(stage: str, overhead_tokens: int) -> int:
+    """
+    Article tokens for a call of `stage`: the tightest budget of the models
+    the stage may be routed to, so the text still fits after a fallback.
+    """
+    models = model_router.stage_models(stage) or [DEFAULT_MODEL]
+    return min(text_token_budget(model, overhead_tokens) for model in models)
+
+
+def prepare_input(payload: dict) -> PreparedInput:
+    """
+    Validate and sanitize a {url, title, text} body; truncate to budget, or
+    chunk it for the map-reduce path if that is on and the text is at least
+    LONG_DOC_MIN_RATIO times the budget (not when degraded).
+    """
+    if not isinstance(payload, dict):
+        raise InputError("Body must be an object")
+    required_fields = ["url", "title", "text"]
+    for field in required_fields:
+        if field not in payload:
+            raise InputError("Missing text field")
+        if not isinstance(payload[field], str):
+            raise InputError(f"'{field}' must be a string")
+
+    with stage_timer("sanitize_text"):
+        clean_title = sanitize_text(payload["title"])
+        clean_text = sanitize_text(payload["text"])
+    url = payload["url"]
+
+    # Article gets whatever the model budget leaves after the fixed prompt
+    # (system + instructions + title/url) and the reserved output tokens
+    mode, degraded = _pipeline_mode()
+    build_messages = (
+        build_analysis_messages if mode == "merged" else build_perspectives_messages
+    )
+    with stage_timer("truncate_text"):
+        overhead = estimate_messages_tokens(build_messages(title=clean_title, url=url, text=""))
+        budget = stage_text_budget("merged" if mode == "merged" else "perspectives", overhead)
+        if mode != "merged" and BIAS_MODE != "local":
+            # The separate bias call is sent the same text
+            bias_overhead = estimate_messages_tokens(build_bias_messages(clean_title, url, ""))
+            budget = min(budget, stage_text_budget("bias", bias_overhead))
+        if degraded:
+            budget = max(1, int(budget * DEGRADED_TEXT_FRACTION))
+        chunks: Tuple[str, ...] = ()
+        if (
+            LONG_DOC_ENABLED
+            and not degraded
+            and get_token_estimator()(clean_text) > budget * LONG_DOC_MIN_RATIO
+        ):
+            chunks = tuple(split_document(clean_text))
+            final_text = "".join(chunks)
+        else:
+            final_text = truncate_to_token_budget(clean_text, budget)
+
+    cache_key = content_fingerprint(clean_title, final_text)
+    return PreparedInput(cache_key, clean_title, url, final_text, mode, degraded, chunks)
+
+
+# ---------------------------------------------------------------------------
+# CACHES
+# ---------------------------------------------------------------------------
+
+def store_result(cache_key: str, signature: Optional[bytes], result: dict) -> None:
+    analysis_cache.put(cache_key, result)
+    near_duplicate_index.add(signature, cache_key)
+
+
+def remember_served(prepared: PreparedInput, result: dict, source: str) -> None:
+    """
+    Make the analysis served for `prepared` retrievable by its fingerprint
+    and URL. A near-duplicate result is stored under this article's own
+    fingerprint too, which also turns its next request into an exact hit.
+    """
+    if source == "near":
+        analysis_cache.put(prepared.cache_key, result)
+    if prepared.url:
+        # Repeat hits for a page must not rewrite (and re-share) its mapping
+        url = canonical_url(prepared.url)
+        if url_index.peek(url) != prepared.cache_key:
+            url_index.put(url, prepared.cache_key)
+
+
+async def stored_analysis(fingerprint: str) -> Optional[dict]:
+    return await analysis_cache.get_async(fingerprint)
+
+
+async def lookup_url(url: str) -> Tuple[Optional[str], Optional[dict]]:
+    """(fingerprint, analysis) last served for the page at `url`, or (None, None)."""
+    fingerprint = await url_index.get_async(canonical_url(url))
+    if fingerprint is None:
+        return None, None
+    result = await analysis_cache.get_async(fingerprint)
+    return (fingerprint, result) if result is not None else (None, None)
+
+
+def find_near_duplicate(final_text: str) -> Tuple[Optional[bytes], Optional[dict], float]:
+    """
+    Look for a cached analysis of a near-identical article (syndicated
+    copy). Returns (signature of final_text, cached result or None,
+    similarity of the match).
+    """
+    if not NEAR_DUP_ENABLED:
+        return None, None, 0.0
+
+    with stage_timer("minhash"):
+        signature = minhash_signature(final_text)
+    match = near_duplicate_index.lookup(signature)
+    if match is None:
+        return signature, None, 0.0
+
+    matched_signature, matched_key, score = match
+    # Local tier only: the index itself is per process
+    result = analysis_cache.get(matched_key)
+    if result is None:
+        # Analysis expired or was evicted; the index entry is useless now
+        near_duplicate_index.discard(matched_signature)
+        return signature, None, 0.0
+    return signature, result, score
+
+
+# ---------------------------------------------------------------------------
+# STAGES
+# ---------------------------------------------------------------------------
+
+def to_payload(perspectives_result: dict, bias: dict) -> dict:
+    """The response payload; raises ValidationError if it does not match
+    the shared response schema."""
+    payload = {
+        "perspectives": perspectives_result["perspectives"],
+        "bias": bias
+    }
+    if "pageSummary" in perspectives_result:
+        payload["pageSummary"] = perspectives_result["pageSummary"]
+    return conform(payload)
+
+
+async def validated_stage(
+    stage: str, messages, validator, raw: Optional[str] = None
+) -> dict:
+    """
+    Validate one stage's output, repairing near-valid JSON locally first.
+    Only this stage is re-issued if that fails, and only if a call of this
+    stage usually finishes before the request deadline; other stages keep
+    their results. Pass raw to validate output that was already received.
+    """
+    def accept(text: str) -> bool:
+        # Lets a hedged call prefer the attempt whose output is valid as-is
+        try:
+            validator(text)
+            return True
+        except ValidationError:
+            return False
+
+    if raw is None:
+        raw = await complete_async(messages, stage=stage, accept=accept)
+    try:
+        with stage_timer("validate"):
+            return validate_with_repair(raw, validator)
+    except ValidationError:
+        if not has_time_for(stage):
+            skipped_retries[stage] += 1
+            raise
+        retry_stats[stage] += 1
+        with stage_timer("retry"):
+            raw = await complete_async(messages, stage=f"{stage}_retry", accept=accept)
+            with stage_timer("validate"):
+                return validate_with_repair(raw, validator)
+
+
+async def timed_bias(clean_title: str, url: str, final_text: str) -> dict:
+    with stage_timer("detect_bias"):
+        return await detect_bias_async(clean_title, url, final_text)
+
+
+async def long_document_inputs(prepared: PreparedInput) -> Tuple[List[Dict[str, str]], dict]:
+    """
+    Map step for a chunked article. Returns the reduce call's messages (the
+    perspectives prompt with the section notes as content) and the bias
+    merged from the sections, which replaces the separate bias call.
+    """
+    with stage_timer("map_chunks"):
+        notes = await extract_notes(list(prepared.chunks))
+    with stage_timer("prompt_build"):
+        overhead = estimate_messages_tokens(
+            build_perspectives_messages(title=prepared.title, url=prepared.url, text="")
+        )
+        digest = notes_digest(notes, stage_text_budget("perspectives", overhead))
+        messages = build_perspectives_messages(
+            title=prepared.title,
+            url=prepared.url,
+            text=digest
+        )
+    return messages, {"indicators": merge_indicators(notes)}
+
+
+async def run_analysis(prepared: PreparedInput) -> dict:
+    """One uncached pipeline run; raises ValidationError / LLMServiceError."""
+    if prepared.chunks:
+        messages, bias = await long_document_inputs(prepared)
+        perspectives_result = await validated_stage("perspectives", messages, validate)
+        return to_payload(perspectives_result, bias)
+
+    if prepared.mode == "merged":
+        with stage_timer("prompt_build"):
+            messages = build_analysis_messages(
+                title=prepared.title,
+                url=prepared.url,
+                text=prepared.text
+            )
+        merged = await validated_stage("merged", messages, validate_merged)
+        return to_payload(merged, merged["bias"])
+
+    # Build single-step prompt
+    with stage_timer("prompt_build"):
+        messages = build_perspectives_messages(
+            title=prepared.title,
+            url=prepared.url,
+            text=prepared.text
+        )
+
+    # Run perspectives + bias in parallel; bias is fail-soft and never retried
+    perspectives_result, bias = await asyncio.gather(
+        validated_stage("perspectives", messages, validate),
+        timed_bias(prepared.title, prepared.url, prepared.text)
+    )
+
+    return to_payload(perspectives_result, bias)
+
+
+# ---------------------------------------------------------------------------
+# PUBLIC FUNCTION
+# ---------------------------------------------------------------------------
+
+async def analyze(prepared: PreparedInput) -> Tuple[dict, str, float]:
+    """
+    Cached / coalesced analysis of a prepared article.
+
+    Returns (result, source, similarity) where source is one of
+    "hit" (exact cache), "near" (near-duplicate; similarity set),
+    "leader" (ran the pipeline) or "follower" (joined an identical
+    in-flight run).
+    """
+    # Same article content -> same analysis; skip both LLM calls on a hit
+    cached = await analysis_cache.get_async(prepared.cache_key)
+    if cached is not None:
+        remember_served(prepared, cached, "hit")
+        return cached, "hit", 1.0
+
+    # Syndicated copy of an article we already analyzed
+    signature, cached, similarity = find_near_duplicate(prepared.text)
+    if cached is not None:
+        remember_served(prepared, cached, "near")
+        return cached, "near", similarity
+
+    async def run() -> dict:
+        # The flight task copies the leader's context; give it a deadline
+        # of its own so a short-deadline leader does not fail its followers
+        with fresh_deadline_scope():
+            result = await run_analysis(prepared)
+        store_result(prepared.cache_key, signature, result)
+        return result
+
+    # Followers await the leader's in-flight run instead of calling the LLM.
+    # Each caller stops waiting at its own deadline; the shared run goes on
+    # (bounded by the default deadline, or the leader's if that is longer)
+    # and still fills the cache.
+    result, is_leader = await wait_with_deadline(flights.do(prepared.cache_key, run))
+    source = "leader" if is_leader else "follower"
+    remember_served(prepared, result, source)
+    return result, source, 0.0
+
+
+def error_status(error: Exception) -> Tuple[int, str]:
+    """HTTP status and detail for a pipeline exception."""
+    if isinstance(error, InputError):
+        return 400, str(error)
+    if isinstance(error, ValidationError):
+        return 422, f"LLM output failed validation: {str(error)}"
+    if isinstance(error, DeadlineExceeded):
+        return 504, f"Deadline exceeded: {str(error)}"
+    if isinstance(error, LLMRateLimitError):
+        return 429, f"LLM rate limited: {str(error)}"
+    if isinstance(error, LLMUnavailableError):
+        return 503, f"LLM service unavailable: {str(error)}"
+    if isinstance(error, LLMServiceError):
+        return 502, f"LLM service error: {str(error)}"
+    return 500, f"Unexpected server error: {str(error)}"
+
+
+def retry_after(error: Exception) -> Optional[int]:
+    """Whole seconds for a Retry-After header, if the error suggests one."""
+    seconds = getattr(error, "retry_after", None)
+    return None if seconds is None else max(1, math.ceil(seconds))
+
+
+def error_headers(error: Exception) -> Optional[Dict[str, str]]:
+    seconds = retry_after(error)
+    return None if seconds is None else {"Retry-After": str(seconds)}
+
+
+def pipeline_stats() -> dict:
+    return {
+        "cache": analysis_cache.stats(),
+        "urlIndex": url_index.stats(),
+        "sharedCache": shared_cache.stats() if shared_cache is not None else None,
+        "nearDuplicates": near_duplicate_index.stats(),
+        "singleFlight": flights.stats(),
+        "retries": dict(retry_stats),
+        "skippedRetries": dict(skipped_retries),
+        "repairs": dict(repair_stats),
+        "usage": usage_tracker.stats(),
+        "provider": resilience_stats(),
+        "latency": latency_stats(),
+        "models": model_stats(),
+        "longDocuments": long_document_stats(),
+        "bias": bias_detection_stats(),
+    }
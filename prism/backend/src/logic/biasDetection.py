@@ -7,13 +7,34 @@ Aligned with analysisSchema.json:
 "bias": {
   "indicators": [ "Emotional framing", "Generalization", ... ]
 }
+
+PRISM_BIAS_MODE picks the detector:
+  llm          (default) one LLM call per article
+  local        lexicon matcher only (logic/biasLexicon.py), no LLM call
+  local_first  lexicon matcher; the LLM is asked only when the local
+               confidence is below PRISM_BIAS_LOCAL_MIN_CONFIDENCE
+Local results carry "confidence" and "source": "local" next to
+"indicators".
 """
 
-from typing import Dict, Any, List
-from ..services.llmService import complete, LLMServiceError
+import os
+from typing import Dict, Any, List, Optional, Tuple
+from ..services.llmService import complete, complete_async, LLMServiceError
+from ..services.responseRepair import validate_with_repair
+from ..utils.jsonCodec import loads
+from ..utils.metrics import register_collector
+from .biasLexicon import detect_bias_local, lexicon_stats
 import json
 
 
+BIAS_MODE = os.getenv("PRISM_BIAS_MODE", "llm").lower()
+LOCAL_MIN_CONFIDENCE = float(os.getenv("PRISM_BIAS_LOCAL_MIN_CONFIDENCE", "0.6"))
+
+# local: answered by the lexicon; escalated: local_first asked the LLM;
+# llm: LLM-only mode
+bias_stats = {"local": 0, "escalated": 0, "llm": 0}
+
+
 # ---------------------------------------------------------------------------
 # EXCEPTION
 # ---------------------------------------------------------------------------
@@ -26,8 +47,8 @@ class BiasValidationError(Exception):
 # PROMPT BUILDER
 # ---------------------------------------------------------------------------
 
-def _build_bias_messages(title: str, url: str, text: str) -> List[Dict[str, str]]:
-    system_prompt = """You are a neutral media framing analyst.
+# Static part, built once; sent as the (cacheable) system instruction
+BIAS_SYSTEM_PROMPT = """You are a neutral media framing analyst.
 
 Your task:
 Identify potential bias indicators in the content.
@@ -46,18 +67,18 @@ Examples of valid indicators:
 - Authority emphasis
 - Us-vs-them framing
 - Selective omission
-"""
-
-    user_prompt = f"""Analyze the following content.
 
 Return JSON in this exact structure:
 
-{{
+{
   "indicators": [
     "Emotional framing",
     "Loaded language"
   ]
-}}
+}
+"""
+
+BIAS_USER_TEMPLATE = """Analyze the following content.
 
 Title: {title}
 URL: {url}
@@ -67,9 +88,11 @@ URL: {url}
 \"\"\"
 """
 
+
+def build_bias_messages(title: str, url: str, text: str) -> List[Dict[str, str]]:
     return [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_prompt},
+        {"role": "system", "content": BIAS_SYSTEM_PROMPT},
+        {"role": "user", "content": BIAS_USER_TEMPLATE.format(title=title, url=url, text=text)},
     ]
 
 
@@ -79,7 +102,7 @@ URL: {url}
 
 def _validate_bias(raw_output: str) -> Dict[str, Any]:
     try:
-        parsed = json.loads(raw_output)
+        parsed = loads(raw_output)
     except json.JSONDecodeError:
         raise BiasValidationError("Invalid JSON from bias detection")
 
@@ -106,25 +129,92 @@ def _validate_bias(raw_output: str) -> Dict[str, Any]:
     return {"indicators": normalized}
 
 
+# ---------------------------------------------------------------------------
+# MODE SELECTION
+# ---------------------------------------------------------------------------
+
+def _local_answer(title: str, text: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    (local result or None, whether it is final) for BIAS_MODE. A
+    non-final local result (low confidence in local_first mode) is the
+    fallback if the LLM call fails.
+    """
+    if BIAS_MODE not in ("local", "local_first"):
+        bias_stats["llm"] += 1
+        return None, False
+    local = detect_bias_local(title, text)
+    if BIAS_MODE == "local" or local["confidence"] >= LOCAL_MIN_CONFIDENCE:
+        bias_stats["local"] += 1
+        return local, True
+    bias_stats["escalated"] += 1
+    return local, False
+
+
+def bias_detection_stats() -> Dict[str, Any]:
+    calls = lexicon_stats["calls"]
+    return {
+        "mode": BIAS_MODE,
+        "localMinConfidence": LOCAL_MIN_CONFIDENCE,
+        **bias_stats,
+        "lexiconAvgMs": round(lexicon_stats["seconds"] / calls * 1000, 4) if calls else 0.0,
+    }
+
+
+def _collect_metrics():
+    for path, count in bias_stats.items():
+        yield ("prism_bias_detections_total", "counter",
+               "Bias detections by path: local lexicon, escalated to the LLM, LLM only.",
+               {"path": path}, count)
+
+
+register_collector(_collect_metrics)
+
+
 # ---------------------------------------------------------------------------
 # PUBLIC FUNCTION
 # ---------------------------------------------------------------------------
 
 def detect_bias(title: str, url: str, text: str) -> Dict[str, Any]:
     """
-    Runs bias detection via LLM and validates output.
+    Runs bias detection (lexicon and/or LLM, per BIAS_MODE) and validates
+    output.
     Returns:
         {
           "indicators": [ "Emotional framing", ... ]
         }
-    Fail-soft: returns empty array on error.
+    Fail-soft: returns the local result (local_first) or an empty array
+    on error.
     """
 
+    local, final = _local_answer(title, text)
+    if final:
+        return local
+
+    try:
+        messages = build_bias_messages(title, url, text)
+        raw = complete(messages, temperature=0.2, stage="bias")
+        return validate_with_repair(raw, _validate_bias, (BiasValidationError,))
+
+    except (LLMServiceError, BiasValidationError):
+        # Do not break overall analysis if bias fails
+        return local or {"indicators": []}
+
+
+async def detect_bias_async(title: str, url: str, text: str) -> Dict[str, Any]:
+    """
+    Async variant of detect_bias() for the analyze route; same fail-soft
+    contract, but awaits the LLM instead of blocking a thread.
+    """
+
+    local, final = _local_answer(title, text)
+    if final:
+        return local
+
     try:
-        messages = _build_bias_messages(title, url, text)
-        raw = complete(messages, temperature=0.2)
-        return _validate_bias(raw)
+        messages = build_bias_messages(title, url, text)
+        raw = await complete_async(messages, temperature=0.2, stage="bias")
+        return validate_with_repair(raw, _validate_bias, (BiasValidationError,))
 
     except (LLMServiceError, BiasValidationError):
         # Do not break overall analysis if bias fails
-        return {"indicators": []}
+        return local or {"indicators": []}
@@ -0,0 +1,285 @@
+"""
+Long-document (map-reduce) logic layer.
+
+With PRISM_LONG_DOC=on, articles well over one call's token budget are
+not cut at the budget. Instead:
+
+- map:    the sanitized text is split into sentence-aligned chunks
+          (utils/truncation.split_into_chunks) and a cheap extraction call
+          per chunk returns its key points, stakeholders and bias
+          indicators; calls run in parallel under a concurrency cap.
+- reduce: the pipeline sends the ordered section notes through the normal
+          perspectives prompt (build_perspectives_messages) and merges the
+          sections' bias indicators.
+
+Section notes are cached by chunk text, and chunk boundaries are
+content-defined, so re-analyzing an edited article only re-runs the
+extraction for the chunks that changed.
+
+Cost: an article of N chunks takes N extraction calls plus the reduce call
+instead of the usual two (perspectives + bias), so the path is off by
+default and, when on, only taken once truncation would drop most of the
+article (PRISM_LONG_DOC_MIN_RATIO).
+
+Env (prism/.env or process env):
+  PRISM_LONG_DOC                      on / off (default): truncate instead
+  PRISM_LONG_DOC_MIN_RATIO            map-reduce only text at least this many
+                                      times the single-call budget (default 2)
+  PRISM_LONG_DOC_CHUNK_TOKENS         target chunk size (default 2000)
+  PRISM_LONG_DOC_MAX_CHUNKS           text beyond this many chunks is dropped (default 12)
+  PRISM_LONG_DOC_CONCURRENCY          extraction calls in flight per document (default 4)
+  PRISM_CHUNK_CACHE_MAX_ENTRIES       default 8192
+  PRISM_CHUNK_CACHE_TTL_SECONDS       default 86400
+"""
+
+import asyncio
+import json
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from ..services.llmService import complete_async, has_time_for
+from ..services.responseRepair import validate_with_repair
+from ..services.responseValidator import ValidationError
+from ..services.resultCache import ResultCache, content_fingerprint
+from ..services.sharedCache import shared_cache
+from ..utils.jsonCodec import loads
+from ..utils.metrics import register_collector
+from ..utils.truncation import get_token_estimator, split_into_chunks, truncate_to_token_budget
+
+
+LONG_DOC_ENABLED = os.getenv("PRISM_LONG_DOC", "off").lower() == "on"
+LONG_DOC_MIN_RATIO = float(os.getenv("PRISM_LONG_DOC_MIN_RATIO", "2"))
+CHUNK_TOKENS = int(os.getenv("PRISM_LONG_DOC_CHUNK_TOKENS", "2000"))
+MAX_CHUNKS = int(os.getenv("PRISM_LONG_DOC_MAX_CHUNKS", "12"))
+CONCURRENCY = int(os.getenv("PRISM_LONG_DOC_CONCURRENCY", "4"))
+
+MAX_POINTS = 5
+MAX_STAKEHOLDERS = 5
+MAX_INDICATORS = 8
+
+# Part of every chunk cache key; bump when the extraction prompt changes
+NOTES_VERSION = "notes-v1"
+
+chunk_cache = ResultCache(
+    max_entries=int(os.getenv("PRISM_CHUNK_CACHE_MAX_ENTRIES", "8192")),
+    ttl_seconds=float(os.getenv("PRISM_CHUNK_CACHE_TTL_SECONDS", "86400")),
+    shared=shared_cache,
+    namespace="chunk",
+)
+long_doc_stats = {"documents": 0, "chunks": 0, "cachedChunks": 0, "extracted": 0, "failed": 0}
+
+
+# ---------------------------------------------------------------------------
+# EXCEPTION
+# ---------------------------------------------------------------------------
+
+class ChunkNotesError(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# PROMPT BUILDER
+# ---------------------------------------------------------------------------
+
+# Only the section goes in the user message (no title / position), so the
+# notes depend on the chunk text alone and can be cached by it
+CHUNK_NOTES_SYSTEM_PROMPT = """You are a careful news analyst reading one section of a longer article.
+
+Your task:
+Extract what a reader needs from THIS section to understand the whole article.
+
+Rules:
+- Output valid JSON only. No markdown, no commentary.
+- Do NOT introduce facts that are not in the section.
+- "points": at most 5 key facts, claims or events, each one sentence under 25 words.
+- "stakeholders": at most 5 people, groups or communities affected or quoted (short names).
+- "indicators": bias indicator labels (2-4 words) that apply to this section, e.g.
+  "Emotional framing", "Loaded language", "Selective omission". Use an empty array if none apply.
+
+Return JSON in this exact structure:
+
+{
+  "points": ["..."],
+  "stakeholders": ["..."],
+  "indicators": ["..."]
+}
+"""
+
+CHUNK_NOTES_USER_TEMPLATE = """Section:
+
+\"\"\"
+{text}
+\"\"\"
+"""
+
+
+def _build_notes_messages(text: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": CHUNK_NOTES_SYSTEM_PROMPT},
+        {"role": "user", "content": CHUNK_NOTES_USER_TEMPLATE.format(text=text)},
+    ]
+
+
+# ---------------------------------------------------------------------------
+# VALIDATION
+# ---------------------------------------------------------------------------
+
+def _string_list(parsed: dict, field: str, limit: int) -> List[str]:
+    values = parsed.get(field, [])
+    if not isinstance(values, list):
+        raise ChunkNotesError(f"'{field}' must be array")
+    normalized = []
+    for i, item in enumerate(values):
+        if not isinstance(item, str):
+            raise ChunkNotesError(f"{field} item {i + 1} must be string")
+        if item.strip():
+            normalized.append(item.strip())
+    return normalized[:limit]
+
+
+def _validate_notes(raw_output: str) -> Dict[str, Any]:
+    try:
+        parsed = loads(raw_output)
+    except json.JSONDecodeError:
+        raise ChunkNotesError("Invalid JSON from chunk extraction")
+
+    if not isinstance(parsed, dict) or "points" not in parsed:
+        raise ChunkNotesError("Missing 'points'")
+
+    notes = {
+        "points": _string_list(parsed, "points", MAX_POINTS),
+        "stakeholders": _string_list(parsed, "stakeholders", MAX_STAKEHOLDERS),
+        "indicators": _string_list(parsed, "indicators", MAX_INDICATORS),
+    }
+    if not notes["points"]:
+        raise ChunkNotesError("'points' cannot be empty")
+    return notes
+
+
+# ---------------------------------------------------------------------------
+# MAP
+# ---------------------------------------------------------------------------
+
+def split_document(text: str) -> List[str]:
+    """Chunks covering at most MAX_CHUNKS * CHUNK_TOKENS of `text`."""
+    return split_into_chunks(text, CHUNK_TOKENS)[:MAX_CHUNKS]
+
+
+async def _chunk_notes(chunk: str) -> Optional[Dict[str, Any]]:
+    """Cached notes for one chunk; None if its output stayed invalid."""
+    key = content_fingerprint(NOTES_VERSION, chunk)
+    cached = await chunk_cache.get_async(key)
+    if cached is not None:
+        long_doc_stats["cachedChunks"] += 1
+        return cached
+
+    messages = _build_notes_messages(chunk)
+    for stage in ("chunk", "chunk_retry"):
+        if stage == "chunk_retry" and not has_time_for(stage):
+            break
+        raw = await complete_async(messages, temperature=0.2, stage=stage)
+        try:
+            notes = validate_with_repair(raw, _validate_notes, (ChunkNotesError,))
+        except ChunkNotesError:
+            continue
+        chunk_cache.put(key, notes)
+        long_doc_stats["extracted"] += 1
+        return notes
+
+    long_doc_stats["failed"] += 1
+    return None
+
+
+async def extract_notes(chunks: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Notes per chunk, in order, with at most CONCURRENCY extraction calls in
+    flight. A chunk whose output stays invalid is skipped (None); provider
+    errors propagate.
+
+    Raises:
+        ValidationError if no chunk could be summarized
+    """
+    long_doc_stats["documents"] += 1
+    long_doc_stats["chunks"] += len(chunks)
+    semaphore = asyncio.Semaphore(max(1, CONCURRENCY))
+
+    async def bounded(chunk: str):
+        async with semaphore:
+            return await _chunk_notes(chunk)
+
+    notes = await asyncio.gather(*(bounded(chunk) for chunk in chunks))
+    if not any(notes):
+        raise ValidationError("No section of the long document could be summarized")
+    return notes
+
+
+# ---------------------------------------------------------------------------
+# REDUCE INPUTS
+# ---------------------------------------------------------------------------
+
+def _format_digest(notes: List[Optional[Dict[str, Any]]], points: int) -> str:
+    lines = [
+        f"Notes on the {len(notes)} sections of a long article, in reading order.",
+    ]
+    for i, section in enumerate(notes, 1):
+        if section is None:
+            continue
+        lines.append(f"\nSection {i}:")
+        lines.extend(f"- {point}" for point in section["points"][:points])
+        if section["stakeholders"]:
+            lines.append("Stakeholders: " + ", ".join(section["stakeholders"]))
+    return "\n".join(lines)
+
+
+def notes_digest(notes: List[Optional[Dict[str, Any]]], budget_tokens: int) -> str:
+    """
+    The section notes as content for the reduce call. Keeps every section
+    and drops points per section (last ones first) until it fits
+    budget_tokens.
+    """
+    est = get_token_estimator()
+    for points in range(MAX_POINTS, 0, -1):
+        digest = _format_digest(notes, points)
+        if est(digest) <= budget_tokens:
+            return digest
+    return truncate_to_token_budget(digest, budget_tokens)
+
+
+def merge_indicators(notes: List[Optional[Dict[str, Any]]]) -> List[str]:
+    """Bias indicators across sections, most frequent first (ties keep
+    first-seen order), case-insensitively deduplicated."""
+    counts: Counter = Counter()
+    labels: Dict[str, str] = {}
+    for section in notes:
+        for label in (section or {}).get("indicators", []):
+            key = label.lower()
+            labels.setdefault(key, label)
+            counts[key] += 1
+    ranked = sorted(labels, key=lambda key: -counts[key])
+    return [labels[key] for key in ranked[:MAX_INDICATORS]]
+
+
+# ---------------------------------------------------------------------------
+# STATS
+# ---------------------------------------------------------------------------
+
+def long_document_stats() -> Dict[str, Any]:
+    return {
+        "enabled": LONG_DOC_ENABLED,
+        "chunkTokens": CHUNK_TOKENS,
+        "maxChunks": MAX_CHUNKS,
+        **long_doc_stats,
+        "chunkCache": chunk_cache.stats(),
+    }
+
+
+def _collect_metrics():
+    yield from chunk_cache.metric_samples("chunk")
+    for event, count in long_doc_stats.items():
+        yield ("prism_long_document_events_total", "counter",
+               "Long-document map-reduce: documents, chunks and chunk outcomes.",
+               {"event": event}, count)
+
+
+register_collector(_collect_metrics)
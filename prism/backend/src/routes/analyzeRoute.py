@@ -18,6 +18,9 @@
 # =============================================================================
 #
 # - Define POST handler for the analyze endpoint.
+# - GET /api/analyze/{fingerprint} and GET /api/analyze/?url=... return a
+#   stored analysis with an ETag (304 on a matching If-None-Match), so a
+#   client can revalidate a page it analyzed before without re-uploading.
 # - Validate incoming body (required fields, basic types) and reject bad
 #   requests with 400 and a clear message.
 # - Sanitize/truncate input using utils (textSanitizer, truncation) before
@@ -36,6 +39,8 @@
 # - Mounted by server.py (e.g. app.include_router(analyze_route)).
 # - Uses services/llm_service.py, services/prompt_builder.py,
 #   services/response_validator.py and logic/bias_detection.py.
+# - The shared pipeline (caches, coalescing, stages) lives in
+#   logic/analysisPipeline.py; this file maps it onto HTTP.
 # - Uses utils/text_sanitizer.py and utils/truncation.py for input safety.
 # - Request/response shapes must align with shared/schema/analysisSchema.json.
 # - Extension api/analyzeClient.ts calls this endpoint.
@@ -43,101 +48,462 @@
 # =============================================================================
 
 import asyncio
+import hashlib
 import logging
+import os
+import re
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
 log = logging.getLogger(__name__)
 
-from src.utils.textSanitizer import sanitize_text
-from src.utils.truncation import truncate_text
-from src.services.promptBuilder import build_perspectives_messages
-from src.services.responseValidator import validate, ValidationError
-from src.services.llmService import complete, LLMServiceError
-from src.logic.biasDetection import detect_bias
+from src.services.promptBuilder import build_perspectives_messages, build_analysis_messages
+from src.services.responseValidator import validate, validate_merged
+from src.services.llmService import stream_async
+from src.services.resultCache import analysis_cache
+from src.services.usageTracker import usage_route
+from src.logic.analysisPipeline import (
+    InputError,
+    PreparedInput,
+    analyze,
+    error_headers,
+    error_status,
+    find_near_duplicate,
+    flights,
+    long_document_inputs,
+    lookup_url,
+    pipeline_stats,
+    prepare_input,
+    remember_served,
+    retry_after,
+    store_result,
+    stored_analysis,
+    timed_bias,
+    to_payload,
+    validated_stage,
+)
+from src.utils.deadline import fresh_deadline_scope, request_deadline, requested_seconds
+from src.utils.incrementalJson import IncrementalArrayScanner
+from src.utils.jsonCodec import FastJSONResponse, dumps, dumps_str
+from src.utils.metrics import stage_timer
 
-router = APIRouter(prefix="/api/analyze", tags=["analyze"])
+router = APIRouter(
+    prefix="/api/analyze",
+    tags=["analyze"],
+    dependencies=[Depends(usage_route("analyze")), Depends(request_deadline)],
+)
+
+# Batch endpoint limits; a batch may ask for a lower concurrency, not higher
+BATCH_MAX_ITEMS = int(os.getenv("PRISM_BATCH_MAX_ITEMS", "100"))
+BATCH_CONCURRENCY = int(os.getenv("PRISM_BATCH_CONCURRENCY", "8"))
+
+# Freshness of GET lookups; after that clients revalidate with If-None-Match
+ANALYSIS_MAX_AGE_SECONDS = int(os.getenv("PRISM_ANALYZE_MAX_AGE_SECONDS", "300"))
+
+_FINGERPRINT_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def etag_for(body: bytes) -> str:
+    # Weak: the same analysis may be sent gzip- or brotli-encoded
+    return 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 13.1.2): ignore W/ prefixes
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def _prepare_or_400(payload: dict) -> PreparedInput:
+    try:
+        return prepare_input(payload)
+    except InputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/")
 async def analyze_content(payload: dict):
-    required_fields = ["url", "title", "text"]
-    for field in required_fields:
-        if field not in payload:
-            raise HTTPException(status_code=400, detail="Missing text field")
-
-    clean_title = sanitize_text(payload["title"])
-    clean_text = sanitize_text(payload["text"])
-    final_text = truncate_text(clean_text, max_chars=6000)
-    url = payload["url"]
+    prepared = _prepare_or_400(payload)
+    headers = {}
+    if prepared.degraded:
+        headers["X-Prism-Degraded"] = "budget"
 
     try:
-       # Build single-step prompt
-        messages = build_perspectives_messages(
-            title=clean_title,
-            url=url,
-            text=final_text
-        )
+        result, source, similarity = await analyze(prepared)
+    except Exception as e:
+        status, detail = error_status(e)
+        if status == 502:
+            log.exception("LLM service error (502)")
+        raise HTTPException(status_code=status, detail=detail, headers=error_headers(e))
 
-        # Run perspectives + bias in parallel
-        perspectives_task = asyncio.to_thread(
-            lambda: validate(complete(messages))
-        )
+    if source == "hit":
+        headers["X-Prism-Cache"] = "hit"
+    elif source == "near":
+        headers["X-Prism-Cache"] = "near"
+        headers["X-Prism-Similarity"] = f"{similarity:.3f}"
+    else:
+        headers["X-Prism-Cache"] = "miss"
+        headers["X-Prism-Coalesced"] = source
+    # Already a schema-checked dict: serialize it directly (no jsonable_encoder)
+    response = FastJSONResponse(result, headers=headers)
+    response.headers["ETag"] = etag_for(response.body)
+    response.headers["X-Prism-Fingerprint"] = prepared.cache_key
+    return response
 
-        bias_task = asyncio.to_thread(
-            detect_bias, clean_title, url, final_text
-        )
 
-        perspectives_result, bias = await asyncio.gather(
-            perspectives_task,
-            bias_task
-        )
+# ---------------------------------------------------------------------------
+# STREAMING VARIANT
+# ---------------------------------------------------------------------------
 
-        payload = {
-            "perspectives": perspectives_result["perspectives"],
-            "bias": bias
-        }
-        if "pageSummary" in perspectives_result:
-            payload["pageSummary"] = perspectives_result["pageSummary"]
-        return payload
+def _replay_events(result: dict):
+    for i, line in enumerate(result.get("pageSummary", [])):
+        yield {"event": "pageSummary", "index": i, "text": line}
+    for i, p in enumerate(result["perspectives"]):
+        yield {"event": "perspective", "index": i, "perspective": p}
+    yield {"event": "bias", "bias": result["bias"]}
+    yield {"event": "done", "result": result}
 
-    except ValidationError as e:
-        # Retry once
+
+def _error_event(error: Exception) -> dict:
+    status, detail = error_status(error)
+    if status == 502:
+        log.exception("LLM service error (502)")
+    event = {"event": "error", "status": status, "detail": detail}
+    if retry_after(error) is not None:
+        event["retryAfter"] = retry_after(error)
+    return event
+
+
+async def _stream_analysis(prepared: PreparedInput) -> AsyncIterator[dict]:
+    """
+    Yields events in the order content becomes available:
+      pageSummary (per bullet), perspective (per object), bias,
+      then done (full validated payload) or error.
+    Early items are previews; "done" carries the authoritative result.
+    """
+    cached = await analysis_cache.get_async(prepared.cache_key)
+    source, signature = "hit", None
+    if cached is None:
+        source = "near"
+        signature, cached, _ = find_near_duplicate(prepared.text)
+    if cached is not None:
+        remember_served(prepared, cached, source)
+        for event in _replay_events(cached):
+            yield event
+        return
+
+    # Long documents: map step first, then stream the reduce call
+    merged = prepared.mode == "merged" and not prepared.chunks
+    build_messages = build_analysis_messages if merged else build_perspectives_messages
+    validate_output = validate_merged if merged else validate
+
+    sections_bias = None
+    if prepared.chunks:
         try:
-            messages = build_perspectives_messages(
-            title=clean_title,
-            url=url,
-            text=final_text
+            messages, sections_bias = await long_document_inputs(prepared)
+        except Exception as e:
+            yield _error_event(e)
+            return
+    else:
+        with stage_timer("prompt_build"):
+            messages = build_messages(
+                title=prepared.title,
+                url=prepared.url,
+                text=prepared.text
             )
+    queue: asyncio.Queue = asyncio.Queue()
 
-            # Run perspectives + bias in parallel
-            perspectives_task = asyncio.to_thread(
-                lambda: validate(complete(messages))
+    async def run_perspectives():
+        try:
+            scanner = IncrementalArrayScanner()
+            stage = "merged" if merged else "perspectives"
+            async for chunk in stream_async(messages, stage=stage):
+                for field, index, value in scanner.feed(chunk):
+                    if field == "pageSummary" and isinstance(value, str) and value.strip():
+                        queue.put_nowait(
+                            {"event": "pageSummary", "index": index, "text": value.strip()}
+                        )
+                    elif field == "perspectives" and isinstance(value, dict):
+                        queue.put_nowait({
+                            "event": "perspective",
+                            "index": index,
+                            "perspective": {
+                                "label": str(value.get("label", "")).strip(),
+                                "body": str(value.get("body", "")).strip(),
+                            },
+                        })
+            # Retry (if needed) is non-streamed; "done" replaces the preview
+            return await validated_stage(
+                stage,
+                messages,
+                validate_output,
+                raw=scanner.text,
             )
+        finally:
+            queue.put_nowait(None)
 
-            bias_task = asyncio.to_thread(
-                detect_bias, clean_title, url, final_text
-            )
+    async def run_bias():
+        try:
+            bias = sections_bias
+            if bias is None:
+                bias = await timed_bias(prepared.title, prepared.url, prepared.text)
+            queue.put_nowait({"event": "bias", "bias": bias})
+            return bias
+        finally:
+            queue.put_nowait(None)
 
-            perspectives_result, bias = await asyncio.gather(
-                perspectives_task,
-                bias_task
-            )
+    tasks = [asyncio.ensure_future(run_perspectives())]
+    if not merged:
+        tasks.append(asyncio.ensure_future(run_bias()))
+    try:
+        pending = len(tasks)
+        while pending:
+            event = await queue.get()
+            if event is None:
+                pending -= 1
+                continue
+            yield event
+
+        perspectives_result = tasks[0].result()
+        if merged:
+            bias = perspectives_result["bias"]
+            yield {"event": "bias", "bias": bias}
+        else:
+            bias = tasks[1].result()
+        result = to_payload(perspectives_result, bias)
 
-            payload = {
-                "perspectives": perspectives_result["perspectives"],
-                "bias": bias
-            }
-            if "pageSummary" in perspectives_result:
-                payload["pageSummary"] = perspectives_result["pageSummary"]
-            return payload
-
-        except ValidationError:
-            raise HTTPException(
-                status_code=422, detail=f"LLM output failed validation: {str(e)}"
-            )
-    except LLMServiceError as e:
-        log.exception("LLM service error (502)")
-        raise HTTPException(status_code=502, detail=f"LLM service error: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected server error: {str(e)}")
+        yield _error_event(e)
+        return
+    finally:
+        # Client went away or we failed: stop paying for the LLM calls
+        for task in tasks:
+            task.cancel()
+
+    store_result(prepared.cache_key, signature, result)
+    remember_served(prepared, result, "leader")
+    yield {"event": "done", "result": result}
+
+
+def _format_event(event: dict, sse: bool) -> str:
+    data = dumps_str(event)
+    if sse:
+        return f"event: {event['event']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+@router.post("/stream")
+async def analyze_content_stream(payload: dict, request: Request):
+    """
+    Streaming analyze. NDJSON by default (one event object per line);
+    Server-Sent Events when the client sends Accept: text/event-stream.
+    """
+    prepared = _prepare_or_400(payload)
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def body():
+        async for event in _stream_analysis(prepared):
+            if event["event"] == "done":
+                # What a later GET lookup needs to revalidate this result
+                event["fingerprint"] = prepared.cache_key
+                event["etag"] = etag_for(dumps(event["result"]))
+            yield _format_event(event, sse)
+
+    headers = {"Cache-Control": "no-cache"}
+    if prepared.degraded:
+        headers["X-Prism-Degraded"] = "budget"
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers=headers,
+    )
+
+
+# ---------------------------------------------------------------------------
+# BATCH VARIANT
+# ---------------------------------------------------------------------------
+
+async def _batch_results(
+    items: list, concurrency: int, item_seconds: float, stats: dict
+) -> AsyncIterator[dict]:
+    """
+    Yields one {"index", "status", "cache", "fingerprint", "etag", "result"}
+    (or {"index", "status", "error"}) record per item, in completion order. Items with
+    the same content fingerprint are analyzed once and share the outcome;
+    at most `concurrency` unique items run at a time, each under its own
+    deadline `item_seconds` from when it starts.
+    """
+    groups: Dict[str, Tuple[PreparedInput, List[int]]] = {}
+    for index, item in enumerate(items):
+        try:
+            prepared = prepare_input(item)
+        except InputError as e:
+            yield {"index": index, "status": 400, "error": str(e)}
+            continue
+        groups.setdefault(prepared.cache_key, (prepared, []))[1].append(index)
+
+    stats["unique"] = len(groups)
+    stats["deduped"] = sum(len(indices) - 1 for _, indices in groups.values())
+
+    pending: asyncio.Queue = asyncio.Queue()
+    for group in groups.values():
+        pending.put_nowait(group)
+    done: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        try:
+            while not pending.empty():
+                prepared, indices = pending.get_nowait()
+                try:
+                    # The request-wide deadline would starve the items queued
+                    # behind the first `concurrency` ones
+                    with fresh_deadline_scope(item_seconds):
+                        result, source, _ = await analyze(prepared)
+                    outcome = {
+                        "status": 200,
+                        "cache": source,
+                        "fingerprint": prepared.cache_key,
+                        # Same validator the single-item response sends
+                        "etag": etag_for(dumps(result)),
+                        "result": result,
+                    }
+                except Exception as e:
+                    status, detail = error_status(e)
+                    if status == 502:
+                        log.error("LLM service error (502) in batch: %s", e)
+                    outcome = {"status": status, "error": detail}
+                    if retry_after(e) is not None:
+                        outcome["retryAfter"] = retry_after(e)
+                for n, index in enumerate(indices):
+                    record = {"index": index, **outcome}
+                    if n and "cache" in record:
+                        # Duplicate of an earlier item in this batch
+                        record["cache"] = "batch"
+                    done.put_nowait(record)
+        finally:
+            done.put_nowait(None)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(concurrency, len(groups)))]
+    try:
+        running = len(workers)
+        while running:
+            record = await done.get()
+            if record is None:
+                running -= 1
+                continue
+            yield record
+    finally:
+        # Client went away or we failed: stop paying for the LLM calls
+        for task in workers:
+            task.cancel()
+
+
+@router.post("/batch")
+async def analyze_batch(payload: dict, request: Request):
+    """
+    Analyze many articles (e.g. a homepage or feed) in one request.
+
+    Body: {"items": [{url, title, text}, ...], "concurrency": n (optional,
+    capped at PRISM_BATCH_CONCURRENCY), "stream": bool (optional)}.
+
+    X-Prism-Deadline-Ms (or "deadlineMs") is a per-item budget, counted
+    from when each item starts; the batch as a whole has no deadline.
+
+    Returns {"results": [...], "stats": {...}}, one record per item in
+    input order. With "stream": true or Accept: application/x-ndjson each
+    record is written as an NDJSON line as soon as it completes, then a
+    final {"event": "done", "stats": {...}} line.
+    """
+    items = payload.get("items")
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="'items' must be a non-empty list")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400, detail=f"Batch too large: at most {BATCH_MAX_ITEMS} items"
+        )
+    concurrency = payload.get("concurrency", BATCH_CONCURRENCY)
+    if not isinstance(concurrency, int) or isinstance(concurrency, bool) or concurrency < 1:
+        raise HTTPException(status_code=400, detail="'concurrency' must be a positive integer")
+    concurrency = min(concurrency, BATCH_CONCURRENCY)
+    item_seconds = requested_seconds(request, payload)
+
+    stats = {"items": len(items), "concurrency": concurrency}
+    stream = payload.get("stream") is True or "application/x-ndjson" in request.headers.get(
+        "accept", ""
+    )
+
+    if stream:
+        async def body():
+            async for record in _batch_results(items, concurrency, item_seconds, stats):
+                yield dumps_str(record) + "\n"
+            yield dumps_str({"event": "done", "stats": stats}) + "\n"
+
+        return StreamingResponse(
+            body(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"}
+        )
+
+    results: List[Optional[dict]] = [None] * len(items)
+    async for record in _batch_results(items, concurrency, item_seconds, stats):
+        results[record["index"]] = record
+    return FastJSONResponse({"results": results, "stats": stats})
+
+
+@router.get("/cache")
+def cache_stats():
+    return {**analysis_cache.stats(), "singleFlight": flights.stats()}
+
+
+@router.get("/stats")
+def get_pipeline_stats():
+    return pipeline_stats()
+
+
+# ---------------------------------------------------------------------------
+# LOOKUP (REVALIDATION)
+# ---------------------------------------------------------------------------
+
+def _stored_response(request: Request, fingerprint: str, result: dict) -> Response:
+    body = dumps(result)
+    etag = etag_for(body)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={ANALYSIS_MAX_AGE_SECONDS}",
+        "X-Prism-Fingerprint": fingerprint,
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@router.get("/")
+async def lookup_analysis(request: Request, url: Optional[str] = None):
+    """
+    The analysis last served for the page at ?url= (canonicalized: no
+    fragment or tracking parameters). 404 if there is none (never analyzed,
+    or expired): POST the article instead.
+    """
+    if not url:
+        raise HTTPException(status_code=400, detail="'url' query parameter is required")
+    fingerprint, result = await lookup_url(url)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No stored analysis for this URL")
+    return _stored_response(request, fingerprint, result)
+
+
+# Declared last: "/{fingerprint}" would otherwise shadow /cache and /stats
+@router.get("/{fingerprint}")
+async def get_analysis(fingerprint: str, request: Request):
+    """
+    A stored analysis by the fingerprint returned with it (X-Prism-Fingerprint
+    header, "fingerprint" in stream / batch results).
+    """
+    result = await stored_analysis(fingerprint) if _FINGERPRINT_RE.match(fingerprint) else None
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired analysis")
+    return _stored_response(request, fingerprint, result)
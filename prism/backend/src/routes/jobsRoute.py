@@ -0,0 +1,94 @@
+# =============================================================================
+# FILE PURPOSE
+# =============================================================================
+#
+# Asynchronous analyze jobs: submit an article, get a job id back right
+# away, poll for the analysis. Used to pre-warm popular pages before users
+# open them and for analyses that take longer than a client will wait.
+#
+# =============================================================================
+# INTEGRATION NOTES
+# =============================================================================
+#
+# - Jobs are stored by services/jobQueue.py (SQLite, survives restarts) and
+#   run by its WorkerPool, started and stopped by server.py's lifespan.
+# - Each job runs logic/analysisPipeline.py, so a finished job also fills
+#   the analysis cache: a later POST /api/analyze for the page is a hit.
+# - Submissions are deduplicated by content fingerprint.
+#
+# =============================================================================
+
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Response
+
+from src.logic.analysisPipeline import (
+    InputError,
+    analyze,
+    error_status,
+    prepare_input,
+    retry_after,
+)
+from src.services.jobQueue import JobError, WorkerPool, job_queue
+from src.services.usageTracker import usage_route
+from src.utils.deadline import DEFAULT_DEADLINE_SECONDS, deadline_scope
+from src.utils.metrics import register_collector
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+_tag_usage = usage_route("jobs")
+
+
+async def _run_job(payload: dict) -> dict:
+    # Runs in a worker task, outside any request: tag LLM usage here
+    await _tag_usage()
+    try:
+        with deadline_scope(DEFAULT_DEADLINE_SECONDS):
+            result, _, _ = await analyze(prepare_input(payload))
+    except InputError as e:
+        raise JobError(str(e), 400, permanent=True)
+    except Exception as e:
+        status, detail = error_status(e)
+        # Rate limited / circuit open: don't retry before the provider recovers
+        raise JobError(detail, status, retry_after=retry_after(e) or 0)
+    return result
+
+
+job_workers = WorkerPool(job_queue, _run_job)
+
+register_collector(job_workers.metric_samples)
+
+
+@router.post("/", status_code=202)
+async def submit_job(payload: dict, response: Response):
+    """
+    Queue an analysis of {url, title, text}. Returns the job (id, status);
+    an article already queued, running or finished returns that job.
+    """
+    try:
+        prepared = prepare_input(payload)
+    except InputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = await asyncio.to_thread(
+        job_queue.submit,
+        prepared.cache_key,
+        {"url": payload["url"], "title": payload["title"], "text": payload["text"]},
+    )
+    job_workers.wake()
+    response.headers["Location"] = f"{router.prefix}/{job['id']}"
+    return job
+
+
+@router.get("/stats")
+async def job_stats():
+    stats = await asyncio.to_thread(job_queue.stats)
+    return {**stats, "workers": job_workers.stats()}
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
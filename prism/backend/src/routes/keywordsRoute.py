@@ -1,36 +1,97 @@
-from fastapi import APIRouter, HTTPException
-from src.services.llmService import complete
-import json
+import asyncio
 
-router = APIRouter(prefix="/api/keywords", tags=["keywords"])
+from fastapi import APIRouter, Depends, HTTPException
+from src.logic.analysisPipeline import error_headers, error_status
+from src.services.llmService import complete_async, LLMServiceError
+from src.services.resultCache import ResultCache, content_fingerprint
+from src.services.sharedCache import shared_cache
+from src.services.usageTracker import usage_route
+from src.utils.deadline import request_deadline
+from src.utils.jsonCodec import loads
+from src.utils.metrics import register_collector
 
-@router.post("/")
-async def generate_keywords(payload: dict):
-    label = payload.get("label")
-    body = payload.get("body")
-    title = payload.get("title")
+router = APIRouter(
+    prefix="/api/keywords",
+    tags=["keywords"],
+    dependencies=[Depends(usage_route("keywords")), Depends(request_deadline)],
+)
 
-    if not label or not body:
-        raise HTTPException(status_code=400, detail="Missing fields")
+# Keywords depend only on (label, body, title); reopening a perspective or
+# re-analyzing the same page should not cost another LLM call
+keywords_cache = ResultCache(shared=shared_cache, namespace="keywords")
 
-    messages = [
-        {
-            "role": "system",
-            "content": """You generate short search phrases to explore a viewpoint further.
-Return valid JSON only.
+register_collector(lambda: keywords_cache.metric_samples("keywords"))
 
-Structure:
-{
-  "keywords": ["phrase 1", "phrase 2", "phrase 3"]
-}
+MAX_BATCH_PERSPECTIVES = 12
 
+KEYWORDS_RULES = """
 Rules:
 - 3–5 phrases
 - Not full sentences
 - Useful for Google search
 - Concrete and specific
 """
-        },
+
+# Static system instructions, built once (cacheable provider-side prefix)
+KEYWORDS_SYSTEM_PROMPT = """You generate short search phrases to explore a viewpoint further.
+Return valid JSON only.
+
+Structure:
+{
+  "keywords": ["phrase 1", "phrase 2", "phrase 3"]
+}
+""" + KEYWORDS_RULES
+
+KEYWORDS_BATCH_SYSTEM_PROMPT = """You generate short search phrases to explore several viewpoints further.
+Return valid JSON only.
+
+Structure (one inner array per perspective, in the given order):
+{
+  "keywords": [
+    ["phrase 1", "phrase 2", "phrase 3"],
+    ["phrase 1", "phrase 2", "phrase 3"]
+  ]
+}
+""" + KEYWORDS_RULES
+
+
+def _llm_http_error(e: LLMServiceError) -> HTTPException:
+    status, detail = error_status(e)
+    return HTTPException(status_code=status, detail=detail, headers=error_headers(e))
+
+
+def _is_text(value) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+
+def _keywords_key(label: str, body: str, title: str) -> str:
+    return content_fingerprint(label, body, title or "")
+
+
+def _clean_keywords(keywords) -> list:
+    if not isinstance(keywords, list):
+        return []
+    return [k.strip() for k in keywords if isinstance(k, str) and k.strip()][:5]
+
+
+@router.post("/")
+async def generate_keywords(payload: dict):
+    label = payload.get("label")
+    body = payload.get("body")
+    title = payload.get("title")
+
+    if not _is_text(label) or not _is_text(body):
+        raise HTTPException(status_code=400, detail="Missing fields")
+    if title is not None and not isinstance(title, str):
+        raise HTTPException(status_code=400, detail="title must be a string")
+
+    cache_key = _keywords_key(label, body, title)
+    cached = await keywords_cache.get_async(cache_key)
+    if cached is not None:
+        return {"keywords": cached}
+
+    messages = [
+        {"role": "system", "content": KEYWORDS_SYSTEM_PROMPT},
         {
             "role": "user",
             "content": f"""
@@ -43,13 +104,92 @@ Generate keywords.
         }
     ]
 
-    raw = complete(messages, temperature=0.3)
+    try:
+        raw = await complete_async(messages, temperature=0.3, stage="keywords")
+    except LLMServiceError as e:
+        raise _llm_http_error(e)
 
     try:
-        parsed = json.loads(raw)
-        keywords = parsed.get("keywords", [])
-        if not isinstance(keywords, list):
-            keywords = []
-        return {"keywords": keywords[:5]}
-    except:
+        parsed = loads(raw)
+        keywords = _clean_keywords(parsed.get("keywords", []))
+    except (ValueError, AttributeError):
         return {"keywords": []}
+
+    if keywords:
+        keywords_cache.put(cache_key, keywords)
+    return {"keywords": keywords}
+
+
+@router.post("/batch")
+async def generate_keywords_batch(payload: dict):
+    """
+    Keywords for every perspective of an analysis in one LLM call.
+
+    Body:     {"title": "...", "perspectives": [{"label": "...", "body": "..."}, ...]}
+    Response: {"keywords": [["phrase", ...], ...]}  (same order as input)
+    """
+    title = payload.get("title")
+    perspectives = payload.get("perspectives")
+
+    if not isinstance(perspectives, list) or not perspectives:
+        raise HTTPException(status_code=400, detail="Missing fields")
+    if title is not None and not isinstance(title, str):
+        raise HTTPException(status_code=400, detail="title must be a string")
+    if len(perspectives) > MAX_BATCH_PERSPECTIVES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_PERSPECTIVES} perspectives per batch",
+        )
+    for p in perspectives:
+        if not isinstance(p, dict) or not _is_text(p.get("label")) or not _is_text(p.get("body")):
+            raise HTTPException(status_code=400, detail="Missing fields")
+
+    keys = [_keywords_key(p["label"], p["body"], title) for p in perspectives]
+    results = list(await asyncio.gather(*(keywords_cache.get_async(key) for key in keys)))
+    missing = [i for i, cached in enumerate(results) if cached is None]
+
+    if missing:
+        listing = "\n".join(
+            f"{n + 1}. Perspective label: {perspectives[i]['label']}\n"
+            f"   Perspective body: {perspectives[i]['body']}"
+            for n, i in enumerate(missing)
+        )
+        messages = [
+            {"role": "system", "content": KEYWORDS_BATCH_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"""
+Article title: {title}
+
+Perspectives ({len(missing)}):
+{listing}
+
+Generate keywords for each perspective.
+"""
+            }
+        ]
+
+        try:
+            raw = await complete_async(messages, temperature=0.3, stage="keywords_batch")
+        except LLMServiceError as e:
+            raise _llm_http_error(e)
+
+        try:
+            groups = loads(raw).get("keywords", [])
+        except (ValueError, AttributeError):
+            groups = []
+        if not isinstance(groups, list):
+            groups = []
+
+        for n, i in enumerate(missing):
+            keywords = _clean_keywords(groups[n]) if n < len(groups) else []
+            if keywords:
+                keywords_cache.put(keys[i], keywords)
+            results[i] = keywords
+
+    return {"keywords": results}
+
+
+@router.get("/cache")
+def cache_stats():
+    return keywords_cache.stats()
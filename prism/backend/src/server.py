@@ -36,17 +36,87 @@
 #
 # =============================================================================
 
-from fastapi import FastAPI
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from src.routes.analyzeRoute import router as analyze_router
 from src.routes.keywordsRoute import router as keywords_router
+from src.routes.jobsRoute import router as jobs_router, job_workers
+from src.services.llmService import init_provider
+from src.services.jobQueue import runs_job_workers
+from src.utils.compression import CompressionMiddleware
+from src.utils.jsonCodec import FastJSONResponse
+from src.utils.metrics import (
+    Histogram,
+    render_prometheus,
+    server_timing_header,
+    start_request_timings,
+)
+
+
+# When the LLM provider (and its SDK) is built:
+#   "background" (default): in a thread right after boot, so the worker
+#                           accepts traffic immediately
+#   "eager":   before the worker accepts traffic
+#   "lazy":    on the first LLM call
+PROVIDER_INIT = os.getenv("PRISM_PROVIDER_INIT", "background").lower()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup = None
+    if PROVIDER_INIT == "eager":
+        await asyncio.to_thread(init_provider)
+    elif PROVIDER_INIT == "background":
+        warmup = asyncio.ensure_future(asyncio.to_thread(init_provider))
+    # Background analyze jobs (PRISM_JOB_WORKERS per process, in the
+    # processes PRISM_JOB_RUNNER selects)
+    if job_workers.workers > 0 and runs_job_workers():
+        job_workers.start()
+    yield
+    await job_workers.stop()
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+
 
+# orjson when installed (utils/jsonCodec.py)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
-app = FastAPI()
+# gzip / brotli for complete bodies; streams pass through (utils/compression.py).
+# Added before timing_middleware so it runs inside it: BaseHTTPMiddleware
+# re-sends every body as a stream, which would look uncompressible here
+app.add_middleware(CompressionMiddleware)
+
+HTTP_SECONDS = Histogram(
+    "prism_http_request_duration_seconds", "HTTP request duration by route."
+)
+
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    timings = start_request_timings()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    # Label by route template, not raw path, to keep cardinality bounded
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    HTTP_SECONDS.observe(
+        elapsed, method=request.method, route=path, status=str(response.status_code)
+    )
+    response.headers["Server-Timing"] = server_timing_header(timings, total=elapsed)
+    return response
 
 app.include_router(analyze_router)
 app.include_router(keywords_router)
+app.include_router(jobs_router)
 
 
 app.add_middleware(
@@ -55,9 +125,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Prism-Cache", "X-Prism-Coalesced", "X-Prism-Degraded",
+                    "X-Prism-Similarity", "X-Prism-Fingerprint", "ETag", "Server-Timing",
+                    "Retry-After", "Content-Encoding"],
 )
 
 
 @app.get("/")
 def root():
     return {"status": "ok"}
+
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(
+        render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,311 @@
+"""
+ * =============================================================================
+ * FILE PURPOSE
+ * =============================================================================
+ *
+ * Local, network-free LLM provider. Returns schema-valid canned JSON for the
+ * perspectives, bias, keywords and long-document section prompts so the whole backend can run
+ * without a Gemini key (local dev, load tests, benchmarks).
+ *
+ * Select it with PRISM_LLM_PROVIDER=fake, or install an instance with
+ * llmService.set_provider(FakeProvider(...)).
+ *
+ * Knobs for benchmarks (all deterministic for a given seed):
+ * - latency / jitter: per-call delay = latency ± uniform(jitter) seconds
+ * - malformed_rate: fraction of responses corrupted (truncated, fenced
+ *   with trailing commas, or not JSON at all)
+ * - prefill_per_1k_tokens: extra delay per 1k uncached input tokens
+ * - rate_limit_rate: fraction of calls rejected with a 429 (Gemini-style
+ *   RESOURCE_EXHAUSTED with a retryDelay of retry_after seconds)
+ * - quota_per_second: calls beyond this many per wall-clock second get a
+ *   429, like a real provider quota (0 = unlimited)
+ * - spike_rate / spike_latency: fraction of calls that take spike_latency
+ *   seconds instead of the normal delay
+ * - error_rate: fraction of calls failing with a 503 UNAVAILABLE
+ *
+ * Multi-model stand-in for routing (services/modelRouter.py): `models`
+ * maps extra model names to knob overrides, e.g.
+ *   FakeProvider(model="fake-pro", latency=2.0,
+ *                models={"fake-lite": {"latency": 0.2, "error_rate": 0.1}})
+ * serves "fake-pro" itself and "fake-lite" from a sibling provider with
+ * its own counters (calls_by_model()).
+ *
+ * Stands in for a provider context cache: the first call with a given
+ * system instruction registers it, later calls reuse it. Reused prefixes
+ * are reported as cached tokens and tallied in prefix_stats.
+ *
+ * =============================================================================
+ """
+
+import asyncio
+import copy
+import hashlib
+import json
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from ..utils.truncation import estimate_tokens
+from .llmService import LLMProvider, report_usage
+
+
+class FakeRateLimitError(Exception):
+    """Shaped like google.genai's ClientError for a 429."""
+
+    code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            "429 RESOURCE_EXHAUSTED. {'error': {'code': 429, 'message': 'Quota exceeded.', "
+            f"'status': 'RESOURCE_EXHAUSTED', 'details': [{{'retryDelay': '{retry_after:g}s'}}]}}}}"
+        )
+
+
+class FakeServerError(Exception):
+    """Shaped like google.genai's ServerError for a 503."""
+
+    code = 503
+
+    def __init__(self, model: str):
+        super().__init__(
+            f"503 UNAVAILABLE. {{'error': {{'code': 503, 'message': 'The model {model} is "
+            "overloaded.', 'status': 'UNAVAILABLE'}}"
+        )
+
+
+class FakeProvider(LLMProvider):
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        chunk_size: int = 48,
+        jitter: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: int = 0,
+        prefill_per_1k_tokens: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 0.0,
+        quota_per_second: int = 0,
+        spike_rate: float = 0.0,
+        spike_latency: float = 0.0,
+        error_rate: float = 0.0,
+        model: str = "fake",
+        models: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.jitter = jitter
+        self.malformed_rate = malformed_rate
+        self.prefill_per_1k_tokens = prefill_per_1k_tokens
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.quota_per_second = quota_per_second
+        self.spike_rate = spike_rate
+        self.spike_latency = spike_latency
+        self.error_rate = error_rate
+        self.model = model
+        self._seed = seed
+        self._reset(random.Random(seed))
+
+        # Extra model name -> knob overrides; siblings share both dicts
+        self._profiles: Dict[str, Dict[str, Any]] = dict(models or {})
+        for profile in self._profiles.values():
+            unknown = [key for key in profile if key.startswith("_") or not hasattr(self, key)]
+            if unknown:
+                raise ValueError(f"Unknown FakeProvider knobs: {unknown}")
+        self._siblings: Dict[str, "FakeProvider"] = {model: self}
+
+    def _reset(self, rng: random.Random) -> None:
+        """Fresh counters, simulated caches and random stream."""
+        self._rng = rng
+        self.calls = 0
+        self.malformed = 0
+        self.rate_limited = 0
+        self.spikes = 0
+        self.errors = 0
+
+        # (wall-clock second, calls admitted in it) for quota_per_second
+        self._quota_window = (0, 0)
+
+        # sha256(system) -> reuse count
+        self._prefixes: Dict[str, int] = {}
+        self.prefix_stats = {"hits": 0, "misses": 0, "reusedBytes": 0, "promptBytes": 0}
+
+    # -----------------------------------------------------------------------
+    # Models
+    # -----------------------------------------------------------------------
+
+    def supports(self, model: str) -> bool:
+        return model in self._siblings or model in self._profiles
+
+    def for_model(self, model: str) -> "FakeProvider":
+        sibling = self._siblings.get(model)
+        if sibling is None:
+            sibling = copy.copy(self)
+            sibling.model = model
+            for key, value in self._profiles[model].items():
+                setattr(sibling, key, value)
+            sibling._reset(random.Random(f"{self._seed}:{model}"))
+            self._siblings[model] = sibling
+        return sibling
+
+    def calls_by_model(self) -> Dict[str, int]:
+        return {model: provider.calls for model, provider in self._siblings.items()}
+
+    # -----------------------------------------------------------------------
+    # Canned responses (picked by sniffing the prompt)
+    # -----------------------------------------------------------------------
+
+    def respond(self, prompt: str) -> str:
+        if "one section of a longer article" in prompt:
+            section = prompt.rsplit('"""', 2)[-2].strip() if prompt.count('"""') >= 2 else ""
+            first = section.split(". ")[0][:160]
+            return json.dumps({
+                "points": [first or "The section continues the story.", "Officials responded."],
+                "stakeholders": ["Residents", "City officials"],
+                "indicators": ["Loaded language"] if "!" in section else ["Authority emphasis"],
+            })
+
+        if "framing analyst" in prompt and "perspective-expansion" not in prompt:
+            return json.dumps({"indicators": ["Emotional framing", "Loaded language"]})
+
+        if "search phrases" in prompt:
+            phrases = ["local impact analysis", "policy history", "expert reactions"]
+            batch = re.search(r"Perspectives \((\d+)\):", prompt)
+            if batch:
+                return json.dumps({"keywords": [phrases] * int(batch.group(1))})
+            return json.dumps({"keywords": phrases})
+
+        analysis = {
+            "pageSummary": [
+                "The article covers a local policy change.",
+                "Officials announced the change this week.",
+                "Residents may see effects within months.",
+            ],
+            "perspectives": [
+                {
+                    "label": "How a small business owner would view this",
+                    "body": "A small business owner would weigh the change against costs. They may worry about uncertainty.",
+                },
+                {
+                    "label": "Experience of a renter in the affected area",
+                    "body": "A renter would focus on how daily expenses shift. Stability matters most to them.",
+                },
+                {
+                    "label": "View of a frontline city worker",
+                    "body": "A city worker would see the practical rollout. They may anticipate new workload.",
+                },
+                {
+                    "label": "How a retired long-time resident would feel",
+                    "body": "A retiree might compare this with past decisions. They could feel unheard or reassured.",
+                },
+            ],
+        }
+
+        # Merged mode asks for bias indicators in the same response
+        if "BIAS INDICATOR REQUIREMENTS" in prompt:
+            analysis["bias"] = {"indicators": ["Emotional framing", "Loaded language"]}
+
+        return json.dumps(analysis)
+
+    def _delay(self) -> float:
+        if self.spike_rate and self._rng.random() < self.spike_rate:
+            self.spikes += 1
+            return self.spike_latency
+        if not self.jitter:
+            return self.latency
+        return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    def _check_quota(self) -> None:
+        """Raise a 429 for injected or over-quota calls."""
+        if self.quota_per_second:
+            second = int(time.time())
+            window, used = self._quota_window
+            used = used + 1 if window == second else 1
+            self._quota_window = (second, used)
+            if used > self.quota_per_second:
+                self.rate_limited += 1
+                raise FakeRateLimitError(self.retry_after)
+        if self.rate_limit_rate and self._rng.random() < self.rate_limit_rate:
+            self.rate_limited += 1
+            raise FakeRateLimitError(self.retry_after)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors += 1
+            raise FakeServerError(self.model)
+
+    def _reuse_prefix(self, system: Optional[str]) -> int:
+        """Register / look up the system prefix; returns reused bytes."""
+        if not system:
+            return 0
+        key = hashlib.sha256(system.encode("utf-8")).hexdigest()
+        if key not in self._prefixes:
+            self._prefixes[key] = 0
+            self.prefix_stats["misses"] += 1
+            return 0
+        self._prefixes[key] += 1
+        self.prefix_stats["hits"] += 1
+        reused = len(system.encode("utf-8"))
+        self.prefix_stats["reusedBytes"] += reused
+        return reused
+
+    def _call(self, prompt: str, system: Optional[str]) -> Tuple[str, float]:
+        """Returns (output text, total delay) and reports usage."""
+        self.calls += 1
+        self._check_quota()
+        system_tokens = estimate_tokens(system) if system else 0
+        prompt_tokens = system_tokens + estimate_tokens(prompt)
+        self.prefix_stats["promptBytes"] += len(((system or "") + prompt).encode("utf-8"))
+        cached_tokens = system_tokens if self._reuse_prefix(system) else 0
+
+        text = self._corrupt(self.respond((system or "") + "\n" + prompt))
+        report_usage(prompt_tokens, estimate_tokens(text), cached_tokens)
+
+        prefill = self.prefill_per_1k_tokens * (prompt_tokens - cached_tokens) / 1000
+        return text, self._delay() + prefill
+
+    def _corrupt(self, text: str) -> str:
+        if self.malformed_rate and self._rng.random() < self.malformed_rate:
+            self.malformed += 1
+            kind = self._rng.randrange(3)
+            if kind == 0:
+                # Truncated generation
+                return text[: self._rng.randint(len(text) // 2, len(text) - 1)]
+            if kind == 1:
+                # Markdown fence + trailing comma
+                return "```json\n" + text[:-1] + ",}\n```"
+            return "I'm sorry, I can't produce JSON for this content."
+        return text
+
+    # -----------------------------------------------------------------------
+    # LLMProvider
+    # -----------------------------------------------------------------------
+
+    def generate(self, prompt: str, temperature: float, system: Optional[str] = None) -> str:
+        text, delay = self._call(prompt, system)
+        if delay:
+            time.sleep(delay)
+        return text
+
+    async def generate_async(
+        self, prompt: str, temperature: float, system: Optional[str] = None
+    ) -> str:
+        text, delay = self._call(prompt, system)
+        if delay:
+            await asyncio.sleep(delay)
+        return text
+
+    async def generate_stream(
+        self, prompt: str, temperature: float, system: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        text, delay = self._call(prompt, system)
+        chunks = [
+            text[i : i + self.chunk_size] for i in range(0, len(text), self.chunk_size)
+        ]
+        # Spread the configured latency over the chunks, like token streaming
+        delay = delay / len(chunks) if chunks else 0.0
+        for chunk in chunks:
+            if delay:
+                await asyncio.sleep(delay)
+            yield chunk
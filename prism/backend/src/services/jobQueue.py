@@ -0,0 +1,496 @@
+"""
+ * =============================================================================
+ * FILE PURPOSE
+ * =============================================================================
+ *
+ * Persistent background job queue. Clients submit work (e.g. pre-warming
+ * the analysis of a popular page), get a job id back immediately and poll
+ * for the result; a pool of async workers in the server process runs the
+ * jobs.
+ *
+ * - Jobs live in a local SQLite file (WAL), so queued and finished jobs
+ *   survive restarts, and several server processes can share one file.
+ * - Dedup: submitting a key that already has a queued, running or finished
+ *   (not yet expired) job returns that job instead of a new one.
+ * - Leases: a claimed job is leased to its worker, and the lease is renewed
+ *   while it runs. If the process dies, the lease lapses and another
+ *   worker picks the job up again.
+ * - Retries: failed attempts are re-queued with exponential backoff up to
+ *   max_attempts; errors marked permanent fail immediately.
+ * - Expiry: jobs not started within the TTL expire, and finished jobs are
+ *   purged one TTL after they finish.
+ *
+ * Env (prism/.env or process env):
+ *   PRISM_JOB_DB                 SQLite path (default backend/data/jobs.sqlite3)
+ *   PRISM_JOB_WORKERS            workers per server process (default 2, 0 = none)
+ *   PRISM_JOB_RUNNER             which server processes run workers:
+ *                                on (default, every process), off (web only:
+ *                                submit and poll), single (one process per
+ *                                host, elected by a lock file next to the DB)
+ *   PRISM_JOB_MAX_ATTEMPTS       default 3
+ *   PRISM_JOB_RETRY_SECONDS      first retry delay, doubled per attempt (default 5)
+ *   PRISM_JOB_LEASE_SECONDS      default 60
+ *   PRISM_JOB_TTL_SECONDS        default 86400
+ *
+ * =============================================================================
+ """
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+
+DEFAULT_DB_PATH = os.getenv(
+    "PRISM_JOB_DB", str(Path(__file__).resolve().parents[2] / "data" / "jobs.sqlite3")
+)
+DEFAULT_WORKERS = int(os.getenv("PRISM_JOB_WORKERS", "2"))
+JOB_RUNNER = os.getenv("PRISM_JOB_RUNNER", "on").lower()
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("PRISM_JOB_MAX_ATTEMPTS", "3"))
+DEFAULT_RETRY_SECONDS = float(os.getenv("PRISM_JOB_RETRY_SECONDS", "5"))
+DEFAULT_LEASE_SECONDS = float(os.getenv("PRISM_JOB_LEASE_SECONDS", "60"))
+DEFAULT_TTL_SECONDS = float(os.getenv("PRISM_JOB_TTL_SECONDS", "86400"))
+
+STATUSES = ("queued", "running", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            TEXT PRIMARY KEY,
+    dedup_key     TEXT NOT NULL,
+    status        TEXT NOT NULL,
+    payload       TEXT NOT NULL,
+    result        TEXT,
+    error         TEXT,
+    error_status  INTEGER,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    max_attempts  INTEGER NOT NULL,
+    claim         TEXT,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    available_at  REAL NOT NULL,
+    lease_until   REAL,
+    expires_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, status);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (claim);
+"""
+
+
+class JobError(Exception):
+    """
+    Raised by a job handler. status is the HTTP-style status reported to
+    pollers; permanent errors (bad input) are not retried, and retry_after
+    (seconds) delays the next attempt beyond the normal backoff.
+    """
+
+    def __init__(
+        self, message: str, status: int = 500, permanent: bool = False, retry_after: float = 0
+    ):
+        super().__init__(message)
+        self.status = status
+        self.permanent = permanent
+        self.retry_after = retry_after
+
+
+# ---------------------------------------------------------------------------
+# STORAGE
+# ---------------------------------------------------------------------------
+
+class JobQueue:
+    """Thread-safe SQLite-backed job store. All methods are blocking."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_DB_PATH,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retry_seconds: float = DEFAULT_RETRY_SECONDS,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.lease_seconds = lease_seconds
+        self.ttl_seconds = ttl_seconds
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.deduplicated = 0
+        self.outcomes = {"done": 0, "retried": 0, "failed": 0}
+        self.expired = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use so importing the app never touches the disk
+        if self._conn is None:
+            if self.path != ":memory:":
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None, check_same_thread=False
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def submit(self, dedup_key: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a job unless one with the same key is queued, running or
+        finished and unexpired. Returns the job view, with "deduplicated".
+        """
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                deduplicated = True
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE dedup_key = ? AND expires_at > ?"
+                    " AND status IN ('queued', 'running', 'done')"
+                    " ORDER BY created_at DESC LIMIT 1",
+                    (dedup_key, now),
+                ).fetchone()
+                if row is None:
+                    deduplicated = False
+                    job_id = uuid.uuid4().hex
+                    db.execute(
+                        "INSERT INTO jobs (id, dedup_key, status, payload, max_attempts,"
+                        " created_at, updated_at, available_at, expires_at)"
+                        " VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?)",
+                        (job_id, dedup_key, json.dumps(payload), self.max_attempts,
+                         now, now, now, now + self.ttl_seconds),
+                    )
+                    row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+            if deduplicated:
+                self.deduplicated += 1
+            else:
+                self.submitted += 1
+        return {**_view(row), "deduplicated": deduplicated}
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or (row["status"] != "running" and row["expires_at"] <= time.time()):
+            return None
+        return _view(row)
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest ready job (queued and due, or running with a lapsed
+        lease) to the caller. Returns {"id", "payload", "attempts"} or None.
+        """
+        now = time.time()
+        claim = uuid.uuid4().hex
+        with self._lock:
+            db = self._db()
+            # One statement: atomic across processes sharing the file
+            db.execute(
+                "UPDATE jobs SET status = 'running', claim = ?, attempts = attempts + 1,"
+                " lease_until = ?, updated_at = ?"
+                " WHERE id = (SELECT id FROM jobs WHERE expires_at > ? AND"
+                " ((status = 'queued' AND available_at <= ?)"
+                "  OR (status = 'running' AND lease_until < ?))"
+                " ORDER BY available_at LIMIT 1)",
+                (claim, now + self.lease_seconds, now, now, now, now),
+            )
+            row = db.execute("SELECT * FROM jobs WHERE claim = ?", (claim,)).fetchone()
+        if row is None:
+            return None
+        if row["attempts"] > row["max_attempts"]:
+            # Lease lapsed on the last attempt (worker died mid-run)
+            self.fail(row["id"], claim, JobError("Job lease expired", 500, permanent=True))
+            return self.claim()
+        return {"id": row["id"], "claim": claim, "payload": json.loads(row["payload"]),
+                "attempts": row["attempts"]}
+
+    def extend_lease(self, job_id: str, claim: str) -> bool:
+        with self._lock:
+            cur = self._db().execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND claim = ?",
+                (time.time() + self.lease_seconds, job_id, claim),
+            )
+        return cur.rowcount == 1
+
+    def complete(self, job_id: str, claim: str, result: Any) -> None:
+        now = time.time()
+        with self._lock:
+            cur = self._db().execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL,"
+                " error_status = NULL, claim = NULL, lease_until = NULL,"
+                " updated_at = ?, expires_at = ? WHERE id = ? AND claim = ?",
+                (json.dumps(result), now, now + self.ttl_seconds, job_id, claim),
+            )
+            if cur.rowcount:
+                self.outcomes["done"] += 1
+
+    def fail(self, job_id: str, claim: str, error: JobError) -> None:
+        """Re-queue with backoff, or fail for good if out of attempts."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND claim = ?",
+                (job_id, claim),
+            ).fetchone()
+            if row is None:
+                return  # lease lost to another worker
+            if error.permanent or row["attempts"] >= row["max_attempts"]:
+                db.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, error_status = ?,"
+                    " claim = NULL, lease_until = NULL, updated_at = ?, expires_at = ?"
+                    " WHERE id = ?",
+                    (str(error), error.status, now, now + self.ttl_seconds, job_id),
+                )
+                self.outcomes["failed"] += 1
+            else:
+                delay = max(self.retry_seconds * 2 ** (row["attempts"] - 1), error.retry_after)
+                db.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, error_status = ?,"
+                    " claim = NULL, lease_until = NULL, updated_at = ?, available_at = ?"
+                    " WHERE id = ?",
+                    (str(error), error.status, now, now + delay, job_id),
+                )
+                self.outcomes["retried"] += 1
+
+    def purge_expired(self) -> int:
+        """Drop jobs past their expiry, unless running under a live lease."""
+        now = time.time()
+        with self._lock:
+            cur = self._db().execute(
+                "DELETE FROM jobs WHERE expires_at <= ?"
+                " AND (status != 'running' OR lease_until < ?)",
+                (now, now),
+            )
+            self.expired += cur.rowcount
+        return cur.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"
+            ).fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jobs": self.counts(),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "outcomes": dict(self.outcomes),
+            "expired": self.expired,
+            "maxAttempts": self.max_attempts,
+            "ttlSeconds": self.ttl_seconds,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _view(row: sqlite3.Row) -> Dict[str, Any]:
+    job = {
+        "id": row["id"],
+        "status": row["status"],
+        "attempts": row["attempts"],
+        "createdAt": row["created_at"],
+        "updatedAt": row["updated_at"],
+    }
+    if row["status"] == "done":
+        job["result"] = json.loads(row["result"])
+    elif row["error"] is not None:
+        # Last error; for a queued job this is the attempt being retried
+        job["error"] = {"status": row["error_status"], "detail": row["error"]}
+    return job
+
+
+# ---------------------------------------------------------------------------
+# WORKERS
+# ---------------------------------------------------------------------------
+
+class WorkerPool:
+    """
+    Async workers that claim jobs from a JobQueue and run handler(payload).
+    Database calls run in threads so the event loop never blocks on disk.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+        workers: int = DEFAULT_WORKERS,
+        poll_seconds: float = 1.0,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._wake: Optional[asyncio.Event] = None
+        self.busy = 0
+        self.busy_seconds = 0.0
+        self._started_at = 0.0
+
+    def start(self) -> None:
+        if self._tasks or self.workers <= 0:
+            return
+        self._wake = asyncio.Event()
+        self._started_at = time.perf_counter()
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._purge()))
+
+    async def stop(self) -> None:
+        # Cancelled jobs keep their lease and are picked up after a restart
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def wake(self) -> None:
+        """Call after a submit so an idle worker starts right away."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _work(self) -> None:
+        while True:
+            # A database error (claim, complete, fail, lease renewal) must not
+            # end the worker: the job's lease lapses and it is retried later
+            try:
+                await self._work_once()
+            except Exception:
+                log.exception("Job worker iteration failed")
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _work_once(self) -> None:
+        job = await asyncio.to_thread(self.queue.claim)
+        if job is None:
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            return
+
+        self.busy += 1
+        start = time.perf_counter()
+        try:
+            await self._run(job)
+        finally:
+            self.busy -= 1
+            self.busy_seconds += time.perf_counter() - start
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        task = asyncio.ensure_future(self.handler(job["payload"]))
+        try:
+            # Renew the lease while the handler runs
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.queue.lease_seconds / 3)
+                if done:
+                    break
+                await asyncio.to_thread(self.queue.extend_lease, job["id"], job["claim"])
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+
+        try:
+            result = task.result()
+        except JobError as e:
+            await asyncio.to_thread(self.queue.fail, job["id"], job["claim"], e)
+        except Exception as e:
+            log.exception("Job %s failed", job["id"])
+            await asyncio.to_thread(
+                self.queue.fail, job["id"], job["claim"], JobError(f"Unexpected error: {e}")
+            )
+        else:
+            await asyncio.to_thread(self.queue.complete, job["id"], job["claim"], result)
+
+    async def _purge(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.queue.purge_expired)
+            except sqlite3.Error:
+                log.exception("Job queue purge failed")
+            await asyncio.sleep(60)
+
+    def stats(self) -> Dict[str, Any]:
+        uptime = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "workers": self.workers if self._tasks else 0,
+            "busy": self.busy,
+            "busySeconds": round(self.busy_seconds, 3),
+            # Share of worker time spent running jobs since start
+            "utilization": round(self.busy_seconds / (uptime * self.workers), 4)
+            if uptime and self.workers else 0.0,
+        }
+
+    def metric_samples(self):
+        """Samples for utils.metrics.register_collector."""
+        counts = self.queue.counts()
+        for status, count in counts.items():
+            yield ("prism_jobs", "gauge", "Jobs in the queue by status.", {"status": status}, count)
+        for outcome, count in self.queue.outcomes.items():
+            yield ("prism_job_outcomes_total", "counter",
+                   "Job attempts finished by outcome.", {"outcome": outcome}, count)
+        yield ("prism_jobs_expired_total", "counter",
+               "Jobs dropped after their TTL.", {}, self.queue.expired)
+        yield ("prism_jobs_deduplicated_total", "counter",
+               "Job submissions answered by an existing job.", {}, self.queue.deduplicated)
+        yield ("prism_job_workers", "gauge", "Job workers running.", {},
+               self.workers if self._tasks else 0)
+        yield ("prism_job_workers_busy", "gauge", "Job workers running a job.", {}, self.busy)
+        yield ("prism_job_worker_busy_seconds_total", "counter",
+               "Worker time spent running jobs.", {}, self.busy_seconds)
+
+
+# Shared instance used by the jobs route
+job_queue = JobQueue()
+
+
+# Lock file held for the life of the process that won the "single" election
+_runner_lock = None
+
+
+def runs_job_workers(queue: JobQueue = job_queue) -> bool:
+    """Whether this process should start its WorkerPool (PRISM_JOB_RUNNER)."""
+    global _runner_lock
+    if JOB_RUNNER == "off":
+        return False
+    if JOB_RUNNER != "single" or queue.path == ":memory:":
+        return True
+    if _runner_lock is not None:
+        return True
+    try:
+        import fcntl
+    except ImportError:  # not POSIX: no election, every process runs workers
+        log.warning("PRISM_JOB_RUNNER=single needs fcntl; running workers in this process")
+        return True
+    Path(queue.path).parent.mkdir(parents=True, exist_ok=True)
+    handle = open(f"{queue.path}.runner.lock", "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _runner_lock = handle
+    return True
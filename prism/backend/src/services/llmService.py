@@ -42,31 +42,40 @@
 """
 
 
+import asyncio
+import hashlib
+import logging
 import os
-from google import genai
-from google.genai import types
+import re
+import threading
+import time
+from contextlib import aclosing, nullcontext
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
 from dotenv import load_dotenv
 
+from ..utils import deadline
+from ..utils.deadline import DeadlineExceeded, LatencyTracker
+from ..utils.metrics import register_collector, stage_timer
+from ..utils.rateLimit import CircuitBreaker, TokenBucket, backoff_delay
+from ..utils.truncation import estimate_tokens
+from .modelRouter import ModelRoute, model_router
+from .usageTracker import usage_tracker
+
+log = logging.getLogger(__name__)
+
 # Load .env from prism directory (same location as test.py)
 # llmService is at prism/backend/src/services/ → go up 4 levels to prism/
+# Cheap, and other modules read PRISM_* settings at import, so it stays eager
 _prism_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 _load_dotenv_path = os.path.join(_prism_dir, ".env")
 load_dotenv(dotenv_path=_load_dotenv_path)
 
-# Parse API key same way as test.py: support GEMENI_API_KEY from .env
+# Support GEMENI_API_KEY (historical spelling) as well as GEMINI_API_KEY;
+# load_dotenv above has already exported either from prism/.env
 def _get_api_key():
-    key = os.getenv("GEMENI_API_KEY") or os.getenv("GEMINI_API_KEY")
-    if key:
-        return key
-    env_path = os.path.join(_prism_dir, ".env")
-    if os.path.exists(env_path):
-        with open(env_path) as f:
-            for line in f:
-                if line.startswith("GEMENI_API_KEY="):
-                    return line.strip().split("=", 1)[1]
-                if line.startswith("GEMINI_API_KEY="):
-                    return line.strip().split("=", 1)[1]
-    return None
+    return os.getenv("GEMENI_API_KEY") or os.getenv("GEMINI_API_KEY")
 
 
 # ---------------------------------------------------------------------------
@@ -77,58 +86,970 @@ class LLMServiceError(Exception):
     pass
 
 
+class LLMRateLimitError(LLMServiceError):
+    """
+    Provider quota exhausted and retries did not help, or the local rate
+    limiter would have to queue the call too long. retry_after: seconds.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMUnavailableError(LLMServiceError):
+    """Circuit breaker open: failing fast; retry_after: seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMDeadlineError(LLMServiceError, DeadlineExceeded):
+    """The request deadline passed before the provider answered."""
+
+
+# ---------------------------------------------------------------------------
+# Usage Accounting
+# ---------------------------------------------------------------------------
+
+# Token counts reported by the provider for the call in progress
+_call_usage: ContextVar[Optional[Dict[str, int]]] = ContextVar(
+    "prism_call_usage", default=None
+)
+
+
+def report_usage(prompt_tokens: int, output_tokens: int, cached_tokens: int = 0) -> None:
+    """Called by providers with the token counts of the current call."""
+    usage = _call_usage.get()
+    if usage is not None:
+        usage.update(prompt=prompt_tokens, output=output_tokens, cached=cached_tokens)
+
+
+# ---------------------------------------------------------------------------
+# Provider Interface
+# ---------------------------------------------------------------------------
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Upper bound on LLM calls in flight per worker (complete_async only)
+MAX_CONCURRENCY = int(os.getenv("PRISM_LLM_MAX_CONCURRENCY", "256"))
+
+
+class LLMProvider:
+    """
+    Minimal provider contract: prompt string in, raw JSON text out.
+    Subclasses implement generate(); generate_async() defaults to running
+    generate() in a thread and should be overridden by providers that have
+    a native async client. Providers that know their token counts pass them
+    to report_usage() before returning.
+
+    `system` is the static instruction (identical across calls of a stage)
+    and is passed separately so providers can send it as a real system
+    instruction and reuse a cached prefix; `prompt` holds the per-request
+    part only.
+
+    Providers that can serve more than one model (see services/modelRouter.py)
+    override supports() and for_model().
+    """
+
+    name = "base"
+    model = ""
+
+    def supports(self, model: str) -> bool:
+        return model == self.model
+
+    def for_model(self, model: str) -> "LLMProvider":
+        """Provider instance calling `model` (one this provider supports)."""
+        return self
+
+    def generate(self, prompt: str, temperature: float, system: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    async def generate_async(
+        self, prompt: str, temperature: float, system: Optional[str] = None
+    ) -> str:
+        return await asyncio.to_thread(self.generate, prompt, temperature, system)
+
+    async def generate_stream(
+        self, prompt: str, temperature: float, system: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Yield text chunks as they are generated (default: one chunk)."""
+        yield await self.generate_async(prompt, temperature, system)
+
+
+# Explicit provider-side caching of system instructions. Gemini rejects
+# caches below a minimum size, and storage is billed per hour, so only
+# prefixes at least this large are registered; smaller ones are still sent
+# as a stable system_instruction (eligible for implicit prefix caching).
+CONTEXT_CACHE_ENABLED = os.getenv("PRISM_CONTEXT_CACHE", "on").lower() != "off"
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("PRISM_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("PRISM_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+
+# Recreate a cache this long before it expires
+_CONTEXT_CACHE_REFRESH_SECONDS = 60
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = None, model: str = DEFAULT_MODEL, client=None):
+        from google import genai
+        from google.genai import types
+
+        self._types = types
+        self.client = client or genai.Client(api_key=api_key)
+        self.model = model
+
+        # sha256(system) -> (cache name or None if creation failed, expires_at).
+        # Cached content is bound to a model, so each model keeps its own
+        self._context_caches: Dict[str, Tuple[Optional[str], float]] = {}
+        self._context_cache_lock = threading.Lock()
+
+        # model -> provider sharing this client
+        self._siblings: Dict[str, "GeminiProvider"] = {model: self}
+
+    def supports(self, model: str) -> bool:
+        return model.startswith("gemini-")
+
+    def for_model(self, model: str) -> "GeminiProvider":
+        sibling = self._siblings.get(model)
+        if sibling is None:
+            with self._context_cache_lock:
+                sibling = self._siblings.get(model)
+                if sibling is None:
+                    sibling = GeminiProvider(model=model, client=self.client)
+                    sibling._siblings = self._siblings
+                    self._siblings[model] = sibling
+        return sibling
+
+    # -- context cache -------------------------------------------------------
+
+    def _fresh_context_cache(self, key: str) -> Tuple[bool, Optional[str]]:
+        entry = self._context_caches.get(key)
+        if entry is None or entry[1] - _CONTEXT_CACHE_REFRESH_SECONDS <= time.monotonic():
+            return False, None
+        return True, entry[0]
+
+    def _context_cache(self, system: Optional[str]) -> Optional[str]:
+        """Return a cached-content name for `system`, creating it if needed."""
+        if (
+            not system
+            or not CONTEXT_CACHE_ENABLED
+            or estimate_tokens(system) < CONTEXT_CACHE_MIN_TOKENS
+        ):
+            return None
+
+        key = hashlib.sha256(system.encode("utf-8")).hexdigest()
+        fresh, name = self._fresh_context_cache(key)
+        if fresh:
+            return name
+
+        with self._context_cache_lock:
+            fresh, name = self._fresh_context_cache(key)
+            if fresh:
+                return name
+            try:
+                cache = self.client.caches.create(
+                    model=self.model,
+                    config=self._types.CreateCachedContentConfig(
+                        system_instruction=system,
+                        display_name=f"prism-{key[:12]}",
+                        ttl=f"{CONTEXT_CACHE_TTL_SECONDS}s",
+                    ),
+                )
+                name = cache.name
+            except Exception:
+                # Don't retry on every call; fall back to a plain system instruction
+                log.warning("Context cache creation failed; sending uncached", exc_info=True)
+                name = None
+            self._context_caches[key] = (name, time.monotonic() + CONTEXT_CACHE_TTL_SECONDS)
+            return name
+
+    async def _context_cache_async(self, system: Optional[str]) -> Optional[str]:
+        if not system or not CONTEXT_CACHE_ENABLED:
+            return None
+        key = hashlib.sha256(system.encode("utf-8")).hexdigest()
+        fresh, name = self._fresh_context_cache(key)
+        if fresh:
+            return name
+        # Creation is a network round trip; keep it off the event loop
+        return await asyncio.to_thread(self._context_cache, system)
+
+    # -- generation ----------------------------------------------------------
+
+    def _config(self, temperature: float, system: Optional[str], cache_name: Optional[str]):
+        extra = {}
+        if cache_name:
+            extra["cached_content"] = cache_name
+        elif system:
+            extra["system_instruction"] = system
+        return self._types.GenerateContentConfig(
+            temperature=temperature,
+            response_mime_type="application/json",  # Forces JSON mode
+            **extra,
+        )
+
+    @staticmethod
+    def _report(usage_metadata) -> None:
+        if usage_metadata is None:
+            return
+        # Thinking tokens are billed as output
+        report_usage(
+            prompt_tokens=usage_metadata.prompt_token_count or 0,
+            output_tokens=(usage_metadata.candidates_token_count or 0)
+            + (getattr(usage_metadata, "thoughts_token_count", None) or 0),
+            cached_tokens=usage_metadata.cached_content_token_count or 0,
+        )
+
+    def generate(self, prompt: str, temperature: float, system: Optional[str] = None) -> str:
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=self._config(temperature, system, self._context_cache(system)),
+        )
+        self._report(response.usage_metadata)
+        return response.text
+
+    async def generate_async(
+        self, prompt: str, temperature: float, system: Optional[str] = None
+    ) -> str:
+        cache_name = await self._context_cache_async(system)
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=self._config(temperature, system, cache_name),
+        )
+        self._report(response.usage_metadata)
+        return response.text
+
+    async def generate_stream(
+        self, prompt: str, temperature: float, system: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        cache_name = await self._context_cache_async(system)
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+            config=self._config(temperature, system, cache_name),
+        )
+        usage_metadata = None
+        async for chunk in stream:
+            # Running totals; the last chunk carries the final counts
+            usage_metadata = chunk.usage_metadata or usage_metadata
+            if chunk.text:
+                yield chunk.text
+        self._report(usage_metadata)
+
+
 # ---------------------------------------------------------------------------
 # Client Setup
 # ---------------------------------------------------------------------------
 
-api_key = _get_api_key()
+def _create_provider() -> LLMProvider:
+    kind = os.getenv("PRISM_LLM_PROVIDER", "gemini").lower()
+
+    if kind == "fake":
+        from .fakeProvider import FakeProvider
+        return FakeProvider()
+
+    api_key = _get_api_key()
+    if not api_key:
+        raise RuntimeError("GEMENI_API_KEY or GEMINI_API_KEY not set in .env (prism/.env)")
+
+    return GeminiProvider(api_key=api_key)
+
+
+# Built on first use (or by init_provider() at startup), never at import:
+# the Google SDK alone costs most of a worker's import time, and the app
+# must stay importable without a key
+_provider: Optional[LLMProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> LLMProvider:
+    """
+    Return the active provider, creating it on first call. Thread-safe;
+    concurrent first callers wait for a single construction.
+
+    Raises:
+        RuntimeError if the provider cannot be configured (e.g. no API key)
+    """
+    global _provider
+    provider = _provider
+    if provider is not None:
+        return provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = _create_provider()
+        return _provider
+
+
+def set_provider(provider: LLMProvider) -> None:
+    """Swap the active provider (fake provider, benchmarks, experiments)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+def init_provider() -> bool:
+    """
+    Startup hook: build the provider ahead of the first request. Returns
+    False (and logs) instead of raising so a worker without a key still
+    boots; LLM calls then fail with LLMServiceError.
+    """
+    try:
+        get_provider()
+        return True
+    except Exception:
+        log.exception("LLM provider initialization failed")
+        return False
+
+
+async def _get_provider_async() -> LLMProvider:
+    # First construction imports the SDK; keep that off the event loop
+    return _provider or await asyncio.to_thread(get_provider)
+
+
+# One semaphore per event loop; asyncio primitives cannot cross loops
+_semaphore: Optional[asyncio.Semaphore] = None
+_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore, _semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore_loop is not loop:
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        _semaphore_loop = loop
+    return _semaphore
+
+
+def _record_usage(
+    provider: LLMProvider,
+    stage: str,
+    usage: Dict[str, int],
+    system: Optional[str],
+    prompt: str,
+    text: str,
+) -> None:
+    estimated = not usage
+    if estimated:
+        usage = {
+            "prompt": estimate_tokens(system or "") + estimate_tokens(prompt),
+            "output": estimate_tokens(text),
+        }
+    usage_tracker.record(stage, provider.model or provider.name, usage, estimated)
+
+
+def _split_messages(messages: List[Dict[str, str]]) -> Tuple[Optional[str], str]:
+    """
+    Split OpenAI-style messages into (system instruction, prompt). System
+    messages form the static, cacheable prefix; a lone user message is sent
+    as-is, longer conversations keep role markers.
+    """
+    system = "\n\n".join(m["content"] for m in messages if m["role"] == "system") or None
+    turns = [m for m in messages if m["role"] != "system"]
+    if len(turns) == 1 and turns[0]["role"] == "user":
+        return system, turns[0]["content"]
+
+    combined_prompt = ""
+    for m in turns:
+        combined_prompt += f"{m['role'].upper()}:\n{m['content']}\n\n"
+    return system, combined_prompt
+
+
+# ---------------------------------------------------------------------------
+# Rate Limiting / Circuit Breaker
+# ---------------------------------------------------------------------------
+
+# Client-side pacing to the provider quota (0 = off). Calls that would wait
+# longer than RATE_MAX_WAIT_SECONDS for a token fail with LLMRateLimitError.
+RATE_PER_MINUTE = float(os.getenv("PRISM_LLM_RATE_PER_MINUTE", "0"))
+RATE_BURST = float(os.getenv("PRISM_LLM_RATE_BURST", str(max(1.0, RATE_PER_MINUTE / 6))))
+RATE_MAX_WAIT_SECONDS = float(os.getenv("PRISM_LLM_RATE_MAX_WAIT_SECONDS", "10"))
+
+# Provider 429s are retried with exponential backoff and full jitter,
+# honouring the provider's retry delay when it sends one
+RATE_LIMIT_RETRIES = int(os.getenv("PRISM_LLM_RATE_LIMIT_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = float(os.getenv("PRISM_LLM_BACKOFF_BASE_SECONDS", "0.5"))
+BACKOFF_MAX_SECONDS = float(os.getenv("PRISM_LLM_BACKOFF_MAX_SECONDS", "10"))
+
+# Consecutive provider failures before failing fast (0 = off), and for how long
+BREAKER_FAILURES = int(os.getenv("PRISM_LLM_BREAKER_FAILURES", "5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("PRISM_LLM_BREAKER_OPEN_SECONDS", "30"))
+
+rate_limiter = TokenBucket(RATE_PER_MINUTE / 60, RATE_BURST)
+circuit_breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_OPEN_SECONDS)
+rate_limit_stats = {"rateLimited": 0, "retries": 0, "gaveUp": 0}
+
+# Gemini puts the server's suggested delay in the error details
+_RETRY_DELAY_RE = re.compile(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s")
+
+
+def _rate_limit_delay(error: Exception) -> Optional[float]:
+    """
+    For a provider rate-limit / quota error, the suggested retry delay in
+    seconds (0 if none was given); None for any other error.
+    """
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    text = str(error)
+    if code != 429 and "RESOURCE_EXHAUSTED" not in text:
+        return None
+    match = _RETRY_DELAY_RE.search(text)
+    return float(match.group(1)) if match else 0.0
+
+
+def _admit() -> float:
+    """
+    Pass the deadline, circuit breaker and rate limiter; returns seconds to
+    wait before calling the provider.
+
+    Raises:
+        LLMDeadlineError if the request deadline has passed
+        LLMUnavailableError while the circuit is open
+        LLMRateLimitError if the token wait exceeds RATE_MAX_WAIT_SECONDS
+    """
+    left = deadline.remaining()
+    if left is not None and left <= 0:
+        raise LLMDeadlineError("Request deadline exceeded before the LLM call")
+    # Breaker first: calls failed fast must not use up rate-limiter tokens
+    retry_after = circuit_breaker.allow()
+    if retry_after:
+        raise LLMUnavailableError(
+            "LLM provider unavailable (circuit open)", retry_after=retry_after
+        )
+    max_wait = RATE_MAX_WAIT_SECONDS if left is None else min(RATE_MAX_WAIT_SECONDS, left)
+    wait = rate_limiter.reserve(max_wait)
+    if wait is None:
+        circuit_breaker.abandon()
+        raise LLMRateLimitError(
+            "LLM rate limit: request queue full", retry_after=RATE_MAX_WAIT_SECONDS
+        )
+    return wait
+
+
+def _on_success() -> None:
+    circuit_breaker.record_success()
+    rate_limiter.reward()
+
+
+def _on_failure(error: Exception, attempt: int, retries: int = RATE_LIMIT_RETRIES) -> float:
+    """
+    Record a failed provider call; returns the backoff delay before the
+    next attempt, or raises if the call should not be retried (after
+    `retries` rate-limited attempts).
+    """
+    circuit_breaker.record_failure()
+    suggested = _rate_limit_delay(error)
+    if suggested is None:
+        raise error
+
+    rate_limit_stats["rateLimited"] += 1
+    rate_limiter.penalize()
+    delay = max(suggested, backoff_delay(attempt, BACKOFF_BASE_SECONDS, BACKOFF_MAX_SECONDS))
+    left = deadline.remaining()
+    if (
+        attempt >= retries
+        or delay > BACKOFF_MAX_SECONDS
+        or (left is not None and delay >= left)
+    ):
+        rate_limit_stats["gaveUp"] += 1
+        raise LLMRateLimitError(f"LLM rate limit: {error}", retry_after=max(delay, 1.0))
+    rate_limit_stats["retries"] += 1
+    return delay
+
+
+def resilience_stats() -> Dict[str, object]:
+    return {
+        **rate_limit_stats,
+        "rateLimiter": rate_limiter.stats(),
+        "circuitBreaker": circuit_breaker.stats(),
+    }
+
+
+def _collect_metrics():
+    for kind, count in rate_limit_stats.items():
+        yield ("prism_llm_rate_limit_events_total", "counter",
+               "Provider rate-limit responses, retries and give-ups.", {"event": kind}, count)
+    limiter = rate_limiter.stats()
+    yield ("prism_llm_rate_limiter_rate", "gauge",
+           "Current client-side provider call rate (per second).", {}, limiter["ratePerSecond"])
+    yield ("prism_llm_throttled_seconds_total", "counter",
+           "Time calls waited for the rate limiter.", {}, limiter["throttledSeconds"])
+    breaker = circuit_breaker.stats()
+    for state in ("closed", "open", "half_open"):
+        yield ("prism_llm_circuit_state", "gauge", "Circuit breaker state (1 = current).",
+               {"state": state}, int(breaker["state"] == state))
+    yield ("prism_llm_circuit_rejected_total", "counter",
+           "Calls failed fast by the open circuit.", {}, breaker["rejected"])
+
+
+register_collector(_collect_metrics)
+
+
+# ---------------------------------------------------------------------------
+# Deadlines / Hedging
+# ---------------------------------------------------------------------------
+
+# Hedged requests (complete_async only): if a call is still running at the
+# HEDGE_QUANTILE latency of its stage, a second identical call is sent; the
+# first acceptable answer wins and the other is cancelled. Off by default:
+# hedges cost tokens and quota.
+HEDGE_ENABLED = os.getenv("PRISM_LLM_HEDGE", "off").lower() == "on"
+HEDGE_QUANTILE = float(os.getenv("PRISM_LLM_HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("PRISM_LLM_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("PRISM_LLM_HEDGE_MIN_DELAY_SECONDS", "1"))
+
+# A stage (retry) only starts if this quantile of its latency fits in the
+# time left before the deadline
+STAGE_BUDGET_QUANTILE = float(os.getenv("PRISM_STAGE_BUDGET_QUANTILE", "0.9"))
+
+# Provider call durations by stage (retries count towards their stage)
+stage_latency = LatencyTracker()
+hedge_stats = {"fired": 0, "won": 0, "cancelled": 0}
+deadline_stats = {"exceeded": 0}
+
+
+def _latency_key(stage: str) -> str:
+    return stage[: -len("_retry")] if stage.endswith("_retry") else stage
+
+
+def has_time_for(stage: str) -> bool:
+    """
+    Whether a call of `stage` is likely to finish before the current
+    deadline (always True without a deadline or latency history).
+    """
+    left = deadline.remaining()
+    if left is None:
+        return True
+    expected = stage_latency.percentile(_latency_key(stage), STAGE_BUDGET_QUANTILE)
+    return left > (expected or 0.0)
+
+
+def _hedge_delay(stage: str) -> Optional[float]:
+    if not HEDGE_ENABLED:
+        return None
+    delay = stage_latency.percentile(_latency_key(stage), HEDGE_QUANTILE, HEDGE_MIN_SAMPLES)
+    return None if delay is None else max(delay, HEDGE_MIN_DELAY_SECONDS)
+
+
+def latency_stats() -> Dict[str, object]:
+    return {
+        "hedging": {"enabled": HEDGE_ENABLED, "quantile": HEDGE_QUANTILE, **hedge_stats},
+        "deadlineExceeded": deadline_stats["exceeded"],
+        "stageLatency": stage_latency.stats(),
+    }
+
 
-if not api_key:
-    raise RuntimeError("GEMENI_API_KEY or GEMINI_API_KEY not set in .env (prism/.env)")
+def deadline_metric_samples():
+    for event, count in hedge_stats.items():
+        yield ("prism_llm_hedges_total", "counter",
+               "Hedged LLM calls: fired, won by the hedge, losers cancelled.",
+               {"event": event}, count)
+    yield ("prism_llm_deadline_exceeded_total", "counter",
+           "LLM calls stopped at the request deadline.", {}, deadline_stats["exceeded"])
 
-client = genai.Client(api_key=api_key)
+
+register_collector(deadline_metric_samples)
+
+
+# ---------------------------------------------------------------------------
+# Model Routing
+# ---------------------------------------------------------------------------
+
+# Each stage runs on the chain of models in services/modelRouter.py: a call
+# that errors, stays rate limited or exceeds the route's timeout is retried
+# on the next model. Only the last model in a chain waits out 429 backoff;
+# earlier ones hand over at the first rate-limit response.
+
+
+def _routes(provider: LLMProvider, stage: str) -> List[ModelRoute]:
+    return model_router.candidates(stage, provider.supports, provider.model, deadline.remaining())
+
+
+def _route_scope(route: ModelRoute):
+    return deadline.deadline_scope(route.timeout) if route.timeout else nullcontext()
+
+
+def _falls_back(error: BaseException) -> bool:
+    """Whether the next model in the chain might succeed where this one failed."""
+    if isinstance(error, LLMUnavailableError):
+        # The circuit breaker covers the whole provider
+        return False
+    if isinstance(error, DeadlineExceeded):
+        # The route's own timeout, not the request deadline
+        return not deadline.expired()
+    return True
+
+
+def _model_failed(route: ModelRoute, error: Exception, last: bool) -> None:
+    """Record `error` against route.model; re-raises unless the next model
+    in the chain should be tried."""
+    falls_back = _falls_back(error)
+    if falls_back:
+        model_router.record_failure(
+            route.model, timed_out=isinstance(error, DeadlineExceeded), fell_back=not last
+        )
+    if last or not falls_back:
+        raise error
+    log.warning("Model %s failed (%s); falling back to the next model", route.model, error)
+
+
+def model_stats() -> Dict[str, object]:
+    return model_router.stats()
+
+
+register_collector(model_router.metric_samples)
 
 
 # ---------------------------------------------------------------------------
 # Main Completion Function
 # ---------------------------------------------------------------------------
 
-def complete(messages, temperature: float = 0.4) -> str:
+def _attempt(
+    provider: LLMProvider,
+    prompt: str,
+    temperature: float,
+    system: Optional[str],
+    stage: str,
+    retries: int,
+) -> str:
+    """Blocking counterpart of _attempt_async(); the deadline is checked
+    between attempts only."""
+    usage: Dict[str, int] = {}
+    token = _call_usage.set(usage)
+    try:
+        attempt = 0
+        while True:
+            wait = _admit()
+            if wait:
+                time.sleep(wait)
+            try:
+                call_start = time.perf_counter()
+                text = provider.generate(prompt, temperature, system)
+            except Exception as e:
+                time.sleep(_on_failure(e, attempt, retries))
+                attempt += 1
+                continue
+            _on_success()
+            stage_latency.observe(_latency_key(stage), time.perf_counter() - call_start)
+            _record_usage(provider, stage, usage, system, prompt, text or "")
+            return text
+    finally:
+        _call_usage.reset(token)
+
+
+def complete(messages, temperature: float = 0.4, stage: str = "default") -> str:
     """
-    Sends chat completion request to Gemini.
+    Sends chat completion request to the model(s) routed for `stage`.
 
     Args:
         messages: List of {role, content}
-        temperature: Controls randomness
+        temperature: Controls randomness (unless the route sets its own)
+        stage: Pipeline stage name, used for routing and timing metrics
 
     Returns:
-        Raw JSON string from Gemini
+        Raw JSON string from the model
 
     Raises:
         LLMServiceError on provider failure
     """
 
+    system, prompt = _split_messages(messages)
+
     try:
-        # Convert OpenAI-style messages into Gemini prompt
-        combined_prompt = ""
-        for m in messages:
-            role = m["role"]
-            content = m["content"]
-            combined_prompt += f"{role.upper()}:\n{content}\n\n"
-
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=combined_prompt,
-            config=types.GenerateContentConfig(
-                temperature=temperature,
-                response_mime_type="application/json",  # Forces JSON mode
-            ),
-        )
+        provider = get_provider()
+        routes = _routes(provider, stage)
+        with stage_timer(f"complete_{stage}"):
+            for index, route in enumerate(routes):
+                last = index == len(routes) - 1
+                started = time.perf_counter()
+                try:
+                    text = _attempt(
+                        provider.for_model(route.model),
+                        prompt,
+                        temperature if route.temperature is None else route.temperature,
+                        system,
+                        stage,
+                        RATE_LIMIT_RETRIES if last else 0,
+                    )
+                    if not text:
+                        raise LLMServiceError(f"Empty response from {route.model}")
+                except Exception as e:
+                    _model_failed(route, e, last)
+                    continue
+                model_router.record_success(route.model, time.perf_counter() - started)
+                return text
 
-        if not response.text:
-            raise LLMServiceError("Empty response from Gemini")
+    except LLMServiceError:
+        raise
+    except Exception as e:
+        raise LLMServiceError(str(e))
 
-        return response.text
 
+async def _attempt_async(
+    provider: LLMProvider,
+    prompt: str,
+    temperature: float,
+    system: Optional[str],
+    stage: str,
+    retries: int = RATE_LIMIT_RETRIES,
+) -> str:
+    """
+    One logical provider call: admission, 429 backoff, deadline. Usage is
+    recorded per attempt, so a cancelled hedge still counts its prompt.
+    """
+    usage: Dict[str, int] = {}
+    token = _call_usage.set(usage)
+    started = False
+    try:
+        attempt = 0
+        while True:
+            wait = _admit()
+            try:
+                if wait:
+                    await asyncio.sleep(wait)
+                async with _get_semaphore():
+                    started = True
+                    call_start = time.perf_counter()
+                    text = await deadline.wait_with_deadline(
+                        provider.generate_async(prompt, temperature, system)
+                    )
+            except DeadlineExceeded:
+                circuit_breaker.abandon()
+                deadline_stats["exceeded"] += 1
+                raise LLMDeadlineError("Request deadline exceeded during the LLM call")
+            except asyncio.CancelledError:
+                circuit_breaker.abandon()
+                if started:
+                    # Prompt was sent; the provider bills it anyway
+                    _record_usage(provider, stage, usage, system, prompt, "")
+                raise
+            except Exception as e:
+                await asyncio.sleep(_on_failure(e, attempt, retries))
+                attempt += 1
+                started = False
+                continue
+            _on_success()
+            stage_latency.observe(_latency_key(stage), time.perf_counter() - call_start)
+            _record_usage(provider, stage, usage, system, prompt, text or "")
+            return text
+    finally:
+        _call_usage.reset(token)
+
+
+async def _hedged(
+    call: Callable[[], Awaitable[str]], stage: str, accept: Optional[Callable[[str], bool]]
+) -> str:
+    """
+    Run call(); if it is still pending after the stage's hedge delay, start
+    a second one. Returns the first non-empty result that passes `accept`,
+    else the first non-empty one; cancels whatever is still running.
+    """
+    delay = _hedge_delay(stage)
+    if delay is None:
+        return await call()
+
+    primary = asyncio.ensure_future(call())
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return primary.result()
+        if not has_time_for(stage):
+            return await primary
+
+        hedge_stats["fired"] += 1
+        hedge = asyncio.ensure_future(call())
+        pending.add(hedge)
+        fallback: Optional[str] = None
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = error or task.exception()
+                    continue
+                text = task.result()
+                if text and (accept is None or accept(text)):
+                    if task is hedge:
+                        hedge_stats["won"] += 1
+                    return text
+                fallback = fallback or text
+        if fallback is not None:
+            return fallback
+        raise error
+    finally:
+        for task in pending:
+            if not task.done():
+                hedge_stats["cancelled"] += 1
+                task.cancel()
+
+
+async def complete_async(
+    messages,
+    temperature: float = 0.4,
+    stage: str = "default",
+    accept: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """
+    Async variant of complete() using the provider's native async client.
+    At most MAX_CONCURRENCY calls run at once per worker; extra callers
+    wait on the semaphore instead of tying up executor threads.
+
+    Honours the request deadline (utils/deadline.py) and, if enabled,
+    hedges slow calls; `accept(text)` tells the hedge which answers are
+    good enough to win.
+
+    Raises:
+        LLMServiceError on provider failure (LLMDeadlineError at the deadline)
+    """
+
+    system, prompt = _split_messages(messages)
+
+    try:
+        provider = await _get_provider_async()
+        routes = _routes(provider, stage)
+        with stage_timer(f"complete_{stage}"):
+            for index, route in enumerate(routes):
+                last = index == len(routes) - 1
+                routed = provider.for_model(route.model)
+                routed_temperature = temperature if route.temperature is None else route.temperature
+                retries = RATE_LIMIT_RETRIES if last else 0
+                started = time.perf_counter()
+                try:
+                    with _route_scope(route):
+                        text = await _hedged(
+                            lambda: _attempt_async(
+                                routed, prompt, routed_temperature, system, stage, retries
+                            ),
+                            stage,
+                            accept,
+                        )
+                    if not text:
+                        raise LLMServiceError(f"Empty response from {route.model}")
+                except Exception as e:
+                    _model_failed(route, e, last)
+                    continue
+                model_router.record_success(route.model, time.perf_counter() - started)
+                return text
+
+    except LLMServiceError:
+        raise
+    except Exception as e:
+        raise LLMServiceError(str(e))
+
+
+async def _stream_attempt(
+    provider: LLMProvider,
+    prompt: str,
+    temperature: float,
+    system: Optional[str],
+    stage: str,
+    retries: int,
+    received: List[str],
+) -> AsyncIterator[str]:
+    """Stream one model, retrying only before the first chunk; appends the
+    chunks to `received`."""
+    usage: Dict[str, int] = {}
+    try:
+        attempt = 0
+        while True:
+            wait = _admit()
+            try:
+                if wait:
+                    await asyncio.sleep(wait)
+                async with _get_semaphore():
+                    # Generators share the consumer's context, so the usage
+                    # slot is set around each step rather than held across
+                    # yields
+                    stream = provider.generate_stream(prompt, temperature, system)
+                    while True:
+                        token = _call_usage.set(usage)
+                        try:
+                            chunk = await deadline.wait_with_deadline(stream.__anext__())
+                        except StopAsyncIteration:
+                            break
+                        finally:
+                            _call_usage.reset(token)
+                        if chunk:
+                            received.append(chunk)
+                            yield chunk
+            except DeadlineExceeded:
+                circuit_breaker.abandon()
+                deadline_stats["exceeded"] += 1
+                raise LLMDeadlineError("Request deadline exceeded during the LLM stream")
+            except Exception as e:
+                if received:
+                    # Failed mid-stream: chunks are out, can't retry
+                    circuit_breaker.record_failure()
+                    raise
+                await asyncio.sleep(_on_failure(e, attempt, retries))
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled, or the consumer closed the stream early
+                circuit_breaker.abandon()
+                raise
+            _on_success()
+            return
+    finally:
+        _record_usage(provider, stage, usage, system, prompt, "".join(received))
+
+
+async def stream_async(
+    messages, temperature: float = 0.4, stage: str = "default"
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of complete_async(): yields raw text chunks as the
+    provider produces them. Holds one concurrency slot for the whole stream.
+    Falls back to the next model of the route only before the first chunk;
+    route timeouts do not apply to streams.
+
+    Raises:
+        LLMServiceError on provider failure or an empty stream
+    """
+
+    system, prompt = _split_messages(messages)
+    received: List[str] = []
+
+    try:
+        provider = await _get_provider_async()
+    except Exception as e:
+        raise LLMServiceError(str(e))
+
+    routes = _routes(provider, stage)
+    try:
+        with stage_timer(f"complete_{stage}"):
+            for index, route in enumerate(routes):
+                last = index == len(routes) - 1
+                started = time.perf_counter()
+                try:
+                    async with aclosing(
+                        _stream_attempt(
+                            provider.for_model(route.model),
+                            prompt,
+                            temperature if route.temperature is None else route.temperature,
+                            system,
+                            stage,
+                            RATE_LIMIT_RETRIES if last else 0,
+                            received,
+                        )
+                    ) as chunks:
+                        async for chunk in chunks:
+                            yield chunk
+                    if not received:
+                        raise LLMServiceError(f"Empty response from {route.model}")
+                except Exception as e:
+                    if received:
+                        model_router.record_failure(route.model)
+                        raise
+                    _model_failed(route, e, last)
+                    continue
+                model_router.record_success(route.model, time.perf_counter() - started)
+                return
+
+    except LLMServiceError:
+        raise
     except Exception as e:
         raise LLMServiceError(str(e))
@@ -0,0 +1,224 @@
+"""
+ * =============================================================================
+ * FILE PURPOSE
+ * =============================================================================
+ *
+ * Per-stage model routing. Each pipeline stage (perspectives, merged, bias,
+ * keywords, chunk, ...) maps to an ordered chain of models and, optionally, a
+ * temperature and a per-model timeout. llmService tries the chain in order
+ * and falls back to the next model when one errors, is rate limited or
+ * times out.
+ *
+ * Recent per-model outcomes feed the order actually used:
+ * - a model that failed PRISM_MODEL_FAILURE_THRESHOLD times in a row is
+ *   moved to the back of every chain for PRISM_MODEL_COOLDOWN_SECONDS;
+ * - a model whose median latency no longer fits in the time left before
+ *   the request deadline is moved behind the models that still fit.
+ * Demoted models are still tried last, so a chain never runs dry.
+ *
+ * Env (prism/.env or process env):
+ *   PRISM_MODEL_ROUTES   JSON table replacing DEFAULT_ROUTES, e.g.
+ *     {"bias": {"models": ["gemini-2.5-flash-lite", "gemini-2.5-flash"],
+ *               "temperature": 0.2, "timeout": 20},
+ *      "default": {"models": ["gemini-2.5-flash"]}}
+ *   PRISM_MODEL_FAILURE_THRESHOLD   default 3 (0 = never demote)
+ *   PRISM_MODEL_COOLDOWN_SECONDS    default 30
+ *
+ * =============================================================================
+ """
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from ..utils.deadline import LatencyTracker
+
+# Cheap label / keyword tasks go to the small model first; the long-form
+# stages stay on the default model and fall back to the small one
+DEFAULT_ROUTES: Dict[str, Dict[str, Any]] = {
+    "perspectives": {"models": ["gemini-2.5-flash", "gemini-2.5-flash-lite"]},
+    "merged": {"models": ["gemini-2.5-flash", "gemini-2.5-flash-lite"]},
+    "bias": {"models": ["gemini-2.5-flash-lite", "gemini-2.5-flash"]},
+    "keywords": {"models": ["gemini-2.5-flash-lite", "gemini-2.5-flash"]},
+    "chunk": {"models": ["gemini-2.5-flash-lite", "gemini-2.5-flash"]},
+    "default": {"models": ["gemini-2.5-flash"]},
+}
+
+FAILURE_THRESHOLD = int(os.getenv("PRISM_MODEL_FAILURE_THRESHOLD", "3"))
+COOLDOWN_SECONDS = float(os.getenv("PRISM_MODEL_COOLDOWN_SECONDS", "30"))
+
+# Latency history needed before a model is demoted for being too slow
+_LATENCY_MIN_SAMPLES = 5
+
+
+class ModelRoute(NamedTuple):
+    model: str
+    # None: keep the temperature the caller asked for
+    temperature: Optional[float]
+    # Seconds before falling back to the next model (None: request deadline only)
+    timeout: Optional[float]
+
+
+def _parse_routes(table: Dict[str, Any]) -> Dict[str, List[ModelRoute]]:
+    routes: Dict[str, List[ModelRoute]] = {}
+    for stage, entry in table.items():
+        if isinstance(entry, (str, list)):
+            entry = {"models": [entry] if isinstance(entry, str) else entry}
+        models = entry.get("models") or []
+        if not models or not all(isinstance(m, str) and m for m in models):
+            raise ValueError(f"PRISM_MODEL_ROUTES: '{stage}' needs a non-empty 'models' list")
+        temperature = entry.get("temperature")
+        timeout = entry.get("timeout")
+        routes[stage] = [
+            ModelRoute(
+                model,
+                None if temperature is None else float(temperature),
+                None if timeout is None else float(timeout),
+            )
+            for model in models
+        ]
+    return routes
+
+
+class _ModelHealth:
+    __slots__ = ("calls", "errors", "timeouts", "fallbacks", "consecutive_failures", "cooldown_until")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.fallbacks = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+
+class ModelRouter:
+    """Routing table plus per-model health; thread-safe."""
+
+    def __init__(
+        self,
+        table: Dict[str, Any],
+        failure_threshold: int = FAILURE_THRESHOLD,
+        cooldown_seconds: float = COOLDOWN_SECONDS,
+    ):
+        self.routes = _parse_routes(table)
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.latency = LatencyTracker()
+        self._health: Dict[str, _ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    def set_routes(self, table: Dict[str, Any]) -> None:
+        """Replace the routing table (benchmarks, experiments)."""
+        self.routes = _parse_routes(table)
+
+    def _chain(self, stage: str) -> List[ModelRoute]:
+        # "bias_retry" -> "bias", "keywords_batch" -> "keywords", else "default"
+        for key in (stage, stage.rsplit("_", 1)[0], "default"):
+            if key in self.routes:
+                return self.routes[key]
+        return []
+
+    def stage_models(self, stage: str) -> List[str]:
+        """Every model `stage` may be routed to, in configured order."""
+        return [route.model for route in self._chain(stage)]
+
+    def _get_health(self, model: str) -> _ModelHealth:
+        health = self._health.get(model)
+        if health is None:
+            health = self._health[model] = _ModelHealth()
+        return health
+
+    def _demoted(self, model: str, now: float, time_left: Optional[float]) -> bool:
+        health = self._health.get(model)
+        if health is not None and health.cooldown_until > now:
+            return True
+        if time_left is None:
+            return False
+        typical = self.latency.percentile(model, 0.5, _LATENCY_MIN_SAMPLES)
+        return typical is not None and typical > time_left
+
+    def candidates(
+        self,
+        stage: str,
+        supports: Callable[[str], bool],
+        fallback_model: str,
+        time_left: Optional[float] = None,
+    ) -> List[ModelRoute]:
+        """
+        Models to try for `stage`, best first. Only models the active
+        provider `supports` are returned; if there are none, the provider's
+        own `fallback_model`.
+        """
+        chain = [route for route in self._chain(stage) if supports(route.model)]
+        if not chain:
+            return [ModelRoute(fallback_model, None, None)]
+        now = time.monotonic()
+        with self._lock:
+            healthy = [r for r in chain if not self._demoted(r.model, now, time_left)]
+        return healthy + [r for r in chain if r not in healthy]
+
+    def record_success(self, model: str, seconds: float) -> None:
+        self.latency.observe(model, seconds)
+        with self._lock:
+            health = self._get_health(model)
+            health.calls += 1
+            health.consecutive_failures = 0
+
+    def record_failure(self, model: str, timed_out: bool = False, fell_back: bool = False) -> None:
+        with self._lock:
+            health = self._get_health(model)
+            health.calls += 1
+            health.errors += 1
+            health.timeouts += int(timed_out)
+            health.fallbacks += int(fell_back)
+            health.consecutive_failures += 1
+            if self.failure_threshold and health.consecutive_failures >= self.failure_threshold:
+                health.cooldown_until = time.monotonic() + self.cooldown_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        latency = self.latency.stats()
+        with self._lock:
+            models = {
+                model: {
+                    "calls": health.calls,
+                    "errors": health.errors,
+                    "errorRate": round(health.errors / health.calls, 4) if health.calls else 0.0,
+                    "timeouts": health.timeouts,
+                    "fallbacks": health.fallbacks,
+                    "coolingDown": health.cooldown_until > now,
+                    "p50": latency.get(model, {}).get("p50", 0.0),
+                    "p95": latency.get(model, {}).get("p95", 0.0),
+                }
+                for model, health in self._health.items()
+            }
+        return {
+            "routes": {
+                stage: [route._asdict() for route in chain] for stage, chain in self.routes.items()
+            },
+            "models": models,
+        }
+
+    def metric_samples(self):
+        for model, entry in self.stats()["models"].items():
+            labels = {"model": model}
+            yield ("prism_llm_model_calls_total", "counter",
+                   "Provider calls by routed model.", labels, entry["calls"])
+            yield ("prism_llm_model_errors_total", "counter",
+                   "Failed provider calls by routed model.", labels, entry["errors"])
+            yield ("prism_llm_model_fallbacks_total", "counter",
+                   "Calls that fell back to the next model in the chain.", labels, entry["fallbacks"])
+            yield ("prism_llm_model_cooling_down", "gauge",
+                   "1 while the model is demoted after consecutive failures.", labels,
+                   int(entry["coolingDown"]))
+
+
+def _load_table() -> Dict[str, Any]:
+    raw = os.getenv("PRISM_MODEL_ROUTES")
+    return json.loads(raw) if raw else DEFAULT_ROUTES
+
+
+model_router = ModelRouter(_load_table())
@@ -0,0 +1,190 @@
+"""
+ * =============================================================================
+ * FILE PURPOSE
+ * =============================================================================
+ *
+ * Near-duplicate index over analyzed articles. Maps MinHash signatures of
+ * the sanitized article text to analysis cache keys, so a syndicated copy
+ * of a story already analyzed (same wire text, different URL / header /
+ * boilerplate) reuses that analysis instead of two fresh LLM calls.
+ *
+ * - LSH banding: 8 bands of 3 signature bins; articles sharing any band
+ *   exactly become candidates (~99.7% chance at Jaccard 0.8, ~96% at 0.7,
+ *   ~20% at 0.3), then candidates are checked against the similarity
+ *   threshold on the full 128-bin signature (estimate within about
+ *   +/-0.035 of the true Jaccard at 0.8). Lookups touch only a handful
+ *   of entries no matter how large the index is. Tuned for thresholds of
+ *   about 0.7 and up.
+ * - Bounded: LRU eviction by entry count; roughly 800 bytes per entry
+ *   (signature, LRU slot, eight band-table slots) plus the cache key.
+ * - Match similarity is counted for monitoring.
+ *
+ * Env (prism/.env or process env):
+ *   PRISM_NEAR_DUP                  "on" (default) or "off"
+ *   PRISM_NEAR_DUP_MIN_SIMILARITY   estimated Jaccard of word shingles
+ *                                   (default 0.8)
+ *   PRISM_NEAR_DUP_MAX_ENTRIES      default 100000
+ *
+ * =============================================================================
+ """
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ..utils.minhash import signature_similarity
+
+
+NEAR_DUP_ENABLED = os.getenv("PRISM_NEAR_DUP", "on").lower() != "off"
+DEFAULT_MIN_SIMILARITY = float(os.getenv("PRISM_NEAR_DUP_MIN_SIMILARITY", "0.8"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("PRISM_NEAR_DUP_MAX_ENTRIES", "100000"))
+
+BANDS = 8
+_BAND_BYTES = 3 * 2  # 3 bins of 16 bits
+
+# Match similarity histogram buckets (lower bounds)
+SIMILARITY_BUCKETS = (1.0, 0.95, 0.9, 0.85, 0.8, 0.75, 0.7, 0.0)
+
+
+class NearDuplicateIndex:
+    """Thread-safe, LRU-bounded MinHash LSH index: signature -> cache key."""
+
+    def __init__(
+        self,
+        min_similarity: float = DEFAULT_MIN_SIMILARITY,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.min_similarity = min_similarity
+        self.max_entries = max_entries
+
+        # signature -> cache key (most recently used last)
+        self._entries: "OrderedDict[bytes, str]" = OrderedDict()
+        # per band: band value -> signature, or list of signatures on collision
+        self._bands: List[Dict[int, Union[bytes, List[bytes]]]] = [{} for _ in range(BANDS)]
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.matches = 0
+        self.evictions = 0
+        self.match_similarity = {str(b): 0 for b in SIMILARITY_BUCKETS}
+
+    @staticmethod
+    def _band_keys(signature: bytes):
+        for i in range(BANDS):
+            yield i, int.from_bytes(signature[i * _BAND_BYTES : (i + 1) * _BAND_BYTES], "big")
+
+    def _link(self, signature: bytes) -> None:
+        for i, key in self._band_keys(signature):
+            table = self._bands[i]
+            slot = table.get(key)
+            if slot is None:
+                table[key] = signature
+            elif isinstance(slot, list):
+                slot.append(signature)
+            else:
+                table[key] = [slot, signature]
+
+    def _unlink(self, signature: bytes) -> None:
+        for i, key in self._band_keys(signature):
+            table = self._bands[i]
+            slot = table.get(key)
+            if slot is None:
+                continue
+            if isinstance(slot, list):
+                if signature in slot:
+                    slot.remove(signature)
+                if len(slot) == 1:
+                    table[key] = slot[0]
+            elif slot == signature:
+                del table[key]
+
+    def add(self, signature: Optional[bytes], cache_key: str) -> None:
+        if signature is None or self.max_entries <= 0:
+            return
+        with self._lock:
+            if signature in self._entries:
+                self._entries.move_to_end(signature)
+                self._entries[signature] = cache_key
+                return
+
+            self._entries[signature] = cache_key
+            self._link(signature)
+
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._unlink(evicted)
+                self.evictions += 1
+
+    def lookup(self, signature: Optional[bytes]) -> Optional[Tuple[bytes, str, float]]:
+        """
+        Most similar stored entry at or above min_similarity, as
+        (stored signature, cache_key, similarity), or None.
+        """
+        if signature is None:
+            return None
+        with self._lock:
+            self.lookups += 1
+            best: Optional[Tuple[bytes, float]] = None
+            seen = set()
+            for i, key in self._band_keys(signature):
+                slot = self._bands[i].get(key)
+                if slot is None:
+                    continue
+                for candidate in slot if isinstance(slot, list) else (slot,):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    score = signature_similarity(signature, candidate)
+                    if score >= self.min_similarity and (best is None or score > best[1]):
+                        best = (candidate, score)
+
+            if best is None:
+                return None
+
+            candidate, score = best
+            self._entries.move_to_end(candidate)
+            self.matches += 1
+            for bucket in SIMILARITY_BUCKETS:
+                if score >= bucket:
+                    self.match_similarity[str(bucket)] += 1
+                    break
+            return candidate, self._entries[candidate], score
+
+    def discard(self, signature: bytes) -> None:
+        """Drop an entry whose analysis is no longer cached."""
+        with self._lock:
+            if self._entries.pop(signature, None) is not None:
+                self._unlink(signature)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            for table in self._bands:
+                table.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "lookups": self.lookups,
+                "matches": self.matches,
+                "evictions": self.evictions,
+                "minSimilarity": self.min_similarity,
+                "maxEntries": self.max_entries,
+                # similarity lower bound -> matches in [bound, next bound)
+                "matchSimilarity": dict(self.match_similarity),
+            }
+
+    def metric_samples(self):
+        """Samples for utils.metrics.register_collector."""
+        stats = self.stats()
+        yield ("prism_near_dup_entries", "gauge", "Near-duplicate index entries.", {}, stats["entries"])
+        yield ("prism_near_dup_lookups_total", "counter", "Near-duplicate lookups.", {}, stats["lookups"])
+        for bound, count in stats["matchSimilarity"].items():
+            yield ("prism_near_dup_matches_total", "counter",
+                   "Near-duplicate matches by similarity lower bound.", {"similarity": bound}, count)
+
+
+# Shared instance used by the analyze route
+near_duplicate_index = NearDuplicateIndex()
@@ -143,16 +143,7 @@ Generate the descriptions."""
 # SINGLE-STEP: GENERATE HIGH-QUALITY PERSPECTIVES
 # ---------------------------------------------------------------------------
 
-def build_perspectives_messages(title: str, url: str, text: str) -> List[Dict[str, str]]:
-    """
-    Single LLM call: generate 4–5 high-quality, content-specific perspective
-    headers AND their descriptions together.
-
-    Combines the strict header-generation rules and the strict interpretation
-    rules from the previous two-step flow.
-    """
-
-    system_prompt = """You are a perspective-expansion analyst.
+PERSPECTIVES_SYSTEM_PROMPT = """You are a perspective-expansion analyst.
 
 Your job:
 1) Identify the most relevant viewpoints for understanding a given piece of content.
@@ -207,27 +198,40 @@ For each header:
 Output valid JSON only. No markdown. No commentary.
 """
 
-    user_prompt = f"""Analyze this content and generate 4–5 high-quality perspectives.
+
+# Everything below that does not depend on the article is assembled once at
+# import. The system message is the static, cacheable prefix (sent as the
+# provider's system instruction); the user message carries only the content.
+
+PERSPECTIVES_OUTPUT_FORMAT = """
+------------------------------------------------------------------
+OUTPUT FORMAT
+------------------------------------------------------------------
+
+Analyze the content and generate 4–5 high-quality perspectives.
 
 Return JSON in this exact structure:
 
-{{
+{
   "pageSummary": [
     "One brief sentence: main topic.",
     "One brief sentence: key fact.",
     "One brief sentence: significance or takeaway."
   ],
   "perspectives": [
-    {{
+    {
       "label": "Content-specific header (concrete stakeholder or lens)",
       "body": "2–4 sentence interpretation through this lens"
-    }}
+    }
   ]
-}}
+}
 
 pageSummary: Write exactly 3 brief sentences. One sentence per bullet. Each must be under 15 words. Cover: (1) main topic, (2) one key fact, (3) significance or takeaway. No run-ons.
+"""
 
-Content:
+PERSPECTIVES_INSTRUCTION = PERSPECTIVES_SYSTEM_PROMPT + PERSPECTIVES_OUTPUT_FORMAT
+
+CONTENT_TEMPLATE = """Content:
 
 Title: {title}
 URL: {url}
@@ -236,10 +240,99 @@ URL: {url}
 {text}
 \"\"\"
 
-Generate the perspectives now.
+Generate the {target} now.
 """
 
+
+def build_perspectives_messages(title: str, url: str, text: str) -> List[Dict[str, str]]:
+    """
+    Single LLM call: generate 4–5 high-quality, content-specific perspective
+    headers AND their descriptions together.
+
+    Combines the strict header-generation rules and the strict interpretation
+    rules from the previous two-step flow.
+    """
+
     return [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_prompt},
+        {"role": "system", "content": PERSPECTIVES_INSTRUCTION},
+        {
+            "role": "user",
+            "content": CONTENT_TEMPLATE.format(
+                title=title, url=url, text=text, target="perspectives"
+            ),
+        },
+    ]
+
+
+# ---------------------------------------------------------------------------
+# MERGED: PERSPECTIVES + PAGE SUMMARY + BIAS INDICATORS IN ONE CALL
+# ---------------------------------------------------------------------------
+
+MERGED_BIAS_RULES = """
+------------------------------------------------------------------
+BIAS INDICATOR REQUIREMENTS
+------------------------------------------------------------------
+
+Also act as a neutral media framing analyst and list potential bias
+indicators in the content.
+
+- Do NOT moralize or accuse.
+- Do NOT introduce new facts.
+- Keep indicators short (2-4 words).
+- Return general bias pattern labels only, e.g. "Emotional framing",
+  "Loaded language", "Generalization", "Authority emphasis",
+  "Us-vs-them framing", "Selective omission".
+- Use an empty array if none apply.
+"""
+
+ANALYSIS_OUTPUT_FORMAT = """
+------------------------------------------------------------------
+OUTPUT FORMAT
+------------------------------------------------------------------
+
+Analyze the content, generate 4–5 high-quality perspectives and list bias indicators.
+
+Return JSON in this exact structure:
+
+{
+  "pageSummary": [
+    "One brief sentence: main topic.",
+    "One brief sentence: key fact.",
+    "One brief sentence: significance or takeaway."
+  ],
+  "perspectives": [
+    {
+      "label": "Content-specific header (concrete stakeholder or lens)",
+      "body": "2–4 sentence interpretation through this lens"
+    }
+  ],
+  "bias": {
+    "indicators": [
+      "Emotional framing",
+      "Loaded language"
+    ]
+  }
+}
+
+pageSummary: Write exactly 3 brief sentences. One sentence per bullet. Each must be under 15 words. Cover: (1) main topic, (2) one key fact, (3) significance or takeaway. No run-ons.
+"""
+
+ANALYSIS_INSTRUCTION = PERSPECTIVES_SYSTEM_PROMPT + MERGED_BIAS_RULES + ANALYSIS_OUTPUT_FORMAT
+
+
+def build_analysis_messages(title: str, url: str, text: str) -> List[Dict[str, str]]:
+    """
+    Merged mode: one LLM call returns pageSummary, perspectives AND
+    bias.indicators, so the article text is sent once instead of twice
+    (perspectives prompt + bias prompt).
+    """
+
+    return [
+        {"role": "system", "content": ANALYSIS_INSTRUCTION},
+        {
+            "role": "user",
+            "content": CONTENT_TEMPLATE.format(
+                title=title, url=url, text=text, target="analysis"
+            ),
+        },
     ]
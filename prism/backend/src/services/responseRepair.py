@@ -0,0 +1,170 @@
+"""
+ * =============================================================================
+ * FILE PURPOSE
+ * =============================================================================
+ *
+ * Local repair of near-valid LLM JSON so a cosmetic defect does not cost a
+ * whole extra provider call. Runs before any retry.
+ *
+ * Fixes:
+ * - Markdown code fences and chatter around the JSON object
+ * - Trailing commas before } or ]
+ * - Truncated output (unterminated string, missing closing brackets,
+ *   dangling half-written member)
+ * - Too many perspectives (e.g. 7 when the validator allows 3-6)
+ *
+ * =============================================================================
+ """
+
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from ..utils.jsonCodec import dumps_str, loads
+from .responseValidator import ValidationError
+
+
+MAX_PERSPECTIVES = 6
+
+# How many trailing members we are willing to drop from truncated output
+MAX_CUT_ATTEMPTS = 8
+
+_FENCE_RE = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+
+# Counters exported through the analyze stats endpoint
+repair_stats: Dict[str, int] = {"attempted": 0, "repaired": 0, "failed": 0}
+
+
+# ---------------------------------------------------------------------------
+# TEXT-LEVEL REPAIR
+# ---------------------------------------------------------------------------
+
+def _balance(text: str) -> Tuple[str, List[int]]:
+    """
+    Drop trailing commas and stray closers, then close whatever is still
+    open. Also returns the offsets of separators (commas outside strings)
+    so callers can cut back to the last complete member.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    cuts: List[int] = []
+    in_string = False
+    escape = False
+
+    for i, ch in enumerate(text):
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if not stack or stack[-1] != ch:
+                continue  # stray closer
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            stack.pop()
+        elif ch == ",":
+            cuts.append(i)
+
+        out.append(ch)
+        if not stack and ch in "}]":
+            break  # root closed; ignore anything after it
+
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+
+    repaired = "".join(out).rstrip()
+    if repaired.endswith(","):
+        repaired = repaired[:-1]
+    elif repaired.endswith(":"):
+        repaired += " null"
+
+    return repaired + "".join(reversed(stack)), cuts
+
+
+def repair_json_text(raw: str) -> Optional[Any]:
+    """
+    Best-effort parse of near-valid JSON. Returns the parsed value, or None
+    if the text could not be repaired.
+    """
+    text = _FENCE_RE.sub("", raw.strip())
+    start = text.find("{")
+    if start < 0:
+        return None
+    text = text[start:]
+
+    candidate, cuts = _balance(text)
+    try:
+        return loads(candidate)
+    except ValueError:
+        pass
+
+    # Truncated mid-member: drop trailing members until it parses
+    for cut in list(reversed(cuts))[:MAX_CUT_ATTEMPTS]:
+        candidate, _ = _balance(text[:cut])
+        try:
+            return loads(candidate)
+        except ValueError:
+            continue
+
+    return None
+
+
+# ---------------------------------------------------------------------------
+# SHAPE-LEVEL REPAIR
+# ---------------------------------------------------------------------------
+
+def repair_output(raw: str) -> Optional[str]:
+    """
+    Returns a repaired JSON string, or None if nothing could be salvaged.
+    """
+    parsed = repair_json_text(raw)
+    if parsed is None:
+        return None
+
+    if isinstance(parsed, dict):
+        perspectives = parsed.get("perspectives")
+        if isinstance(perspectives, list) and len(perspectives) > MAX_PERSPECTIVES:
+            parsed["perspectives"] = perspectives[:MAX_PERSPECTIVES]
+
+    return dumps_str(parsed)
+
+
+def validate_with_repair(
+    raw: str,
+    validator: Callable[[str], Dict[str, Any]],
+    errors: Tuple[Type[Exception], ...] = (ValidationError,),
+) -> Dict[str, Any]:
+    """
+    validator(raw); on failure, validator(repair_output(raw)). Raises the
+    validation error if the output cannot be repaired into something valid.
+    """
+    try:
+        return validator(raw)
+    except errors:
+        repair_stats["attempted"] += 1
+        repaired = repair_output(raw)
+        if repaired is None or repaired == raw:
+            repair_stats["failed"] += 1
+            raise
+
+        try:
+            result = validator(repaired)
+        except errors:
+            repair_stats["failed"] += 1
+            raise
+
+        repair_stats["repaired"] += 1
+        return result
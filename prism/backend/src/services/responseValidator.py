@@ -7,12 +7,24 @@
  * 1. Headers response: {"headers": ["...", ...]}
  * 2. Perspectives response: {"perspectives": [{"label": "...", "body": "..."}, ...]}
  *
+ * Also validates the single-step response (validate) and the merged
+ * single-call response that carries bias indicators (validate_merged).
+ *
+ * Normalized results are checked against the "response" definition of
+ * shared/schema/analysisSchema.json, compiled once at import
+ * (utils/jsonSchema.py); conform() applies the same check to outgoing
+ * payloads. JSON is parsed with utils/jsonCodec.loads (orjson if installed).
+ *
  * =============================================================================
  """
 
 import json
+import os
 from typing import Dict, Any, List
 
+from ..utils.jsonCodec import loads
+from ..utils.jsonSchema import SchemaError, compile_schema
+
 
 # ---------------------------------------------------------------------------
 # EXCEPTION
@@ -22,6 +34,35 @@ class ValidationError(Exception):
     pass
 
 
+# ---------------------------------------------------------------------------
+# SHARED SCHEMA
+# ---------------------------------------------------------------------------
+
+SCHEMA_PATH = os.getenv(
+    "PRISM_ANALYSIS_SCHEMA",
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..", "..", "..", "shared", "schema", "analysisSchema.json",
+    ),
+)
+
+with open(SCHEMA_PATH) as _f:
+    ANALYSIS_SCHEMA = json.load(_f)
+
+_RESPONSE_SCHEMA = ANALYSIS_SCHEMA["properties"]["response"]
+check_response = compile_schema(_RESPONSE_SCHEMA)
+check_bias = compile_schema(_RESPONSE_SCHEMA["properties"]["bias"])
+
+
+def conform(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns result unchanged if it matches the response schema."""
+    try:
+        check_response(result)
+    except SchemaError as e:
+        raise ValidationError(f"Response does not match analysisSchema.json: {e}")
+    return result
+
+
 # ---------------------------------------------------------------------------
 # FORBIDDEN GENERIC LABELS (reject to force content-specific headers)
 # ---------------------------------------------------------------------------
@@ -45,7 +86,7 @@ def validate_headers(raw_output: str) -> List[str]:
     Parse and validate step 1 output. Returns list of header strings.
     """
     try:
-        parsed = json.loads(raw_output)
+        parsed = loads(raw_output)
     except json.JSONDecodeError:
         raise ValidationError("Invalid JSON from LLM")
 
@@ -89,7 +130,7 @@ def validate_perspectives(
     Returns full analysis dict with perspectives (and optional empty bias).
     """
     try:
-        parsed = json.loads(raw_output)
+        parsed = loads(raw_output)
     except json.JSONDecodeError:
         raise ValidationError("Invalid JSON from LLM")
 
@@ -118,10 +159,10 @@ def validate_perspectives(
         label = expected_labels[i] if i < len(expected_labels) else p.get("label", "").strip() or f"Perspective {i + 1}"
         normalized.append({"label": label, "body": body})
 
-    return {
+    return conform({
         "perspectives": normalized,
         "bias": {"indicators": []},  # Optional; can add bias detection later
-    }
+    })
 
 
 # ---------------------------------------------------------------------------
@@ -134,10 +175,14 @@ def validate(raw_output: str) -> Dict[str, Any]:
     Used when we get perspectives directly without the headers step.
     """
     try:
-        parsed = json.loads(raw_output)
+        parsed = loads(raw_output)
     except json.JSONDecodeError:
         raise ValidationError("Invalid JSON from LLM")
 
+    return conform(_validate_single_step(parsed))
+
+
+def _validate_single_step(parsed: Any) -> Dict[str, Any]:
     if not isinstance(parsed, dict) or "perspectives" not in parsed:
         raise ValidationError("Missing 'perspectives'")
 
@@ -174,3 +219,31 @@ def validate(raw_output: str) -> Dict[str, Any]:
     if page_summary:
         result["pageSummary"] = page_summary
     return result
+
+
+# ---------------------------------------------------------------------------
+# MERGED: PERSPECTIVES + BIAS IN ONE RESPONSE
+# ---------------------------------------------------------------------------
+
+def validate_merged(raw_output: str) -> Dict[str, Any]:
+    """
+    Validates the merged single-call response. Perspectives and pageSummary
+    follow validate(); bias is fail-soft like detect_bias(): a missing or
+    malformed "bias" becomes {"indicators": []} instead of an error.
+    """
+    try:
+        parsed = loads(raw_output)
+    except json.JSONDecodeError:
+        raise ValidationError("Invalid JSON from LLM")
+
+    result = _validate_single_step(parsed)
+
+    indicators = []
+    bias = parsed.get("bias")
+    if isinstance(bias, dict) and isinstance(bias.get("indicators"), list):
+        for item in bias["indicators"]:
+            if isinstance(item, str) and item.strip():
+                indicators.append(item.strip())
+
+    result["bias"] = {"indicators": indicators}
+    return conform(result)
@@ -0,0 +1,230 @@
+"""
+ * =============================================================================
+ * FILE PURPOSE
+ * =============================================================================
+ *
+ * In-process result cache for analysis payloads. Identical articles (same
+ * sanitized title + truncated text) reuse the stored perspectives / bias /
+ * pageSummary instead of paying for two more LLM round trips.
+ *
+ * - Keys are content fingerprints (sha256 of the prompt inputs).
+ * - LRU eviction, bounded by entry count AND approximate total bytes.
+ * - Per-entry TTL; expired entries are dropped lazily on lookup.
+ * - Hit / miss / eviction counters for monitoring.
+ * - Optional second tier shared with the other worker processes
+ *   (services/sharedCache.py, PRISM_SHARED_CACHE=on): get_async() consults
+ *   it on a local miss, in a thread; put() queues a write-through that a
+ *   background thread batches. get() and put() never touch the disk, so
+ *   neither blocks the event loop. Keys are prefixed with the cache's
+ *   namespace so caches sharing the store never collide.
+ *
+ * Limits are read from env (prism/.env or process env):
+ *   PRISM_CACHE_MAX_ENTRIES   (default 1024)
+ *   PRISM_CACHE_MAX_BYTES     (default 64 MiB)
+ *   PRISM_CACHE_TTL_SECONDS   (default 3600, 0 disables expiry)
+ *
+ * =============================================================================
+ """
+
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .sharedCache import SharedCache, shared_cache
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("PRISM_CACHE_MAX_ENTRIES", "1024"))
+DEFAULT_MAX_BYTES = int(os.getenv("PRISM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DEFAULT_TTL_SECONDS = float(os.getenv("PRISM_CACHE_TTL_SECONDS", "3600"))
+
+
+# ---------------------------------------------------------------------------
+# FINGERPRINT
+# ---------------------------------------------------------------------------
+
+def content_fingerprint(*parts: str) -> str:
+    """
+    Stable hash of the prompt inputs. Parts are length-prefixed so that
+    ("ab", "c") and ("a", "bc") never collide.
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8")
+        h.update(str(len(data)).encode("ascii"))
+        h.update(b":")
+        h.update(data)
+    return h.hexdigest()
+
+
+def _payload_size(value: Any) -> int:
+    return len(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+# ---------------------------------------------------------------------------
+# CACHE
+# ---------------------------------------------------------------------------
+
+class ResultCache:
+    """
+    Thread-safe LRU + TTL cache of JSON-serializable payloads.
+
+    Values are deep-copied on the way in and out so callers can mutate the
+    returned dict without corrupting the cached copy.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        shared: Optional[SharedCache] = None,
+        namespace: str = "",
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self.namespace = namespace
+
+        # key -> (expires_at, size_bytes, value)
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.shared_hits = 0
+
+    def _get_local(self, key: str) -> Optional[Any]:
+        # Caller holds _lock; returns the stored object itself (not a copy)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at and expires_at <= time.monotonic():
+            del self._entries[key]
+            self._total_bytes -= size
+            self.expirations += 1
+            return None
+        return value
+
+    def get(self, key: str) -> Optional[Any]:
+        """This process's copy only; see get_async() for the shared tier."""
+        with self._lock:
+            value = self._get_local(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(value)
+
+    async def get_async(self, key: str) -> Optional[Any]:
+        """
+        Like get(), but a local miss falls through to the shared tier (read
+        in a worker thread) and a value found there is kept locally.
+        """
+        with self._lock:
+            value = self._get_local(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(value)
+            if self.shared is None:
+                self.misses += 1
+                return None
+
+        # Freshly decoded, so it can be handed out without another copy
+        value = await asyncio.to_thread(self.shared.get, f"{self.namespace}:{key}")
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        self._put_local(key, value)
+        with self._lock:
+            self.shared_hits += 1
+        return value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """This process's copy, without counting a hit or refreshing recency."""
+        with self._lock:
+            return copy.deepcopy(self._get_local(key))
+
+    def put(self, key: str, value: Any) -> None:
+        stored = self._put_local(key, value)
+        if self.shared is not None:
+            # The local copy is never handed out or mutated, so the writer
+            # thread can serialize it later
+            self.shared.put(
+                f"{self.namespace}:{key}",
+                stored if stored is not None else copy.deepcopy(value),
+                self.ttl_seconds,
+            )
+
+    def _put_local(self, key: str, value: Any) -> Optional[Any]:
+        """Store a copy of value; returns that copy, or None if it does not fit."""
+        size = _payload_size(value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return None
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+
+            stored = copy.deepcopy(value)
+            self._entries[key] = (expires_at, size, stored)
+            self._total_bytes += size
+
+            while (
+                len(self._entries) > self.max_entries
+                or self._total_bytes > self.max_bytes
+            ):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.evictions += 1
+        return stored
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "sharedHits": self.shared_hits,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "ttlSeconds": self.ttl_seconds,
+            }
+
+    def metric_samples(self, cache: str):
+        """Samples for utils.metrics.register_collector, labelled by cache name."""
+        stats = self.stats()
+        labels = {"cache": cache}
+        for name in ("hits", "misses", "evictions", "expirations"):
+            yield (f"prism_cache_{name}_total", "counter", f"Result cache {name}.", labels, stats[name])
+        yield ("prism_cache_shared_hits_total", "counter",
+               "Local result cache misses served by the shared cache.", labels, stats["sharedHits"])
+        yield ("prism_cache_entries", "gauge", "Result cache entries.", labels, stats["entries"])
+        yield ("prism_cache_bytes", "gauge", "Result cache size in bytes.", labels, stats["bytes"])
+
+
+# Shared instance used by the analyze route
+analysis_cache = ResultCache(shared=shared_cache, namespace="analysis")
@@ -0,0 +1,334 @@
+"""
+ * =============================================================================
+ * FILE PURPOSE
+ * =============================================================================
+ *
+ * Result cache tier shared by the server processes on one host. With
+ * several uvicorn workers each has its own in-process ResultCache, so an
+ * article analyzed by one worker would be a miss (and another LLM call) on
+ * every other. ResultCache instances given this store check it after their
+ * own LRU misses and write every put through to it.
+ *
+ * - One SQLite file in WAL mode: readers never wait for writers or for each
+ *   other, so lookups don't serialize workers. Each thread of each process
+ *   has its own connection (no process-wide lock on the read path).
+ * - get() blocks on disk: async callers run it in a thread
+ *   (ResultCache.get_async), never on the event loop.
+ * - put() only queues the entry. A background writer thread per process
+ *   drains the queue and writes everything pending in one transaction of
+ *   upserts (atomic across processes), so request handlers never wait for
+ *   the database write lock, and a burst of puts costs one lock
+ *   acquisition instead of one each. A key queued twice is written once.
+ * - Triggers keep the total byte and entry counts in a one-row table in
+ *   the same transaction, so bounds never drift.
+ * - Size-bounded: when a write takes the store over max_bytes or
+ *   max_entries, the oldest entries are evicted in the same transaction
+ *   (FIFO; the in-process LRU in front keeps the hot keys).
+ * - Per-entry TTL; expired rows are never returned and are swept
+ *   periodically.
+ * - It is a cache: a batch that waits on other processes' writes longer
+ *   than busy_ms, or arrives while max_pending entries are already queued,
+ *   is dropped, and any database error degrades to a miss.
+ *
+ * Env (prism/.env or process env):
+ *   PRISM_SHARED_CACHE             off (default) / on; turn on when running
+ *                                  several workers (uvicorn --workers N)
+ *   PRISM_SHARED_CACHE_DB          SQLite path (default backend/data/cache.sqlite3)
+ *   PRISM_SHARED_CACHE_MAX_BYTES   default 256 MiB
+ *   PRISM_SHARED_CACHE_MAX_ENTRIES default 100000
+ *
+ * =============================================================================
+ """
+
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..utils.jsonCodec import dumps, loads
+from ..utils.metrics import register_collector
+
+log = logging.getLogger(__name__)
+
+
+SHARED_CACHE_ENABLED = os.getenv("PRISM_SHARED_CACHE", "off").lower() == "on"
+DEFAULT_DB_PATH = os.getenv(
+    "PRISM_SHARED_CACHE_DB", str(Path(__file__).resolve().parents[2] / "data" / "cache.sqlite3")
+)
+DEFAULT_MAX_BYTES = int(os.getenv("PRISM_SHARED_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+DEFAULT_MAX_ENTRIES = int(os.getenv("PRISM_SHARED_CACHE_MAX_ENTRIES", "100000"))
+
+# Oldest rows read per eviction pass while over a bound
+_EVICT_BATCH = 64
+# Writes between sweeps of expired rows (per process)
+_SWEEP_EVERY = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key         TEXT PRIMARY KEY,
+    value       BLOB NOT NULL,
+    size        INTEGER NOT NULL,
+    stored_at   REAL NOT NULL,
+    expires_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_age ON entries (stored_at);
+CREATE INDEX IF NOT EXISTS entries_expiry ON entries (expires_at);
+
+CREATE TABLE IF NOT EXISTS totals (
+    id       INTEGER PRIMARY KEY CHECK (id = 0),
+    bytes    INTEGER NOT NULL,
+    entries  INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals (id, bytes, entries) VALUES (0, 0, 0);
+
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE totals SET bytes = bytes + new.size, entries = entries + 1 WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE totals SET bytes = bytes + new.size - old.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE totals SET bytes = bytes - old.size, entries = entries - 1 WHERE id = 0;
+END;
+"""
+
+
+class SharedCache:
+    """SQLite-WAL key/value store of JSON payloads; safe across threads and processes."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_DB_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        busy_ms: int = 1000,
+        max_pending: int = 10000,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.busy_ms = busy_ms
+        self.max_pending = max_pending
+
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._writes_since_sweep = 0
+
+        # key -> (value, ttl_seconds) waiting for the writer thread
+        self._pending: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._writing = 0
+        self._cond = threading.Condition()
+        self._writer_pid: Optional[int] = None
+
+        self.stats_counts = {
+            "hits": 0, "misses": 0, "writes": 0, "batches": 0, "skippedWrites": 0,
+            "droppedWrites": 0, "evictions": 0, "errors": 0,
+        }
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread and process, opened on first use (never
+        # inherited across fork: the pid is part of the check)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            self.path, timeout=self.busy_ms / 1000, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._schema_lock:
+            if not self._schema_ready:
+                # Schema setup may wait on other processes doing the same
+                conn.execute("PRAGMA busy_timeout=5000")
+                conn.executescript(_SCHEMA)
+                conn.execute(f"PRAGMA busy_timeout={self.busy_ms}")
+                self._schema_ready = True
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            row = self._db().execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._error("read", e)
+            return None
+        if row is None:
+            self.stats_counts["misses"] += 1
+            return None
+        self.stats_counts["hits"] += 1
+        return loads(row[0])
+
+    def put(self, key: str, value: Any, ttl_seconds: float) -> None:
+        """
+        Queue `value` for the writer thread; never blocks on the database.
+        The caller must not mutate `value` afterwards.
+        """
+        if self.max_entries <= 0:
+            return
+        with self._cond:
+            if self._writer_pid != os.getpid():
+                self._start_writer()
+            if key not in self._pending and len(self._pending) >= self.max_pending:
+                self.stats_counts["droppedWrites"] += 1
+                return
+            self._pending[key] = (value, ttl_seconds)
+            self._cond.notify()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued entry has been written (or dropped)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def _start_writer(self) -> None:
+        # Called with _cond held: first put in this process (threads do not
+        # survive fork, and entries queued by the parent are not ours)
+        self._pending.clear()
+        self._writing = 0
+        self._writer_pid = os.getpid()
+        threading.Thread(target=self._run_writer, name="shared-cache-writer", daemon=True).start()
+
+    def _run_writer(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                batch, self._pending = self._pending, OrderedDict()
+                self._writing = len(batch)
+            try:
+                self._write(batch)
+            except Exception as e:  # the writer must outlive any one batch
+                self._error("write", e)
+            finally:
+                with self._cond:
+                    self._writing = 0
+                    self._cond.notify_all()
+
+    def _write(self, batch: "OrderedDict[str, Tuple[Any, float]]") -> None:
+        now = time.time()
+        rows = []
+        for key, (value, ttl_seconds) in batch.items():
+            data = dumps(value)
+            if len(data) > self.max_bytes:
+                continue
+            expires_at = now + ttl_seconds if ttl_seconds > 0 else float("inf")
+            rows.append((key, data, len(data), now, expires_at))
+        if not rows:
+            return
+        try:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(
+                    "INSERT INTO entries (key, value, size, stored_at, expires_at)"
+                    " VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (key) DO UPDATE SET value = excluded.value,"
+                    " size = excluded.size, stored_at = excluded.stored_at,"
+                    " expires_at = excluded.expires_at",
+                    rows,
+                )
+                self._evict(db, now, len(rows))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e) or "busy" in str(e):
+                # Other processes held the write lock for longer than busy_ms
+                self.stats_counts["skippedWrites"] += len(rows)
+                return
+            self._error("write", e)
+            return
+        except sqlite3.Error as e:
+            self._error("write", e)
+            return
+        self.stats_counts["writes"] += len(rows)
+        self.stats_counts["batches"] += 1
+
+    def _evict(self, db: sqlite3.Connection, now: float, written: int) -> None:
+        self._writes_since_sweep += written
+        if self._writes_since_sweep >= _SWEEP_EVERY:
+            self._writes_since_sweep = 0
+            cur = db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            self.stats_counts["evictions"] += cur.rowcount
+        while True:
+            total_bytes, entries = db.execute(
+                "SELECT bytes, entries FROM totals WHERE id = 0"
+            ).fetchone()
+            excess_entries = entries - self.max_entries
+            excess_bytes = total_bytes - self.max_bytes
+            if excess_entries <= 0 and excess_bytes <= 0:
+                return
+            # Oldest first, just enough to get back under both bounds
+            victims, freed = [], 0
+            for key, size in db.execute(
+                "SELECT key, size FROM entries ORDER BY stored_at LIMIT ?",
+                (max(excess_entries, _EVICT_BATCH),),
+            ):
+                if len(victims) >= excess_entries and freed >= excess_bytes:
+                    break
+                victims.append((key,))
+                freed += size
+            if not victims:
+                return
+            db.executemany("DELETE FROM entries WHERE key = ?", victims)
+            self.stats_counts["evictions"] += len(victims)
+
+    def _error(self, operation: str, error: Exception) -> None:
+        self.stats_counts["errors"] += 1
+        log.warning("Shared cache %s failed: %s", operation, error)
+
+    def clear(self) -> None:
+        with self._cond:
+            self._pending.clear()
+        db = self._db()
+        db.execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            total_bytes, entries = self._db().execute(
+                "SELECT bytes, entries FROM totals WHERE id = 0"
+            ).fetchone()
+        except sqlite3.Error:
+            total_bytes, entries = None, None
+        with self._cond:
+            pending = len(self._pending) + self._writing
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": total_bytes,
+            "maxEntries": self.max_entries,
+            "maxBytes": self.max_bytes,
+            "pendingWrites": pending,
+            **self.stats_counts,
+        }
+
+    def metric_samples(self):
+        stats = self.stats()
+        for name in ("hits", "misses", "writes", "batches", "skippedWrites", "droppedWrites",
+                     "evictions", "errors"):
+            yield ("prism_shared_cache_events_total", "counter",
+                   "Shared (cross-worker) cache events in this process.",
+                   {"event": name}, stats[name])
+        if stats["bytes"] is not None:
+            yield ("prism_shared_cache_bytes", "gauge", "Shared cache size in bytes.", {},
+                   stats["bytes"])
+            yield ("prism_shared_cache_entries", "gauge", "Shared cache entries.", {},
+                   stats["entries"])
+
+
+# Shared instance used by the result caches; None when disabled
+shared_cache: Optional[SharedCache] = SharedCache() if SHARED_CACHE_ENABLED else None
+
+if shared_cache is not None:
+    register_collector(shared_cache.metric_samples)
+    # Give queued entries a moment to land on a clean shutdown
+    atexit.register(shared_cache.flush, 2.0)
@@ -0,0 +1,184 @@
+"""
+ * =============================================================================
+ * FILE PURPOSE
+ * =============================================================================
+ *
+ * Token usage and cost accounting for every LLM call, tagged by route
+ * (analyze, keywords, ...) and pipeline stage (perspectives, bias, ...).
+ * Feeds /metrics, GET /api/analyze/stats and an optional per-day budget.
+ *
+ * - Providers report prompt / output / cached token counts through
+ *   llmService.report_usage(); calls that report nothing are estimated from
+ *   the prompt and response text and counted as "estimated".
+ * - Cost uses per-model prices in USD per 1M tokens (cached prompt tokens
+ *   are billed at the cached rate).
+ * - When today's (UTC) tokens or cost exceed the budget, over_budget()
+ *   turns true and the analyze route switches to its degraded mode
+ *   (merged single call, smaller article budget) until the day rolls over.
+ *
+ * Env (prism/.env or process env):
+ *   PRISM_DAILY_TOKEN_BUDGET      total tokens per UTC day (default 0 = off)
+ *   PRISM_DAILY_COST_BUDGET_USD   USD per UTC day (default 0 = off)
+ *   PRISM_MODEL_PRICES            JSON overrides, e.g.
+ *     {"gemini-2.5-flash": {"input": 0.30, "output": 2.50, "cached": 0.075}}
+ *
+ * =============================================================================
+ """
+
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Tuple
+
+from ..utils.metrics import register_collector
+
+
+# USD per 1M tokens. List prices at the time of writing; override via env
+MODEL_PRICES: Dict[str, Dict[str, float]] = {
+    "gemini-2.5-flash": {"input": 0.30, "output": 2.50, "cached": 0.075},
+    "gemini-2.5-flash-lite": {"input": 0.10, "output": 0.40, "cached": 0.025},
+    "fake": {"input": 0.0, "output": 0.0, "cached": 0.0},
+}
+MODEL_PRICES.update(json.loads(os.getenv("PRISM_MODEL_PRICES", "{}")))
+
+DAILY_TOKEN_BUDGET = int(os.getenv("PRISM_DAILY_TOKEN_BUDGET", "0"))
+DAILY_COST_BUDGET_USD = float(os.getenv("PRISM_DAILY_COST_BUDGET_USD", "0"))
+
+TOKEN_KINDS = ("prompt", "output", "cached")
+
+# Route tag for calls made while handling a request; set per router
+_current_route: ContextVar[str] = ContextVar("prism_usage_route", default="internal")
+
+
+def usage_route(route: str):
+    """
+    FastAPI dependency that tags every LLM call made by the request with
+    `route`: APIRouter(..., dependencies=[Depends(usage_route("analyze"))]).
+    """
+    async def _tag() -> None:
+        _current_route.set(route)
+    return _tag
+
+
+def call_cost(model: str, usage: Dict[str, int]) -> float:
+    prices = MODEL_PRICES.get(model)
+    if not prices:
+        return 0.0
+    cached = min(usage.get("cached", 0), usage.get("prompt", 0))
+    return (
+        (usage.get("prompt", 0) - cached) * prices.get("input", 0.0)
+        + cached * prices.get("cached", 0.0)
+        + usage.get("output", 0) * prices.get("output", 0.0)
+    ) / 1_000_000
+
+
+def _today() -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+class UsageTracker:
+    """Thread-safe token / cost counters plus today's running totals."""
+
+    def __init__(
+        self,
+        daily_token_budget: int = DAILY_TOKEN_BUDGET,
+        daily_cost_budget: float = DAILY_COST_BUDGET_USD,
+    ):
+        self.daily_token_budget = daily_token_budget
+        self.daily_cost_budget = daily_cost_budget
+
+        # (route, stage, model) -> {"calls", "estimated", "prompt", "output", "cached", "cost"}
+        self._totals: Dict[Tuple[str, str, str], Dict[str, float]] = {}
+        self._day = _today()
+        self._day_tokens = 0
+        self._day_cost = 0.0
+        self.degraded_requests = 0
+        self._lock = threading.Lock()
+
+    def _roll_day(self) -> None:
+        day = _today()
+        if day != self._day:
+            self._day = day
+            self._day_tokens = 0
+            self._day_cost = 0.0
+
+    def record(self, stage: str, model: str, usage: Dict[str, int], estimated: bool = False) -> None:
+        key = (_current_route.get(), stage, model)
+        cost = call_cost(model, usage)
+        tokens = usage.get("prompt", 0) + usage.get("output", 0)
+
+        with self._lock:
+            totals = self._totals.setdefault(
+                key, {"calls": 0, "estimated": 0, "cost": 0.0, **{k: 0 for k in TOKEN_KINDS}}
+            )
+            totals["calls"] += 1
+            totals["estimated"] += int(estimated)
+            totals["cost"] += cost
+            for kind in TOKEN_KINDS:
+                totals[kind] += usage.get(kind, 0)
+
+            self._roll_day()
+            self._day_tokens += tokens
+            self._day_cost += cost
+
+    def over_budget(self) -> bool:
+        with self._lock:
+            self._roll_day()
+            return bool(
+                (self.daily_token_budget and self._day_tokens >= self.daily_token_budget)
+                or (self.daily_cost_budget and self._day_cost >= self.daily_cost_budget)
+            )
+
+    def note_degraded(self) -> None:
+        with self._lock:
+            self.degraded_requests += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+            self._day = _today()
+            self._day_tokens = 0
+            self._day_cost = 0.0
+            self.degraded_requests = 0
+
+    def stats(self) -> Dict[str, Any]:
+        degraded = self.over_budget()
+        with self._lock:
+            by_stage = [
+                {"route": route, "stage": stage, "model": model,
+                 **{k: (round(v, 6) if k == "cost" else v) for k, v in totals.items()}}
+                for (route, stage, model), totals in sorted(self._totals.items())
+            ]
+            return {
+                "day": self._day,
+                "dayTokens": self._day_tokens,
+                "dayCostUsd": round(self._day_cost, 6),
+                "dailyTokenBudget": self.daily_token_budget,
+                "dailyCostBudgetUsd": self.daily_cost_budget,
+                "degraded": degraded,
+                "degradedRequests": self.degraded_requests,
+                "byStage": by_stage,
+            }
+
+    def metric_samples(self):
+        """Samples for utils.metrics.register_collector."""
+        stats = self.stats()
+        for row in stats["byStage"]:
+            labels = {"route": row["route"], "stage": row["stage"], "model": row["model"]}
+            yield ("prism_llm_calls_total", "counter", "LLM calls.", labels, row["calls"])
+            for kind in TOKEN_KINDS:
+                yield ("prism_llm_tokens_total", "counter", "LLM tokens by kind.",
+                       {**labels, "kind": kind}, row[kind])
+            yield ("prism_llm_cost_usd_total", "counter", "Estimated LLM cost in USD.",
+                   labels, row["cost"])
+        yield ("prism_llm_day_tokens", "gauge", "Tokens used today (UTC).", {}, stats["dayTokens"])
+        yield ("prism_llm_budget_degraded", "gauge",
+               "1 while the daily budget is exhausted.", {}, int(stats["degraded"]))
+
+
+# Shared instance fed by llmService
+usage_tracker = UsageTracker()
+
+register_collector(usage_tracker.metric_samples)
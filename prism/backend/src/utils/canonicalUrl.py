@@ -0,0 +1,45 @@
+"""
+=============================================================================
+FILE PURPOSE
+=============================================================================
+
+Canonical form of a page URL, so the same article opened from a feed, a
+share link or a bookmark maps to one analysis lookup key.
+
+- Scheme and host are lower-cased; default ports, the fragment and a
+  trailing slash on the path are dropped.
+- Tracking parameters (utm_*, fbclid, gclid, ...) are removed and the
+  remaining query parameters sorted.
+
+Pure string in, string out; no I/O.
+=============================================================================
+"""
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid",
+    "ocid", "ref", "ref_src", "cmpid", "smid", "s_cid", "_ga",
+}
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
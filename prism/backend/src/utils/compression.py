@@ -0,0 +1,112 @@
+"""
+=============================================================================
+FILE PURPOSE
+=============================================================================
+
+Response compression middleware: brotli (if the optional `brotli` package
+is installed and the client accepts "br"), otherwise gzip.
+
+Only complete bodies are compressed. Streamed responses (NDJSON / SSE
+analyze and batch streams) pass through untouched: compressing them would
+hold events back in the compressor until it fills a block, defeating the
+point of streaming. Starlette's GZipMiddleware does exactly that.
+
+- Bodies under PRISM_COMPRESSION_MIN_BYTES, non-text types and responses
+  that already carry a Content-Encoding are sent as they are.
+- Compressed responses get Vary: Accept-Encoding.
+
+Env (prism/.env or process env):
+  PRISM_COMPRESSION            on (default) / off
+  PRISM_COMPRESSION_MIN_BYTES  default 1024
+  PRISM_GZIP_LEVEL             default 6
+  PRISM_BROTLI_QUALITY         default 5
+=============================================================================
+"""
+
+import gzip
+import os
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("PRISM_COMPRESSION", "on").lower() != "off"
+MIN_BYTES = int(os.getenv("PRISM_COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("PRISM_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("PRISM_BROTLI_QUALITY", "5"))
+
+_COMPRESSIBLE = ("application/json", "text/")
+
+
+def _pick_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compress(encoding: str, body: bytes) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        encoding = _pick_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            initial, start = start, None
+            headers = MutableHeaders(raw=initial["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+                or not headers.get("content-type", "").startswith(_COMPRESSIBLE)
+            ):
+                await send(initial)
+                await send(message)
+                return
+
+            body = _compress(encoding, body)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(initial)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
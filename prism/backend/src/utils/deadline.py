@@ -0,0 +1,175 @@
+# =============================================================================
+# FILE PURPOSE
+# =============================================================================
+#
+# End-to-end request deadlines. A deadline is set once per request (from the
+# client or a default) in a context variable, so every LLM call made on
+# behalf of that request, however deep, can see how much time is left and
+# stop working for a client that has already given up.
+#
+# Also keeps per-stage latency windows, so callers can ask "does a call of
+# this stage usually finish in the time left?" (retry budgets) and "how long
+# is unusually slow for this stage?" (hedging).
+#
+# =============================================================================
+# INTEGRATION NOTES
+# =============================================================================
+#
+# - routes add `Depends(request_deadline)`; background work uses
+#   `deadline_scope(seconds)`.
+# - Tasks inherit the deadline of the context they were created in. Work
+#   that outlives one request's budget re-scopes itself with
+#   `fresh_deadline_scope(seconds)`: single-flight runs (so they are not cut
+#   short by whichever request happened to start them) and batch items
+#   (each gets the requested budget from when it starts).
+# - services/llmService.py enforces it per provider call.
+#
+# =============================================================================
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Deque, Dict, Iterator, Optional
+
+from starlette.requests import Request
+
+# Applied when the client sends none; below the extension's 120 s timeout
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("PRISM_DEFAULT_DEADLINE_SECONDS", "110"))
+# Clients may ask for less time, not for more than this
+MAX_DEADLINE_SECONDS = float(os.getenv("PRISM_MAX_DEADLINE_SECONDS", "300"))
+
+DEADLINE_HEADER = "X-Prism-Deadline-Ms"
+
+# Absolute time.monotonic() deadline of the current request, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("prism_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (may be <= 0), or None."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[None]:
+    """Run the block under a deadline `seconds` from now (never extending
+    an earlier one)."""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def fresh_deadline_scope(seconds: float = DEFAULT_DEADLINE_SECONDS) -> Iterator[None]:
+    """Run the block under a deadline of its own: `seconds` from now, or the
+    current deadline if that is later. Unlike deadline_scope(), this may
+    extend the current deadline."""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else max(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+async def wait_with_deadline(awaitable: Awaitable[Any]) -> Any:
+    """Await `awaitable`, giving up (DeadlineExceeded) at the deadline."""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Request deadline exceeded")
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+def requested_seconds(request: Request, body: Any) -> float:
+    """
+    Seconds the client asked for (header, else body "deadlineMs"), else
+    DEFAULT_DEADLINE_SECONDS; at most MAX_DEADLINE_SECONDS.
+    """
+    ms = request.headers.get(DEADLINE_HEADER)
+    if ms is None and isinstance(body, dict):
+        ms = body.get("deadlineMs")
+    try:
+        seconds = float(ms) / 1000 if ms is not None else DEFAULT_DEADLINE_SECONDS
+    except (TypeError, ValueError):
+        seconds = DEFAULT_DEADLINE_SECONDS
+    return min(max(seconds, 0.0), MAX_DEADLINE_SECONDS)
+
+
+async def request_deadline(request: Request) -> None:
+    """
+    FastAPI dependency: set the request deadline from the
+    X-Prism-Deadline-Ms header or a "deadlineMs" body field (milliseconds
+    from now), else DEFAULT_DEADLINE_SECONDS.
+    """
+    body = None
+    if DEADLINE_HEADER not in request.headers and request.method == "POST":
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+    _deadline.set(time.monotonic() + requested_seconds(request, body))
+
+
+# ---------------------------------------------------------------------------
+# STAGE LATENCY WINDOWS
+# ---------------------------------------------------------------------------
+
+class LatencyTracker:
+    """Recent successful durations per key; thread-safe."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """q in [0, 1]; None until `min_samples` observations exist."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            key: {
+                "samples": len(self._samples[key]),
+                "p50": round(self.percentile(key, 0.5) or 0.0, 4),
+                "p95": round(self.percentile(key, 0.95) or 0.0, 4),
+            }
+            for key in keys
+        }
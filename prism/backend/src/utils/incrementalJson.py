@@ -0,0 +1,145 @@
+# =============================================================================
+# FILE PURPOSE
+# =============================================================================
+#
+# Incremental scanner for streamed LLM JSON. The analyze stream receives the
+# perspectives response a few tokens at a time; this scanner tracks just
+# enough JSON structure to notice when an item of a top-level array (e.g.
+# one "pageSummary" bullet or one "perspectives" object) has closed, and
+# hands that item back parsed, long before the whole document is complete.
+#
+# =============================================================================
+# INTEGRATION NOTES
+# =============================================================================
+#
+# - Used by routes/analyzeRoute.py for the streaming endpoint. The full text
+#   is still validated with responseValidator.validate() once the stream
+#   ends; items emitted early are a preview of that final result.
+# - Each character is scanned once, so feeding N chunks costs O(total size).
+# - Malformed items are skipped rather than raised; the final validation
+#   pass is the authority on whether the response is usable.
+#
+# =============================================================================
+
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+
+class _Frame:
+    __slots__ = ("is_object", "key", "expect_key", "current_key")
+
+    def __init__(self, is_object: bool, key: Optional[str]):
+        self.is_object = is_object
+        self.key = key  # key of this container in its parent object
+        self.expect_key = is_object
+        self.current_key: Optional[str] = None
+
+
+class IncrementalArrayScanner:
+    """
+    feed(chunk) -> list of (field, index, value) for every item of a watched
+    top-level array that completed within the chunk.
+    """
+
+    def __init__(self, fields: Sequence[str] = ("pageSummary", "perspectives")):
+        self.fields = set(fields)
+        self._buf = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._item_start: Optional[int] = None
+        self._counts = {f: 0 for f in self.fields}
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._buf
+
+    def _watched_array(self) -> Optional[_Frame]:
+        # Items of interest live exactly at depth 2: {"field": [ item, ... ]}
+        if len(self._stack) == 2:
+            frame = self._stack[1]
+            if not frame.is_object and frame.key in self.fields:
+                return frame
+        return None
+
+    def _emit(self, end: int, out: List[Tuple[str, int, Any]]) -> None:
+        frame = self._watched_array()
+        start, self._item_start = self._item_start, None
+        if frame is None or start is None:
+            return
+        try:
+            value = json.loads(self._buf[start:end])
+        except ValueError:
+            return
+        index = self._counts[frame.key]
+        self._counts[frame.key] = index + 1
+        out.append((frame.key, index, value))
+
+    def feed(self, chunk: str) -> List[Tuple[str, int, Any]]:
+        out: List[Tuple[str, int, Any]] = []
+        self._buf += chunk
+        buf = self._buf
+
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    top = self._stack[-1] if self._stack else None
+                    if top is not None and top.is_object and top.expect_key:
+                        try:
+                            top.current_key = json.loads(buf[self._string_start : i + 1])
+                        except ValueError:
+                            top.current_key = None
+                        top.expect_key = False
+                    elif self._item_start is not None and self._watched_array():
+                        self._emit(i + 1, out)
+                continue
+
+            if ch in " \t\r\n":
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                if self._watched_array() and self._item_start is None:
+                    self._item_start = i
+            elif ch in "{[":
+                if self._watched_array() and self._item_start is None:
+                    self._item_start = i
+                parent = self._stack[-1] if self._stack else None
+                key = parent.current_key if parent is not None and parent.is_object else None
+                self._stack.append(_Frame(ch == "{", key))
+            elif ch in "}]":
+                # A scalar still open when the watched array itself closes
+                # is its last item; emit it while the array frame is on top
+                if ch == "]" and self._item_start is not None and self._watched_array():
+                    self._emit(i, out)
+                if self._stack:
+                    self._stack.pop()
+                if self._item_start is not None and self._watched_array():
+                    self._emit(i + 1, out)
+                elif ch == "]" and len(self._stack) == 1:
+                    self._item_start = None
+            elif ch == ",":
+                top = self._stack[-1] if self._stack else None
+                if top is not None and top.is_object:
+                    top.expect_key = True
+                # Scalars (numbers, true/false/null) end at the separator
+                if self._item_start is not None and self._watched_array():
+                    self._emit(i, out)
+            elif ch == ":":
+                continue
+            elif self._watched_array() and self._item_start is None:
+                self._item_start = i
+
+        self._pos = len(buf)
+        return out
@@ -0,0 +1,68 @@
+"""
+=============================================================================
+FILE PURPOSE
+=============================================================================
+
+JSON parse / serialize for LLM output and HTTP responses. Uses orjson
+(pinned in requirements.txt; several times faster on analysis payloads).
+If it cannot be imported, e.g. on a platform without a wheel, the stdlib
+json module is used and a warning is logged. Both produce compact UTF-8
+(no ASCII escaping), so the bytes on the wire only differ in float
+formatting.
+
+- loads(text) raises json.JSONDecodeError on invalid input with either
+  backend (orjson's error subclasses it), so callers keep catching that.
+- dumps(value) returns bytes; dumps_str(value) a str for text streams.
+- FastJSONResponse renders with dumps() and is the app's default response
+  class. Routes on the hot path return it directly, which also skips
+  FastAPI's jsonable_encoder pass over plain dict/list payloads.
+
+Env (prism/.env or process env):
+  PRISM_JSON_BACKEND   auto (default: orjson if importable) / stdlib
+=============================================================================
+"""
+
+import json
+import logging
+import os
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logging.getLogger(__name__).warning(
+        "orjson is not installed (see requirements.txt); using the slower stdlib json"
+    )
+
+if os.getenv("PRISM_JSON_BACKEND", "auto").lower() == "stdlib":
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "stdlib"
+
+if orjson is not None:
+    # Stats payloads can carry non-string keys (counters keyed by int)
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def loads(data: Any) -> Any:
+        return orjson.loads(data)
+
+    def dumps(value: Any) -> bytes:
+        return orjson.dumps(value, option=_OPTIONS)
+
+else:
+    loads = json.loads
+
+    def dumps(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
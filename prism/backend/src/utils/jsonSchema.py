@@ -0,0 +1,164 @@
+"""
+=============================================================================
+FILE PURPOSE
+=============================================================================
+
+Compiles shared/schema/analysisSchema.json into a plain Python check
+function, once, instead of interpreting the schema on every call.
+
+Only the keywords that schema uses are supported: type (any one JSON type
+name, not a list), properties, required, items, minItems, maxItems and
+oneOf / anyOf (both checked as "any": the schema's two bias shapes overlap,
+which strict exactly-one semantics would always reject). Any other keyword
+or type raises ValueError at compile time, so a schema change this module
+cannot honour fails at startup rather than being silently ignored.
+
+check(value) returns None or raises SchemaError naming the failing path
+("perspectives[2].body: expected string"); the path is only assembled
+when a check fails.
+
+Pure values in, no I/O.
+=============================================================================
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+Check = Callable[[Any], None]
+
+# Keywords that never affect validation
+_ANNOTATIONS = {"$schema", "$id", "title", "description"}
+
+_SUPPORTED = _ANNOTATIONS | {
+    "type", "properties", "required", "items", "minItems", "maxItems", "anyOf", "oneOf",
+}
+
+# bool is an int subclass in Python but not a JSON number
+_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+class SchemaError(Exception):
+    """path_parts (outermost first) are added as the error leaves nested checks."""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+        self.path_parts: List[Any] = []
+
+    @property
+    def path(self) -> str:
+        path = ""
+        for part in self.path_parts:
+            path += f"[{part}]" if isinstance(part, int) else (f".{part}" if path else part)
+        return path
+
+    def __str__(self) -> str:
+        return f"{self.path or '$'}: {self.message}"
+
+
+def _compile_node(schema: Dict[str, Any], where: str) -> Optional[Check]:
+    """One check for `schema`, or None if it accepts every value."""
+    unknown = set(schema) - _SUPPORTED
+    if unknown:
+        raise ValueError(f"{where or '$'}: unsupported schema keywords {sorted(unknown)}")
+
+    checks: List[Check] = []
+    type_name = schema.get("type")
+    if type_name is not None and (not isinstance(type_name, str) or type_name not in _TYPES):
+        raise ValueError(f"{where or '$'}: unsupported schema type {type_name!r}")
+    test = _TYPES[type_name] if type_name else None
+
+    required = list(schema.get("required", []))
+    properties = {
+        key: check
+        for key, sub in schema.get("properties", {}).items()
+        for check in [_compile_node(sub, f"{where}.{key}" if where else key)]
+        if check is not None
+    }
+    items = _compile_node(schema["items"], f"{where}[]") if "items" in schema else None
+    min_items = schema.get("minItems")
+    max_items = schema.get("maxItems")
+
+    if type_name == "object":
+        # Type test fused into the member checks; only present keys are walked
+        def check_object(value):
+            if not isinstance(value, dict):
+                raise SchemaError("expected object")
+            for key in required:
+                if key not in value:
+                    raise SchemaError(f"missing '{key}'")
+            for key, item in value.items():
+                check = properties.get(key)
+                if check is not None:
+                    try:
+                        check(item)
+                    except SchemaError as e:
+                        e.path_parts.insert(0, key)
+                        raise
+        checks.append(check_object)
+    elif type_name == "array":
+        def check_array(value):
+            if not isinstance(value, list):
+                raise SchemaError("expected array")
+            if min_items is not None and len(value) < min_items:
+                raise SchemaError(f"expected at least {min_items} items")
+            if max_items is not None and len(value) > max_items:
+                raise SchemaError(f"expected at most {max_items} items")
+            if items is not None:
+                for i, item in enumerate(value):
+                    try:
+                        items(item)
+                    except SchemaError as e:
+                        e.path_parts.insert(0, i)
+                        raise
+        checks.append(check_array)
+    elif test is not None:
+        def check_type(value):
+            if not test(value):
+                raise SchemaError(f"expected {type_name}")
+        checks.append(check_type)
+
+    for keyword in ("anyOf", "oneOf"):
+        branches = [_compile_node(sub, where) for sub in schema.get(keyword, [])]
+        if not branches or any(branch is None for branch in branches):
+            continue  # absent, or one branch accepts anything
+
+        def check_any(value, branches=branches):
+            errors = []
+            for branch in branches:
+                try:
+                    branch(value)
+                    return
+                except SchemaError as e:
+                    errors.append(str(e) if e.path_parts else e.message)
+            raise SchemaError(f"matches no alternative ({'; '.join(dict.fromkeys(errors))})")
+        checks.append(check_any)
+
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value):
+        for check in checks:
+            check(value)
+    return check_all
+
+
+def compile_schema(schema: Dict[str, Any]) -> Check:
+    """
+    check(value) for `schema`: returns None if value conforms, raises
+    SchemaError otherwise.
+
+    Raises:
+        ValueError if the schema uses keywords or types outside the supported subset
+    """
+    check = _compile_node(schema, "")
+    return check if check is not None else (lambda value: None)
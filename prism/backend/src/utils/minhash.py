@@ -0,0 +1,80 @@
+"""
+=============================================================================
+FILE PURPOSE
+=============================================================================
+
+Compact MinHash signatures of article text, for spotting syndicated copies
+of the same story (different URL, header, footer boilerplate, a few edited
+words).
+
+- Features are overlapping word shingles (3 words, lowercased), counted
+  once each.
+- One-permutation hashing: each shingle is hashed once (blake2b, stable
+  across processes and restarts, unlike hash()) and lands in one of
+  SIGNATURE_BINS bins, keeping the minimum per bin. O(words) instead of
+  O(words x permutations); empty bins are filled from their neighbour
+  (rotation densification).
+- A signature is SIGNATURE_BINS 16-bit values packed into bytes (256
+  bytes); the fraction of equal bins estimates the Jaccard similarity of
+  the two shingle sets. The estimate's standard deviation is about
+  sqrt(J(1-J)/SIGNATURE_BINS): 0.035 at J=0.8 with 128 bins (32 bins gave
+  0.07, enough to flip matches either side of a 0.8 threshold).
+
+Pure string in, bytes out; no I/O.
+=============================================================================
+"""
+
+import hashlib
+import re
+from typing import Optional
+
+SHINGLE_WORDS = 3
+SIGNATURE_BINS = 128
+
+# Below this many words a signature is too unstable to match on
+MIN_WORDS = 40
+
+_WORD_RE = re.compile(r"\w+")
+_BIN_BITS = SIGNATURE_BINS.bit_length() - 1
+_EMPTY = 1 << 64
+
+
+def minhash_signature(text: str, min_words: int = MIN_WORDS) -> Optional[bytes]:
+    """
+    MinHash signature of `text`, or None if it has fewer than `min_words`
+    words.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < max(min_words, SHINGLE_WORDS):
+        return None
+
+    bins = [_EMPTY] * SIGNATURE_BINS
+    mask = SIGNATURE_BINS - 1
+    blake2b = hashlib.blake2b
+    for i in range(len(words) - SHINGLE_WORDS + 1):
+        shingle = " ".join(words[i : i + SHINGLE_WORDS]).encode("utf-8")
+        h = int.from_bytes(blake2b(shingle, digest_size=8).digest(), "big")
+        b = h & mask
+        v = h >> _BIN_BITS
+        if v < bins[b]:
+            bins[b] = v
+
+    # Rotation densification: an empty bin borrows the next non-empty bin's
+    # value, offset by the distance so borrowed values stay distinguishable
+    for b in range(SIGNATURE_BINS):
+        if bins[b] == _EMPTY:
+            for step in range(1, SIGNATURE_BINS):
+                donor = bins[(b + step) % SIGNATURE_BINS]
+                if donor != _EMPTY:
+                    bins[b] = donor + step
+                    break
+
+    return b"".join((v & 0xFFFF).to_bytes(2, "big") for v in bins)
+
+
+def signature_similarity(a: bytes, b: bytes) -> float:
+    """Estimated Jaccard similarity: share of equal 16-bit bins."""
+    # Only equality matters, so native byte order is fine
+    bins_a = memoryview(a).cast("H")
+    equal = sum(x == y for x, y in zip(bins_a, memoryview(b).cast("H")))
+    return equal / len(bins_a)
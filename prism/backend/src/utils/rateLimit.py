@@ -0,0 +1,186 @@
+# =============================================================================
+# FILE PURPOSE
+# =============================================================================
+#
+# Client-side protection for a rate-limited upstream (the LLM provider):
+#
+# - TokenBucket: paces calls to a configured quota. Adaptive: a rate-limit
+#   response halves the current rate (down to a floor) and every success
+#   wins back a little of it, so the client settles just under whatever
+#   the provider actually allows.
+# - CircuitBreaker: after N consecutive failures, fail fast for a cool-off
+#   period instead of sending more calls that will fail the same way; then
+#   let one probe through to test recovery.
+# - backoff_delay: exponential backoff with full jitter.
+#
+# =============================================================================
+# INTEGRATION NOTES
+# =============================================================================
+#
+# - Used by services/llmService.py around every provider call.
+# - Thread-safe (the sync complete() runs in executor threads); waiting is
+#   left to the caller so the same objects serve sync and async code.
+#
+# =============================================================================
+
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def backoff_delay(
+    attempt: int, base: float, cap: float, rng: Optional[random.Random] = None
+) -> float:
+    """Full-jitter delay before retry number `attempt` (0-based)."""
+    return (rng or random).uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: float, min_rate_fraction: float = 0.1):
+        self.max_rate = rate_per_second
+        self.rate = rate_per_second
+        self.min_rate = rate_per_second * min_rate_fraction
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rate > 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _set_rate(self, rate: float) -> None:
+        # Reservations already handed out keep their schedule: rescale the
+        # outstanding debt so it still clears when they are due
+        if self._tokens < 0:
+            self._tokens *= rate / self.rate
+        self.rate = rate
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Take one token; returns how long the caller must wait before using
+        it (0 if available now), or None without taking it when that wait
+        would exceed max_wait.
+        """
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > max_wait:
+                return None
+            # Later callers queue behind this reservation
+            self._tokens -= 1
+            if wait:
+                self.throttled += 1
+                self.throttled_seconds += wait
+            return wait
+
+    def penalize(self) -> None:
+        """Upstream said slow down: halve the rate and drop spare tokens."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._set_rate(max(self.min_rate, self.rate / 2))
+            self._tokens = min(self._tokens, 0.0)
+
+    def reward(self) -> None:
+        """Additive increase back towards the configured rate."""
+        if not self.enabled or self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._set_rate(min(self.max_rate, self.rate + self.max_rate * 0.05))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "ratePerSecond": round(self.rate, 4),
+            "maxRatePerSecond": self.max_rate,
+            "burst": self.burst,
+            "throttled": self.throttled,
+            "throttledSeconds": round(self.throttled_seconds, 3),
+        }
+
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive failures ->
+    half-open after `open_seconds` (one probe call) -> closed or open."""
+
+    def __init__(self, failure_threshold: int, open_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    def allow(self) -> float:
+        """0 if a call may proceed, else seconds until the next probe."""
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            if self.state == "closed":
+                return 0.0
+            remaining = self._opened_at + self.open_seconds - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return 0.0
+            self.rejected += 1
+            # Half-open with a probe out: callers retry after a short pause
+            return max(remaining, 1.0)
+
+    def record_success(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            self.state = "closed"
+
+    def abandon(self) -> None:
+        """The admitted call never reached the upstream (e.g. cancelled)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutiveFailures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "failureThreshold": self.failure_threshold,
+                "openSeconds": self.open_seconds,
+            }
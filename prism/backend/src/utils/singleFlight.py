@@ -0,0 +1,67 @@
+# =============================================================================
+# FILE PURPOSE
+# =============================================================================
+#
+# Single-flight coalescing for async work. When several callers ask for the
+# same key while a call is already running, they all await that one call
+# instead of starting their own. Used in front of the analyze pipeline so a
+# trending article triggers one set of LLM calls, not N.
+#
+# =============================================================================
+# INTEGRATION NOTES
+# =============================================================================
+#
+# - The shared work runs in its own task, so a disconnecting leader does not
+#   cancel the result the followers are waiting on. That task starts with a
+#   copy of the leader's contextvars (deadline included); fn() resets any
+#   it should not share.
+# - Exceptions are delivered to every waiter of that flight.
+# - Keys are forgotten as soon as the flight finishes; caching completed
+#   results is the result cache's job, not this module's.
+#
+# =============================================================================
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(
+        self, key: str, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Run fn() once per key at a time.
+
+        Returns:
+            (result, is_leader) — is_leader is False when this caller joined
+            a flight started by someone else.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.followers += 1
+            return await asyncio.shield(task), False
+
+        self.leaders += 1
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task), True
+
+    def _forget(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "inflight": len(self._inflight),
+            "leaders": self.leaders,
+            "followers": self.followers,
+        }
@@ -36,7 +36,12 @@ INTEGRATION NOTES
 =============================================================================
 """
 
-from typing import Optional
+import json
+import math
+import os
+import re
+import zlib
+from typing import Callable, Dict, List, Optional
 
 DEFAULT_MAX_CHARS = 6000
 
@@ -58,3 +63,198 @@ def truncate_text(text: str, max_chars: Optional[int] = None) -> str:
         return truncated[: last_period + 1]
 
     return truncated
+
+
+# ---------------------------------------------------------------------------
+# TOKEN ESTIMATION
+# ---------------------------------------------------------------------------
+
+# Scripts where one character is roughly one token (Han, Kana, Hangul)
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast, tokenizer-free estimate. Conservative ratios:
+    ~4 ASCII chars per token, 1 token per CJK char, ~2 chars per token for
+    other non-ASCII scripts (accented Latin, Cyrillic, Arabic, ...).
+    """
+    if text.isascii():
+        return (len(text) + 3) // 4
+
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    cjk_chars = len(_CJK_RE.findall(text))
+    other_chars = len(text) - ascii_chars - cjk_chars
+    return math.ceil(ascii_chars / 4 + cjk_chars + other_chars / 2)
+
+
+TokenEstimator = Callable[[str], int]
+
+_estimator: TokenEstimator = estimate_tokens
+
+
+def set_token_estimator(estimator: TokenEstimator) -> None:
+    """Plug in a real tokenizer (e.g. the provider's count) if one is available."""
+    global _estimator
+    _estimator = estimator
+
+
+def get_token_estimator() -> TokenEstimator:
+    return _estimator
+
+
+def estimate_messages_tokens(
+    messages: List[Dict[str, str]], estimator: Optional[TokenEstimator] = None
+) -> int:
+    est = estimator or _estimator
+    # +4 per message for role markers / separators added by llmService
+    return sum(est(m["content"]) + 4 for m in messages)
+
+
+# ---------------------------------------------------------------------------
+# PER-MODEL BUDGETS
+# ---------------------------------------------------------------------------
+
+# context_tokens: what we are willing to spend per call (not the model max)
+# output_tokens:  reserved for the response
+MODEL_TOKEN_BUDGETS: Dict[str, Dict[str, int]] = {
+    "gemini-2.5-flash": {"context_tokens": 4096, "output_tokens": 1024},
+}
+DEFAULT_TOKEN_BUDGET = {"context_tokens": 4096, "output_tokens": 1024}
+
+# Never squeeze the article below this, however long the prompt is
+MIN_TEXT_TOKENS = 256
+
+# Per-model overrides, e.g.
+# PRISM_MODEL_TOKEN_BUDGETS='{"gemini-2.5-flash": {"context_tokens": 8192}}'
+for _model, _budget in json.loads(os.getenv("PRISM_MODEL_TOKEN_BUDGETS", "{}")).items():
+    MODEL_TOKEN_BUDGETS[_model] = {
+        **MODEL_TOKEN_BUDGETS.get(_model, DEFAULT_TOKEN_BUDGET),
+        **_budget,
+    }
+
+
+def text_token_budget(model: str, prompt_overhead_tokens: int) -> int:
+    """
+    Tokens left for article text after the fixed prompt and the expected
+    output are subtracted from the model's per-call budget.
+    """
+    budget = MODEL_TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+    available = budget["context_tokens"] - budget["output_tokens"] - prompt_overhead_tokens
+    return max(MIN_TEXT_TOKENS, available)
+
+
+# ---------------------------------------------------------------------------
+# TOKEN-BASED TRUNCATION
+# ---------------------------------------------------------------------------
+
+_SENTENCE_STOPS = (".", "。", "！", "？")
+
+def truncate_to_token_budget(
+    text: str, max_tokens: int, estimator: Optional[TokenEstimator] = None
+) -> str:
+    """
+    Like truncate_text(), but the limit is a token budget. Picks a character
+    limit proportional to the estimate, shrinks it until it fits, then cuts
+    on a sentence boundary with the same rule as truncate_text().
+    """
+    if not isinstance(text, str):
+        raise ValueError("Input must be a string")
+
+    est = estimator or _estimator
+    total = est(text)
+    if total <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    limit = int(len(text) * max_tokens / total)
+    while limit > 0 and est(text[:limit]) > max_tokens:
+        limit = int(limit * 0.9)
+    if limit <= 0:
+        return ""
+
+    truncated = text[:limit]
+
+    # Same sentence-boundary rule as truncate_text, plus CJK full stops
+    last_stop = max(truncated.rfind(stop) for stop in _SENTENCE_STOPS)
+    if last_stop > limit * 0.6:  # avoid cutting too aggressively
+        return truncated[: last_stop + 1]
+
+    return truncated
+
+
+# ---------------------------------------------------------------------------
+# SENTENCE-ALIGNED CHUNKING
+# ---------------------------------------------------------------------------
+
+# Sentence end; trailing whitespace stays with the sentence it follows
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+|(?<=[。！？])\s*")
+
+# About one sentence in this many may end a chunk early (see split_into_chunks)
+_ANCHOR_EVERY = 4
+
+
+def _sentences(text: str) -> List[str]:
+    pieces = []
+    start = 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        if match.end() > start:
+            pieces.append(text[start : match.end()])
+            start = match.end()
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def _split_oversized(sentence: str, max_tokens: int, est: TokenEstimator) -> List[str]:
+    """Cut a run-on "sentence" (e.g. an unpunctuated transcript) at spaces."""
+    pieces = []
+    while len(sentence) > 1 and est(sentence) > max_tokens:
+        limit = max(1, int(len(sentence) * max_tokens / est(sentence)))
+        cut = sentence.rfind(" ", 0, limit) + 1 or limit
+        pieces.append(sentence[:cut])
+        sentence = sentence[cut:]
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+
+def split_into_chunks(
+    text: str, target_tokens: int, estimator: Optional[TokenEstimator] = None
+) -> List[str]:
+    """
+    Split text into sentence-aligned chunks of roughly target_tokens that
+    concatenate back to the original text.
+
+    Boundaries are content-defined: once a chunk holds 3/4 of the target,
+    it ends after the next sentence whose hash marks it as an anchor, and
+    never grows past 5/4 of the target. An edit therefore only changes the
+    chunks around it; later chunks still start on the same anchors and
+    keep their exact text (and cache keys).
+    """
+    if not isinstance(text, str):
+        raise ValueError("Input must be a string")
+
+    est = estimator or _estimator
+    min_tokens = max(1, target_tokens * 3 // 4)
+    max_tokens = max(min_tokens, target_tokens * 5 // 4)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for sentence in _sentences(text):
+        for piece in _split_oversized(sentence, max_tokens, est):
+            tokens = est(piece)
+            if current and size + tokens > max_tokens:
+                chunks.append("".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += tokens
+            anchor = zlib.crc32(piece.strip().encode("utf-8")) % _ANCHOR_EVERY == 0
+            if size >= min_tokens and anchor:
+                chunks.append("".join(current))
+                current, size = [], 0
+    if current:
+        chunks.append("".join(current))
+    return chunks
@@ -33,12 +33,14 @@
  *   backend routes/analyzeRoute.ts and shared schema.
  * - Response shape must match analysisSchema (backend responseValidator
  *   ensures this). Caller (Popup) typically writes result into analysisStore.
+ * - lookupAnalysis revalidates a page analyzed before (GET by URL with
+ *   If-None-Match) so re-opening it neither re-uploads nor re-analyzes.
  *
  * =============================================================================
  */
 
 import type { ExtractResult } from '../content/extractContent';
-import type { AnalysisResult } from '../state/analysisStore';
+import type { AnalysisResult, StoredAnalysis } from '../state/analysisStore';
 
 /** Backend base URL; override via VITE_PRISM_API_BASE_URL env */
 const DEFAULT_BASE_URL =
@@ -47,8 +49,61 @@ const DEFAULT_BASE_URL =
 /** Timeout in ms; two-step LLM flow (headers + descriptions) can take 60-90s */
 const TIMEOUT_MS = 120000;
 
+/** Lookups are a cache check; fall back to a fresh analysis quickly */
+const LOOKUP_TIMEOUT_MS = 5000;
+
+/** What the backend returns for later revalidation of an analysis */
+export interface RevalidationInfo {
+  fingerprint?: string;
+  etag?: string;
+}
+
 export interface AnalyzeOptions {
   baseUrl?: string;
+  /** Called with the fingerprint / ETag of the final result */
+  onRevalidationInfo?: (info: RevalidationInfo) => void;
+}
+
+function errorMessage(data: any, status: number): string {
+  const detail = data?.detail;
+  return (
+    (typeof detail === 'string' ? detail : Array.isArray(detail) ? detail.join(' ') : null) ||
+    data?.message ||
+    data?.error ||
+    `HTTP ${status}`
+  );
+}
+
+/** Normalize a backend analysis payload into the store's AnalysisResult shape. */
+function toAnalysisResult(data: any): AnalysisResult {
+  if (!Array.isArray(data?.perspectives)) {
+    throw new Error('Invalid response: missing perspectives');
+  }
+
+  const indicators = Array.isArray(data?.bias?.indicators)
+    ? data.bias.indicators.filter((x: unknown) => typeof x === 'string' && String(x).trim().length > 0)
+    : [];
+  const bias = indicators.length > 0 ? { indicators } : undefined;
+
+  const pageSummary = Array.isArray(data?.pageSummary)
+    ? data.pageSummary.filter((x: unknown) => typeof x === 'string' && String(x).trim().length > 0)
+    : undefined;
+
+  const perspectives = (data.perspectives as Array<{ label: string; body: string; searchKeywords?: unknown }>).map(
+    (p) => ({
+      label: p.label,
+      body: p.body,
+      searchKeywords: Array.isArray(p.searchKeywords)
+        ? p.searchKeywords.filter((x: unknown) => typeof x === 'string' && String(x).trim().length > 0)
+        : undefined,
+    })
+  );
+  return {
+    perspectives,
+    bias,
+    reflection: typeof data?.reflection === 'string' ? data.reflection : undefined,
+    pageSummary: pageSummary && pageSummary.length >= 3 ? pageSummary.slice(0, 3) : undefined,
+  } as AnalysisResult;
 }
 
 /**
@@ -77,44 +132,99 @@ export async function analyze(
 
     const data = await res.json().catch(() => ({}));
 
-    if (!res.ok) {
-      const detail = data?.detail;
-      const msg =
-        (typeof detail === 'string' ? detail : Array.isArray(detail) ? detail.join(' ') : null) ||
-        data?.message ||
-        data?.error ||
-        `HTTP ${res.status}`;
-      throw new Error(msg);
+    if (!res.ok) throw new Error(errorMessage(data, res.status));
+
+    const result = toAnalysisResult(data);
+    options.onRevalidationInfo?.({
+      fingerprint: res.headers.get('X-Prism-Fingerprint') ?? undefined,
+      etag: res.headers.get('ETag') ?? undefined,
+    });
+    return result;
+  } catch (err) {
+    clearTimeout(id);
+    if (err instanceof Error) {
+      if (err.name === 'AbortError') throw new Error('Request timed out');
+      if (err.name === 'TypeError' && (err.message === 'Failed to fetch' || err.message.includes('network'))) {
+        throw new Error('Backend not reachable. Start backend or set VITE_PRISM_API_BASE_URL.');
+      }
+      throw err;
     }
+    throw new Error('Analysis request failed');
+  }
+}
+
+/**
+ * Streaming analyze: POSTs to /api/analyze/stream and reads NDJSON events.
+ * onPartial is called with a growing AnalysisResult as pageSummary bullets,
+ * perspectives and bias arrive; the resolved value is the final validated
+ * result (the "done" event), which may differ from the preview.
+ */
+export async function analyzeStream(
+  payload: ExtractResult,
+  onPartial: (partial: AnalysisResult) => void,
+  options: AnalyzeOptions = {}
+): Promise<AnalysisResult> {
+  const baseUrl = options.baseUrl ?? DEFAULT_BASE_URL;
+  const url = `${baseUrl.replace(/\/$/, '')}/api/analyze/stream`;
+
+  const controller = new AbortController();
+  const id = setTimeout(() => controller.abort(), TIMEOUT_MS);
+
+  const partial: AnalysisResult = { perspectives: [] };
+  const summary: string[] = [];
+
+  try {
+    const res = await fetch(url, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'application/x-ndjson' },
+      body: JSON.stringify(payload),
+      signal: controller.signal,
+    });
 
-    if (!Array.isArray(data?.perspectives)) {
-      throw new Error('Invalid response: missing perspectives');
+    if (!res.ok || !res.body) {
+      const data = await res.json().catch(() => ({}));
+      throw new Error(errorMessage(data, res.status));
     }
 
-    const indicators = Array.isArray(data?.bias?.indicators)
-      ? data.bias.indicators.filter((x: unknown) => typeof x === 'string' && String(x).trim().length > 0)
-      : [];
-    const bias = indicators.length > 0 ? { indicators } : undefined;
-
-    const pageSummary = Array.isArray(data?.pageSummary)
-      ? data.pageSummary.filter((x: unknown) => typeof x === 'string' && String(x).trim().length > 0)
-      : undefined;
-
-    const perspectives = (data.perspectives as Array<{ label: string; body: string; searchKeywords?: unknown }>).map(
-      (p) => ({
-        label: p.label,
-        body: p.body,
-        searchKeywords: Array.isArray(p.searchKeywords)
-          ? p.searchKeywords.filter((x: unknown) => typeof x === 'string' && String(x).trim().length > 0)
-          : undefined,
-      })
-    );
-    return {
-      perspectives,
-      bias,
-      reflection: typeof data?.reflection === 'string' ? data.reflection : undefined,
-      pageSummary: pageSummary && pageSummary.length >= 3 ? pageSummary.slice(0, 3) : undefined,
-    } as AnalysisResult;
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffered += decoder.decode(value, { stream: true });
+
+      let newline: number;
+      while ((newline = buffered.indexOf('\n')) >= 0) {
+        const line = buffered.slice(0, newline).trim();
+        buffered = buffered.slice(newline + 1);
+        if (!line) continue;
+
+        const event = JSON.parse(line);
+        if (event.event === 'done') {
+          clearTimeout(id);
+          const result = toAnalysisResult(event.result);
+          options.onRevalidationInfo?.({ fingerprint: event.fingerprint, etag: event.etag });
+          return result;
+        }
+        if (event.event === 'error') {
+          throw new Error(typeof event.detail === 'string' ? event.detail : `HTTP ${event.status}`);
+        }
+        if (event.event === 'pageSummary') {
+          summary[event.index] = event.text;
+          if (summary.filter(Boolean).length >= 3) partial.pageSummary = summary.slice(0, 3);
+        } else if (event.event === 'perspective') {
+          partial.perspectives = [...partial.perspectives];
+          partial.perspectives[event.index] = event.perspective;
+        } else if (event.event === 'bias') {
+          const indicators = Array.isArray(event.bias?.indicators) ? event.bias.indicators : [];
+          partial.bias = indicators.length > 0 ? { indicators } : undefined;
+        }
+        onPartial({ ...partial, perspectives: partial.perspectives.filter(Boolean) });
+      }
+    }
+    throw new Error('Analysis stream ended unexpectedly');
   } catch (err) {
     clearTimeout(id);
     if (err instanceof Error) {
@@ -128,6 +238,52 @@ export async function analyze(
   }
 }
 
+/**
+ * Revalidate the analysis stored for the page at pageUrl without uploading
+ * its text: GET /api/analyze/?url= with the stored ETag.
+ *
+ * The backend's URL index is filled from whatever URLs clients send, so its
+ * answer is only trusted when it matches an analysis this client got for
+ * its own upload of the page: a 304 for the stored ETag, or a 200 carrying
+ * the stored fingerprint (same content, analysis re-run since). Anything
+ * else returns null and the caller analyzes the extracted page.
+ */
+export async function lookupAnalysis(
+  pageUrl: string,
+  stored: StoredAnalysis,
+  options: AnalyzeOptions = {}
+): Promise<StoredAnalysis | null> {
+  if (!stored.etag && !stored.fingerprint) return null;
+  const baseUrl = options.baseUrl ?? DEFAULT_BASE_URL;
+  const url = `${baseUrl.replace(/\/$/, '')}/api/analyze/?url=${encodeURIComponent(pageUrl)}`;
+
+  const controller = new AbortController();
+  const id = setTimeout(() => controller.abort(), LOOKUP_TIMEOUT_MS);
+
+  try {
+    const headers: Record<string, string> = {};
+    if (stored.etag) headers['If-None-Match'] = stored.etag;
+    const res = await fetch(url, { headers, signal: controller.signal });
+
+    if (res.status === 304) return stored.etag ? { ...stored, timestamp: Date.now() } : null;
+    if (!res.ok) return null;
+
+    const fingerprint = res.headers.get('X-Prism-Fingerprint');
+    if (!stored.fingerprint || fingerprint !== stored.fingerprint) return null;
+
+    return {
+      result: toAnalysisResult(await res.json()),
+      fingerprint,
+      etag: res.headers.get('ETag') ?? undefined,
+      timestamp: Date.now(),
+    };
+  } catch {
+    return null;
+  } finally {
+    clearTimeout(id);
+  }
+}
+
 export async function generateKeywords(
   label: string,
   body: string,
@@ -144,3 +300,29 @@ export async function generateKeywords(
   const data = await res.json();
   return Array.isArray(data.keywords) ? data.keywords : [];
 }
+
+/**
+ * Keywords for all perspectives of an analysis in one request (one LLM call).
+ * Returns one keyword array per perspective, in input order.
+ */
+export async function generateKeywordsBatch(
+  title: string,
+  perspectives: Array<{ label: string; body: string }>
+): Promise<string[][]> {
+  const res = await fetch(`${DEFAULT_BASE_URL}/api/keywords/batch`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      title,
+      perspectives: perspectives.map((p) => ({ label: p.label, body: p.body })),
+    }),
+  });
+
+  if (!res.ok) throw new Error('Keyword generation failed');
+
+  const data = await res.json();
+  const groups: unknown[] = Array.isArray(data.keywords) ? data.keywords : [];
+  return perspectives.map((_, i) =>
+    Array.isArray(groups[i]) ? (groups[i] as unknown[]).filter((x): x is string => typeof x === 'string') : []
+  );
+}
@@ -13,8 +13,44 @@ import {
   setSuccess,
   setError,
   initFromStorage,
+  getStoredAnalysis,
+  storeAnalysis,
 } from '../state/analysisStore';
-import { analyze, generateKeywords } from '../api/analyzeClient';
+import {
+  analyzeStream,
+  generateKeywords,
+  generateKeywordsBatch,
+  lookupAnalysis,
+  type RevalidationInfo,
+} from '../api/analyzeClient';
+import type { AnalysisResult } from '../state/analysisStore';
+
+/**
+ * Fetch keywords for every perspective in one batch request right after an
+ * analysis completes. Perspectives stay marked as loading meanwhile, so the
+ * per-perspective lazy fetch below does not fire a duplicate request.
+ */
+function prefetchKeywords(result: AnalysisResult, meta: { url: string; title: string; text?: string }) {
+  const pending = result.perspectives.map((p) =>
+    p.searchKeywords && p.searchKeywords.length > 0 ? p : { ...p, keywordsLoading: true }
+  );
+  setSuccess({ ...result, perspectives: pending }, meta);
+
+  const finish = (keywords: string[][] | null) => {
+    const latest = getState().result;
+    if (!latest) return;
+    const updated = latest.perspectives.map((p, idx) => ({
+      ...p,
+      searchKeywords: keywords && keywords[idx]?.length ? keywords[idx] : p.searchKeywords,
+      keywordsLoading: false,
+    }));
+    setSuccess({ ...latest, perspectives: updated }, meta);
+  };
+
+  generateKeywordsBatch(meta.title, result.perspectives)
+    .then(finish)
+    .catch(() => finish(null));
+}
 
 function PopupApp() {
   const [state, setState] = React.useState(getState);
@@ -74,7 +110,8 @@ function PopupApp() {
       });
   }, [selectedPerspective]);
 
-  const handleAnalyze = async () => {
+  // fresh: skip revalidation and analyze the page as it is now
+  const handleAnalyze = async ({ fresh = false }: { fresh?: boolean } = {}) => {
     const [tab] = await chrome.tabs.query({ active: true, currentWindow: true });
     if (!tab?.id) {
       setError('No active tab');
@@ -89,6 +126,17 @@ function PopupApp() {
 
     setLoading();
     try {
+      // Analyzed before: revalidate by URL instead of re-uploading the page
+      const stored = fresh ? null : await getStoredAnalysis(tabUrl);
+      const revalidated = stored ? await lookupAnalysis(tabUrl, stored) : null;
+      if (revalidated) {
+        const meta = { url: tabUrl, title: tab.title ?? '' };
+        void storeAnalysis(tabUrl, revalidated);
+        setSuccess(revalidated.result, meta);
+        prefetchKeywords(revalidated.result, meta);
+        return;
+      }
+
       const res = await new Promise<{
         ok: boolean;
         data?: { url: string; title: string; text: string };
@@ -118,8 +166,19 @@ function PopupApp() {
         return;
       }
 
-      const result = await analyze(res.data);
-      setSuccess(result, { url: res.data.url, title: res.data.title, text: res.data.text });
+      const meta = { url: res.data.url, title: res.data.title, text: res.data.text };
+      // Show perspectives as they stream in; the final result replaces the preview
+      let revalidation: RevalidationInfo = {};
+      const result = await analyzeStream(
+        res.data,
+        (partial) => {
+          if (partial.perspectives.length > 0) setSuccess(partial, meta);
+        },
+        { onRevalidationInfo: (info) => (revalidation = info) }
+      );
+      void storeAnalysis(tabUrl, { result, ...revalidation, timestamp: Date.now() });
+      setSuccess(result, meta);
+      prefetchKeywords(result, meta);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Analysis failed');
     }
@@ -152,7 +211,7 @@ function PopupApp() {
       <div className="prism-popup prism-pad">
         <Header />
         <p className="prism-error">{state.error}</p>
-        <button className="prism-btn" onClick={handleAnalyze}>Retry</button>
+        <button className="prism-btn" onClick={() => handleAnalyze()}>Retry</button>
       </div>
     );
   }
@@ -279,7 +338,7 @@ function PopupApp() {
           <span className="prism-footer-icon" aria-hidden>ℹ</span>
           Select a perspective for more insights
         </p>
-        <button className="prism-btn prism-btn--secondary" onClick={handleAnalyze}>Analyze again</button>
+        <button className="prism-btn prism-btn--secondary" onClick={() => handleAnalyze({ fresh: true })}>Analyze again</button>
       </div>
     );
   }
@@ -290,7 +349,7 @@ function PopupApp() {
       <p className="prism-text-muted" style={{ marginBottom: 'var(--prism-space-lg)' }}>
         Click below to analyze the current page and see multiple perspectives.
       </p>
-      <button className="prism-btn" onClick={handleAnalyze}>Analyze page</button>
+      <button className="prism-btn" onClick={() => handleAnalyze()}>Analyze page</button>
     </div>
   );
 }
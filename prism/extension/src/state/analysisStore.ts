@@ -23,6 +23,8 @@
  *   children can read and react to state changes.
  * - Persist to extension storage only if we want "last analysis" to survive
  *   popup close (optional; document in integration notes).
+ * - Keep the last MAX_STORED_ANALYSES analyses per page URL (with the
+ *   backend's ETag) in chrome.storage.local for revalidation.
  * - No API calls or DOM access; pure state.
  *
  * =============================================================================
@@ -59,6 +61,14 @@ export interface AnalysisResult {
   pageSummary?: string[];
 }
 
+/** An analysis kept per page for revalidation (see analyzeClient.lookupAnalysis) */
+export interface StoredAnalysis {
+  result: AnalysisResult;
+  fingerprint?: string;
+  etag?: string;
+  timestamp: number;
+}
+
 export type AnalysisStatus = 'idle' | 'loading' | 'success' | 'error';
 
 export interface AnalysisState {
@@ -79,6 +89,13 @@ let state: AnalysisState = {
 
 const listeners = new Set<Listener>();
 const STORAGE_KEY = 'prism_last_analysis';
+const ANALYSES_KEY = 'prism_analyses_by_url';
+const MAX_STORED_ANALYSES = 50;
+
+/** Page URL without the fragment; the backend canonicalizes the rest */
+function pageKey(url: string): string {
+  return url.split('#')[0];
+}
 
 function emit(): void {
   listeners.forEach((fn) => fn(state));
@@ -117,6 +134,30 @@ export async function initFromStorage(): Promise<void> {
   }
 }
 
+export async function getStoredAnalysis(url: string): Promise<StoredAnalysis | null> {
+  try {
+    const stored = await chrome.storage.local.get(ANALYSES_KEY);
+    const entry = stored[ANALYSES_KEY]?.[pageKey(url)];
+    return entry?.result?.perspectives?.length ? entry : null;
+  } catch {
+    return null;
+  }
+}
+
+export async function storeAnalysis(url: string, entry: StoredAnalysis): Promise<void> {
+  try {
+    const stored = await chrome.storage.local.get(ANALYSES_KEY);
+    const entries: Record<string, StoredAnalysis> = { ...(stored[ANALYSES_KEY] ?? {}), [pageKey(url)]: entry };
+    // Keep the most recently used pages
+    const kept = Object.entries(entries)
+      .sort(([, a], [, b]) => b.timestamp - a.timestamp)
+      .slice(0, MAX_STORED_ANALYSES);
+    await chrome.storage.local.set({ [ANALYSES_KEY]: Object.fromEntries(kept) });
+  } catch {
+    /* ignore */
+  }
+}
+
 export function getState(): AnalysisState {
   return state;
 }